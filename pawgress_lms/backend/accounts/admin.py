@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User
+from .models import ModerationAction, User
 
 
 
@@ -30,4 +30,18 @@ class UserAdminTeacherApproval(UserAdmin):
 
 
 
-admin.site.register(User, UserAdminTeacherApproval)
\ No newline at end of file
+admin.site.register(User, UserAdminTeacherApproval)
+
+
+#read only log of the bulk moderation actions
+@admin.register(ModerationAction)
+class ModerationActionAdmin(admin.ModelAdmin):
+    list_display = ('action', 'performed_by', 'users_changed', 'enrollments_changed', 'created_at')
+    list_filter = ('action',)
+    readonly_fields = ('action', 'performed_by', 'reason', 'user_ids', 'users_changed', 'enrollments_changed', 'created_at')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
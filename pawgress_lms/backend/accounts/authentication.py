@@ -0,0 +1,111 @@
+"""
+JWT authentication without a users query on every request.
+
+simplejwt's ``JWTAuthentication`` loads the whole ``User`` row for every API
+call, only for most views to read ``id`` and ``role``. ``CachedJWTAuthentication``
+builds the user from the verified token instead:
+
+* ``id``, ``email`` and ``role`` come from the token's claims (see
+  ``ModifiedObtainPairSerializer.get_token``);
+* ``is_active``, ``is_staff``, ``is_superuser`` and the password fingerprint
+  come from a small record per user (``user_auth_state``), cached in the
+  shared cache named by ``AUTH_STATE_CACHE_ALIAS``. A ban, unban or password
+  change saves the user, and the ``post_save`` signal in accounts.signals
+  drops the record, so the next request on any worker sees it at once.
+  Without a shared cache (the alias is None unless ``PAWGRESS_REDIS_URL`` is
+  set) the record is read from the database on every request: one primary key
+  lookup of four columns, since a per-process cache would let a banned user
+  keep going on every worker that didn't handle the ban.
+
+Every other field is deferred: the returned object is a real ``User`` and
+reading, say, ``first_name`` loads it on first access. Tokens issued before
+the role claim existed fall back to the normal database lookup.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+User = get_user_model()
+
+STATE_FIELDS = ("is_active", "is_staff", "is_superuser", "password")
+CLAIM_FIELDS = ("email", "role")
+
+
+def _state_cache():
+    """The shared cache holding the records, or None when they aren't cached."""
+    alias = getattr(settings, "AUTH_STATE_CACHE_ALIAS", None)
+    return caches[alias] if alias else None
+
+
+def _read_state(user_id):
+    row = User.objects.filter(pk=user_id).values(*STATE_FIELDS).first()
+    if row is None:
+        return None
+    return {
+        "is_active": row["is_active"],
+        "is_staff": row["is_staff"],
+        "is_superuser": row["is_superuser"],
+        "password_hash": get_md5_hash_password(row["password"]),
+    }
+
+
+def _state_key(user_id):
+    return f"auth-user-state:{user_id}"
+
+
+def user_auth_state(user_id):
+    """The authorisation state of a user, or None if they don't exist (one query on a cache miss)."""
+    cache = _state_cache()
+    if cache is None:
+        return _read_state(user_id)
+    state = cache.get(_state_key(user_id))
+    if state is None:
+        state = _read_state(user_id)
+        if state is None:
+            return None
+        cache.set(_state_key(user_id), state, getattr(settings, "AUTH_STATE_CACHE_TIMEOUT", 300))
+    return state
+
+
+def forget_auth_state(*user_ids):
+    """Drop the cached state so the next request re-reads it (after a ban, unban or password change)."""
+    cache = _state_cache()
+    if cache is not None:
+        cache.delete_many([_state_key(user_id) for user_id in user_ids])
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+        if any(claim not in validated_token for claim in CLAIM_FIELDS):
+            # token from before the claims were added
+            return super().get_user(validated_token)
+
+        state = user_auth_state(user_id)
+        if state is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not state["is_active"]:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != state["password_hash"]:
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        # a real User with everything but these fields deferred
+        loaded = {
+            User._meta.pk.attname: user_id,
+            **{claim: validated_token[claim] for claim in CLAIM_FIELDS},
+            "is_active": state["is_active"],
+            "is_staff": state["is_staff"],
+            "is_superuser": state["is_superuser"],
+        }
+        # from_db wants the values in field order
+        names = [field.attname for field in User._meta.concrete_fields if field.attname in loaded]
+        return User.from_db(router.db_for_read(User), names, [loaded[name] for name in names])
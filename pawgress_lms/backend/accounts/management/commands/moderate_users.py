@@ -0,0 +1,51 @@
+"""
+Ban, unban or deactivate many users at once (see accounts/moderation.py).
+Every run is a handful of set-based UPDATEs plus one ModerationAction audit
+row, however many users it covers.
+
+Run via:
+  python manage.py moderate_users ban --email a@uni.edu --email b@uni.edu --reason "exam misconduct"
+  python manage.py moderate_users unban --id 12 --id 15
+  python manage.py moderate_users deactivate --file emails.txt     # one id or email per line
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts import moderation
+
+
+class Command(BaseCommand):
+    help = "Ban, unban or deactivate users in bulk by id or email."
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=list(moderation.ACTIONS))
+        parser.add_argument("--id", type=int, action="append", dest="ids", default=[])
+        parser.add_argument("--email", action="append", dest="emails", default=[])
+        parser.add_argument("--file", help="File with one user id or email per line")
+        parser.add_argument("--reason", default="", help="Recorded on the audit row")
+
+    def handle(self, *args, **options):
+        ids, emails = list(options["ids"]), list(options["emails"])
+        if options["file"]:
+            try:
+                with open(options["file"]) as handle:
+                    for line in handle:
+                        value = line.strip()
+                        if value.isdigit():
+                            ids.append(int(value))
+                        elif value:
+                            emails.append(value)
+            except OSError as e:
+                raise CommandError(f"Could not read {options['file']}: {e}")
+        if not ids and not emails:
+            raise CommandError("Give the users with --id, --email or --file")
+
+        result = moderation.moderate(options["action"], ids, emails, reason=options["reason"])
+        missing = result["not_found"]["ids"] + result["not_found"]["emails"]
+        if missing:
+            self.stdout.write(self.style.WARNING(f"Not found: {', '.join(map(str, missing))}"))
+        if result["skipped"]:
+            self.stdout.write(self.style.WARNING(f"Skipped admins: {', '.join(map(str, result['skipped']))}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['action'].title()}: {result['users_changed']} of {len(result['users'])} users changed, "
+            f"{result['enrollments_changed']} enrollments updated (audit #{result['audit_id']})."
+        ))
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_accounts', '0004_user_avatar'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModerationAction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('ban', 'Ban'), ('unban', 'Unban'), ('deactivate', 'Deactivate')], max_length=12)),
+                ('reason', models.TextField(blank=True)),
+                ('user_ids', models.JSONField(default=list)),
+                ('users_changed', models.PositiveIntegerField(default=0)),
+                ('enrollments_changed', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('performed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='moderation_actions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
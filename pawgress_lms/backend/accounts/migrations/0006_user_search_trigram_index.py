@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:40
+
+from django.db import migrations
+
+
+def create_trigram_index(apps, schema_editor):
+    # postgres only, other databases use the in-process index (see accounts/people_search.py)
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS users_search_trgm_idx ON users "
+        "USING gin ((lower(email || ' ' || first_name || ' ' || last_name)) gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS users_search_trgm_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_accounts', '0005_moderationaction'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -93,4 +93,25 @@ class User(AbstractUser):
     
 
 
+#one row per bulk ban/unban/deactivate, who did it, why and to whom (see accounts/moderation.py)
+class ModerationAction(models.Model):
+    ACTION_CHOICES = (
+        ("ban", "Ban"),
+        ("unban", "Unban"),
+        ("deactivate", "Deactivate"),
+    )
+    action = models.CharField(max_length=12, choices=ACTION_CHOICES)
+    performed_by = models.ForeignKey(
+        "User", null=True, blank=True, on_delete=models.SET_NULL, related_name="moderation_actions"
+    )
+    reason = models.TextField(blank=True)
+    user_ids = models.JSONField(default=list)  # every targeted user, changed or not
+    users_changed = models.PositiveIntegerField(default=0)
+    enrollments_changed = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.action} of {len(self.user_ids)} users by {self.performed_by_id} at {self.created_at:%Y-%m-%d %H:%M}"
@@ -0,0 +1,110 @@
+"""
+Bulk moderation: ban, unban or deactivate many users at once.
+
+Banning one user saves them and the ``post_save`` signal in accounts.signals
+updates their course enrollments, so banning a few hundred users after an
+academic-integrity incident used to mean as many requests, saves and signal
+cascades. ``moderate`` does the whole batch with a fixed number of
+statements whatever its size:
+
+* one SELECT resolving the ids and emails to users;
+* one UPDATE of ``users.is_active``;
+* one UPDATE of ``CourseEnrollment.status`` (the same cascade as the signal);
+* one INSERT of the ``ModerationAction`` audit row;
+
+then the cached auth state of every target is dropped in one cache call
+(there is nothing to drop without a shared cache, the state is read on every
+request then) so their tokens stop (or start) working on the next request,
+and their catalogue versions are bumped.
+
+Deactivating is a ban in this app (the single-user "deactivate student"
+endpoint has always banned the enrollments too); it is kept as its own
+action so the audit trail says which one was meant. Superusers and the
+moderator themselves are never touched.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from pawgress_lms import cache as catalogue_cache
+
+from .authentication import forget_auth_state
+from .models import ModerationAction
+
+User = get_user_model()
+
+# action -> the is_active it leaves the users with
+ACTIONS = {"ban": False, "deactivate": False, "unban": True}
+
+
+def cascade_enrollment_status(user_ids, active):
+    """
+    Move the users' course enrollments in one UPDATE, returns the rows changed.
+
+    Banning sets every active enrollment to banned; unbanning sets banned
+    student enrollments back to active (teacher enrollments keep their status).
+    """
+    from courses.models import CourseEnrollment
+
+    enrollments = CourseEnrollment.objects.filter(user_id__in=list(user_ids))
+    if active:
+        return enrollments.filter(role="student", status="banned").update(status="active")
+    return enrollments.filter(status="active").update(status="banned")
+
+
+def resolve_users(ids=(), emails=()):
+    """Return ({id: (email, is_superuser)} found, ids not found, emails not found); emails match case-insensitively."""
+    ids = {int(user_id) for user_id in ids}
+    lowered = {email.strip().lower(): email for email in emails if email and email.strip()}
+    if not ids and not lowered:
+        return {}, [], []
+    rows = list(
+        User.objects.annotate(email_lower=Lower("email"))
+        .filter(Q(id__in=ids) | Q(email_lower__in=list(lowered)))
+        .values_list("id", "email_lower", "is_superuser")
+    )
+    found_ids = {user_id for user_id, _, _ in rows}
+    found_emails = {email for _, email, _ in rows}
+    return (
+        {user_id: (email, is_superuser) for user_id, email, is_superuser in rows},
+        sorted(ids - found_ids),
+        [original for email, original in lowered.items() if email not in found_emails],
+    )
+
+
+def moderate(action, ids=(), emails=(), actor=None, reason=""):
+    """Apply ``action`` to the users named by ``ids`` and ``emails``, returns a summary with the audit row."""
+    if action not in ACTIONS:
+        raise ValueError(f"Unknown moderation action {action!r}, expected one of {', '.join(ACTIONS)}")
+    active = ACTIONS[action]
+    found, missing_ids, missing_emails = resolve_users(ids, emails)
+    actor_id = getattr(actor, "pk", None)
+    skipped = sorted(user_id for user_id, (_, is_superuser) in found.items() if is_superuser or user_id == actor_id)
+    targets = sorted(user_id for user_id in found if user_id not in skipped)
+
+    users_changed = enrollments_changed = 0
+    with transaction.atomic():
+        if targets:
+            users_changed = User.objects.filter(id__in=targets, is_active=not active).update(is_active=active)
+            enrollments_changed = cascade_enrollment_status(targets, active)
+        audit = ModerationAction.objects.create(
+            action=action, performed_by_id=actor_id, reason=reason or "", user_ids=targets,
+            users_changed=users_changed, enrollments_changed=enrollments_changed,
+        )
+        if targets:
+            # .update() sends no post_save, so do what the user signals would have
+            catalogue_cache.bump(catalogue_cache.PEOPLE, *(catalogue_cache.user_scope(user_id) for user_id in targets))
+            # dropped now and again after commit, in case a request re-cached the old state in between
+            forget_auth_state(*targets)
+            transaction.on_commit(lambda: forget_auth_state(*targets))
+
+    return {
+        "action": action,
+        "audit_id": audit.pk,
+        "users": targets,
+        "users_changed": users_changed,
+        "enrollments_changed": enrollments_changed,
+        "skipped": skipped,
+        "not_found": {"ids": missing_ids, "emails": missing_emails},
+    }
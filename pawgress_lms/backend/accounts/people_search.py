@@ -0,0 +1,233 @@
+"""
+Typo-tolerant people search for the admin user pages.
+
+A user matches a query when their email, first or last name contains it, or
+when it is close enough to a run of words in them by trigram similarity
+(``jonathon smyth`` finds Jonathan Smith). Hits are ordered by an integer
+score, best first:
+
+* 2000 when the email, first name, last name or full name starts with it;
+* 1000 when it appears anywhere in them;
+* plus the trigram similarity in thousandths.
+
+Integer scores make the keyset cursor (score, id) exact, so paging through a
+large result set stays a range scan and never repeats or skips anyone. With
+no query at all it is just the filtered table in id order.
+
+On PostgreSQL this runs in the database on a ``pg_trgm`` GIN index over
+``lower(email || ' ' || first_name || ' ' || last_name)`` (installed by the
+accounts migrations): substring matches are ``LIKE`` and similar ones the
+``<%`` word similarity operator, both answered from the index. Elsewhere
+(SQLite in development) an in-process trigram index of every user is built
+on first use and rebuilt whenever the ``PEOPLE`` catalogue version moves,
+which user saves, imports and bulk moderation bump. Its similarity is the
+best Jaccard overlap with a run of as many words as the query has, close to
+what ``word_similarity`` computes.
+"""
+import base64
+import binascii
+import re
+import threading
+from array import array
+from bisect import bisect_right
+from collections import Counter, defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+
+from pawgress_lms import cache as catalogue_cache
+
+User = get_user_model()
+
+SIMILARITY_THRESHOLD = 0.3
+PREFIX_SCORE, SUBSTRING_SCORE = 2000, 1000
+MAX_QUERY_LENGTH = 100
+ROLES = ("student", "teacher", "admin")
+# the same meanings as the status filters of the student and teacher lists
+STATUSES = {
+    "active": {"is_active": True},
+    "banned": {"is_active": False},
+    "pending": {"is_active": True, "is_approved": False},
+    "approved": {"is_active": True, "is_approved": True},
+}
+
+DOCUMENT_SQL = "lower(email || ' ' || first_name || ' ' || last_name)"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(score, user_id):
+    return base64.urlsafe_b64encode(f"{score}:{user_id}".encode()).decode()
+
+
+def decode_cursor(token):
+    try:
+        score, user_id = base64.urlsafe_b64decode(token.encode()).decode().split(":")
+        return int(score), int(user_id)
+    except (ValueError, UnicodeError, binascii.Error) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+
+def _words(text):
+    # pg_trgm only looks at letters and digits
+    return re.findall(r"[^\W_]+", text.lower())
+
+
+def _trigrams(words):
+    grams = set()
+    for word in words:
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _similarity(query_words, query_grams, doc_words):
+    """Best Jaccard overlap between the query's trigrams and a run of as many words of the document."""
+    width = max(len(query_words), 1)
+    best = 0.0
+    for start in range(max(len(doc_words) - width + 1, 1)):
+        grams = _trigrams(doc_words[start:start + width])
+        common = len(query_grams & grams)
+        if common:
+            best = max(best, common / (len(query_grams) + len(grams) - common))
+    return best
+
+
+def _score(prefix, substring, similarity):
+    return PREFIX_SCORE * prefix + SUBSTRING_SCORE * substring + int(similarity * 1000)
+
+
+class PeopleIndex:
+    """Trigram postings of every user's email and names, with what the filters need."""
+
+    def __init__(self, rows):
+        self.people = {}
+        ids, docs = [], []
+        postings = defaultdict(list)
+        for user_id, email, first_name, last_name, role, is_active, is_approved in rows:
+            fields = (email.lower(), first_name.lower(), last_name.lower(), f"{first_name} {last_name}".lower())
+            doc = " ".join(fields[:3])
+            words = _words(doc)
+            self.people[user_id] = (fields, words, role, {"is_active": is_active, "is_approved": is_approved})
+            ids.append(user_id)
+            docs.append(doc)
+            for gram in _trigrams(words):
+                postings[gram].append(user_id)
+        # compact arrays, a university's worth of users stays a few megabytes
+        self.postings = {gram: array("q", user_ids) for gram, user_ids in postings.items()}
+        # every document in one string, substring matches are a single regex scan in C
+        self.ids = array("q", ids)
+        self.text = "\n".join(docs)
+        self.starts = array("q", [0] * len(docs))
+        offset = 0
+        for position, doc in enumerate(docs):
+            self.starts[position] = offset
+            offset += len(doc) + 1
+
+    def _containing(self, query):
+        return {
+            self.ids[bisect_right(self.starts, match.start()) - 1]
+            for match in re.finditer(re.escape(query), self.text)
+        }
+
+    def search(self, query, role=None, status=None):
+        """Every user matching a non-empty ``query`` as (score, id)."""
+        wanted = STATUSES.get(status, {}).items()
+        query_words = _words(query)
+        # a letter or two is only worth a substring match, every name shares a trigram with it
+        query_grams = _trigrams(query_words) if len(query) >= 3 else set()
+        # Jaccard >= t needs at least t * |query trigrams| of them in common
+        needed = SIMILARITY_THRESHOLD * len(query_grams)
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self.postings.get(gram, ()))
+        containing = self._containing(query)
+
+        hits = []
+        for user_id in containing.union(user_id for user_id, count in shared.items() if count >= needed):
+            fields, words, person_role, flags = self.people[user_id]
+            if role is not None and person_role != role or any(flags[name] != value for name, value in wanted):
+                continue
+            substring = user_id in containing
+            similarity = _similarity(query_words, query_grams, words) if shared[user_id] else 0.0
+            if substring or similarity >= SIMILARITY_THRESHOLD:
+                prefix = any(field.startswith(query) for field in fields)
+                hits.append((_score(prefix, substring, similarity), user_id))
+        return hits
+
+
+_index_lock = threading.Lock()
+_index = (None, None)  # (PEOPLE version it was built at, PeopleIndex)
+
+
+def people_index():
+    """The in-process index, rebuilt when the PEOPLE version has moved since it was built."""
+    global _index
+    version = catalogue_cache.versions([catalogue_cache.PEOPLE])[0]
+    if _index[0] != version:
+        with _index_lock:
+            if _index[0] != version:
+                rows = User.objects.values_list(
+                    "id", "email", "first_name", "last_name", "role", "is_active", "is_approved"
+                ).iterator(chunk_size=5000)
+                _index = (version, PeopleIndex(rows))
+    return _index[1]
+
+
+def _like_escape(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _search_postgresql(query, role, status, after, limit):
+    prefix, substring = _like_escape(query) + "%", "%" + _like_escape(query) + "%"
+    score = (
+        f"(CASE WHEN lower(email) LIKE %s OR lower(first_name) LIKE %s OR lower(last_name) LIKE %s "
+        f"OR lower(first_name || ' ' || last_name) LIKE %s THEN {PREFIX_SCORE} ELSE 0 END "
+        f"+ CASE WHEN {DOCUMENT_SQL} LIKE %s THEN {SUBSTRING_SCORE} ELSE 0 END "
+        f"+ floor(word_similarity(%s, {DOCUMENT_SQL}) * 1000))::int"
+    )
+    params = [prefix] * 4 + [substring, query]
+    filters = [f"({DOCUMENT_SQL} LIKE %s OR %s <%% {DOCUMENT_SQL})"]
+    params += [substring, query]
+    if role:
+        filters.append("role = %s")
+        params.append(role)
+    for field, value in STATUSES.get(status, {}).items():
+        filters.append(field if value else f"NOT {field}")
+    where = " AND ".join(filters)
+
+    sql = f"SELECT score, id FROM (SELECT {score} AS score, id FROM {User._meta.db_table} WHERE {where}) hits"
+    if after is not None:
+        sql += " WHERE score < %s OR (score = %s AND id > %s)"
+        params += [after[0], after[0], after[1]]
+    sql += " ORDER BY score DESC, id LIMIT %s"
+    params.append(limit)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # the threshold <% uses, for this transaction only
+        cursor.execute("SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)", [str(SIMILARITY_THRESHOLD)])
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def search(query="", role=None, status=None, after=None, limit=50):
+    """
+    Up to ``limit`` matching users as (score, id), best first, starting after
+    the ``after`` (score, id) cursor position.
+    """
+    query = " ".join((query or "").lower().split())[:MAX_QUERY_LENGTH]
+    if not query:
+        # nothing to rank, every user scores 0 and the id keyset does the paging
+        users = User.objects.filter(role=role) if role else User.objects.all()
+        users = users.filter(**STATUSES.get(status, {}))
+        if after is not None:
+            users = users.filter(id__gt=after[1])
+        return [(0, user_id) for user_id in users.order_by("id").values_list("id", flat=True)[:limit]]
+    if connection.vendor == "postgresql":
+        return _search_postgresql(query, role, status, after, limit)
+    hits = sorted(people_index().search(query, role, status), key=lambda hit: (-hit[0], hit[1]))
+    if after is not None:
+        hits = [hit for hit in hits if hit[0] < after[0] or (hit[0] == after[0] and hit[1] > after[1])]
+    return hits[:limit]
@@ -10,4 +10,11 @@ class IsTeacherOrAdmin(permissions.BasePermission):
             u and u.is_authenticated and (
                 getattr(u, "role", None) == "teacher" or u.is_staff or u.is_superuser
             )
-        )
\ No newline at end of file
+        )
+
+
+#staff covers teachers too, this is for the things only a real admin may do
+class IsSuperuser(permissions.BasePermission):
+    def has_permission(self, request, view):
+        u = request.user
+        return bool(u and u.is_authenticated and u.is_superuser)
@@ -2,6 +2,7 @@ from django.contrib.auth import get_user_model
 from rest_framework import serializers 
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework.exceptions import AuthenticationFailed  #CHECK need to check this import
+from pawgress_lms.fieldsets import SparseFieldsetMixin
 
 User = get_user_model()
 
@@ -47,7 +48,7 @@ class RegistrationSerializer(serializers.ModelSerializer):
         return user
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     avatar_url = serializers.SerializerMethodField()
 
     class Meta:
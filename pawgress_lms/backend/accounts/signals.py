@@ -1,6 +1,6 @@
 #this file is used for managing the singals for the accounts and in the app
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_migrate, post_save
+from django.db.models.signals import post_delete, post_migrate, post_save
 from django.dispatch import receiver
 
 
@@ -45,15 +45,30 @@ def update_course_enrollments_on_user_status_change(sender, instance, created, u
     - If user is reactivated (is_active=True), set enrollment status back to 'active'
     """
     if not created:  # Only run for updates, not new user creation
-        from courses.models import CourseEnrollment
-        
+        from .moderation import cascade_enrollment_status
+
         # Check if is_active field was updated
         if update_fields is None or 'is_active' in update_fields:
-            enrollments = CourseEnrollment.objects.filter(user=instance)
-            
-            if instance.is_active:
-                # User was reactivated - set student enrollments back to active (preserve teacher status)
-                enrollments.filter(role='student', status='banned').update(status='active')
-            else:
-                # User was banned - set all active enrollments to banned
-                enrollments.filter(status='active').update(status='banned')
+            # banned: active enrollments become banned; reactivated: student enrollments go back to active
+            cascade_enrollment_status([instance.pk], instance.is_active)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_auth_state(sender, instance, created=False, **kwargs):
+    # bans, unbans and password changes all save the user, the next request re-reads them
+    if not created:
+        from .authentication import forget_auth_state
+
+        forget_auth_state(instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_people_index(sender, instance, update_fields=None, **kwargs):
+    # logging in only stamps last_login, nothing the people search looks at
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    from pawgress_lms import cache as catalogue_cache
+
+    catalogue_cache.bump(catalogue_cache.PEOPLE)
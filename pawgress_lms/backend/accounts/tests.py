@@ -1,10 +1,11 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 # Create your tests here.
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from accounts.models import User
+from accounts.views import BulkModerationView
 
 class AccountsTests(APITestCase):
 
@@ -44,6 +45,199 @@ class AccountsTests(APITestCase):
         self.assertIn("access", response.data)
         self.assertIn("refresh", response.data)
 
+    #the admin user list pages by id when asked to and can trim the fields
+    def test_user_list_keyset_pagination(self):
+        admin = User.objects.create_superuser(email="admin@cookieuniversity.com", password="admin")
+        for n in range(5):
+            User.objects.create_user(email=f"student{n}@cookieuniversity.com", password="student", role="student")
+        self.client.force_authenticate(user=admin)
+        url = reverse('user-list')
+
+        active = User.objects.filter(is_active=True).count()
+        self.assertEqual(len(self.client.get(url).data), active)  # no paging params, same plain list as before
+
+        seen = []
+        response = self.client.get(url, {"page_size": 3, "fields": "id,email"})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(all(set(row) == {"id", "email"} for row in response.data["results"]))
+            seen.extend(row["id"] for row in response.data["results"])
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+        self.assertEqual(seen, sorted(User.objects.filter(is_active=True).values_list("id", flat=True)))
+
+    #a jwt request builds the user from the token, and a ban or password change still locks it out at once
+    @override_settings(AUTH_STATE_CACHE_ALIAS="default")
+    def test_jwt_fast_path_and_revocation(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        admin = User.objects.create_superuser(email="admin@cookieuniversity.com", password="admin")
+        access = self.client.post(reverse('token_obtain_pair'), {"email": self.user.email, "password": "testing"}).data["access"]
+        url = reverse('course-list')
+        auth = {"HTTP_AUTHORIZATION": f"Bearer {access}"}
+
+        self.assertEqual(self.client.get(url, **auth).status_code, status.HTTP_200_OK)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url, **auth).status_code, status.HTTP_200_OK)
+        self.assertFalse([q for q in queries.captured_queries if 'FROM "users"' in q["sql"]])
+
+        # without a shared cache the state is read on every request, a single small query
+        with override_settings(AUTH_STATE_CACHE_ALIAS=None), CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url, **auth).status_code, status.HTTP_200_OK)
+        self.assertEqual(len([q for q in queries.captured_queries if 'FROM "users"' in q["sql"]]), 1)
+
+        self.client.force_authenticate(user=admin)
+        self.client.patch(reverse('deactivate-student', args=[self.user.email]))
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(url, **auth).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.user.refresh_from_db()
+        self.user.is_active = True
+        self.user.save()
+        self.assertEqual(self.client.get(url, **auth).status_code, status.HTTP_200_OK)
+        self.user.set_password("changed")
+        self.user.save()
+        self.assertEqual(self.client.get(url, **auth).status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+    #an admin imports a csv of students with their courses, duplicates come back by email
+    def test_bulk_user_import(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from courses.models import Course, CourseEnrollment
+
+        admin = User.objects.create_superuser(email="admin@cookieuniversity.com", password="admin")
+        teacher = User.objects.create_user(email="teacher@cookieuniversity.com", password="teacher", role="teacher")
+        course = Course.objects.create(title="I100 Intake", description="Intake", teacher=teacher)
+        csv_text = "\n".join([
+            "email,password,first_name,last_name,courses",
+            f"new1@cookieuniversity.com,pw1,New,One,{course.id}",
+            "new2@cookieuniversity.com,pw2,New,Two,",
+            "NEW1@cookieuniversity.com,pw3,Again,One,",
+            "Tesing@cookieuniversity.com,pw4,Already,Here,",
+            "not-an-email,pw5,Bad,Row,",
+            "new3@cookieuniversity.com,pw6,New,Three,999999",
+        ])
+        url = reverse('user-import')
+
+        self.client.force_authenticate(user=teacher)
+        self.assertEqual(self.client.post(url, {"file": SimpleUploadedFile("intake.csv", csv_text.encode())}).status_code,
+                         status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=admin)
+        response = self.client.post(url, {"file": SimpleUploadedFile("intake.csv", csv_text.encode())}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data["created"], response.data["enrollments"]), (2, 1))
+        self.assertEqual([(d["row"], d["email"]) for d in response.data["duplicates"]],
+                         [(3, "NEW1@cookieuniversity.com"), (4, "Tesing@cookieuniversity.com")])
+        self.assertEqual([e["row"] for e in response.data["errors"]], [5, 6])
+
+        self.assertTrue(CourseEnrollment.objects.filter(user__email="new1@cookieuniversity.com", course=course, role="student").exists())
+        self.client.force_authenticate(user=None)
+        login = self.client.post(reverse('token_obtain_pair'), {"email": "new2@cookieuniversity.com", "password": "pw2"})
+        self.assertEqual(login.status_code, status.HTTP_200_OK)
+
+    #the command hashes in worker processes and the hashes still check out
+    def test_import_users_command_process_pool(self):
+        import os
+        import tempfile
+        from io import StringIO
+        from unittest import mock
+        from django.core.management import call_command
+
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as handle:
+            handle.write("email,password,role\n")
+            for n in range(6):
+                handle.write(f"staff{n}@cookieuniversity.com,secret{n},teacher\n")
+        self.addCleanup(os.remove, handle.name)
+        with mock.patch("accounts.bulk_import.POOL_THRESHOLD", 0):
+            call_command("import_users", handle.name, "--workers", "2", stdout=StringIO())
+
+        teachers = User.objects.filter(email__startswith="staff").order_by("email")
+        self.assertEqual(teachers.count(), 6)
+        self.assertTrue(all(t.check_password(f"secret{n}") and t.is_staff and t.is_approved for n, t in enumerate(teachers)))
+
+    #bulk bans are a fixed handful of statements, cascade to enrollments, lock tokens out and leave an audit row
+    def test_bulk_moderation(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from accounts.models import ModerationAction
+        from courses.models import Course, CourseEnrollment
+
+        admin = User.objects.create_superuser(email="admin@cookieuniversity.com", password="admin")
+        teacher = User.objects.create_user(email="teacher@cookieuniversity.com", password="teacher", role="teacher")
+        course = Course.objects.create(title="M100 Integrity", description="Integrity", teacher=teacher)
+        students = [
+            User.objects.create_user(email=f"cheat{n}@cookieuniversity.com", password="student", role="student")
+            for n in range(4)
+        ]
+        for student in students:
+            CourseEnrollment.objects.create(user=student, course=course, role="student", status="active")
+        access = self.client.post(reverse('token_obtain_pair'), {"email": students[0].email, "password": "student"}).data["access"]
+        auth = {"HTTP_AUTHORIZATION": f"Bearer {access}"}
+        self.assertEqual(self.client.get(reverse('course-list'), **auth).status_code, status.HTTP_200_OK)
+
+        self.client.force_authenticate(user=admin)
+        url = reverse('bulk-moderation')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, {
+                "action": "ban", "ids": [students[0].id, students[1].id, admin.id, 999999],
+                "emails": ["CHEAT2@cookieuniversity.com", "nobody@cookieuniversity.com"], "reason": "exam misconduct",
+            }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertLessEqual(len(queries.captured_queries), BulkModerationView.query_budget)
+        self.assertEqual((response.data["users_changed"], response.data["enrollments_changed"]), (3, 3))
+        self.assertEqual(response.data["skipped"], [admin.id])
+        self.assertEqual(response.data["not_found"], {"ids": [999999], "emails": ["nobody@cookieuniversity.com"]})
+        self.assertEqual(CourseEnrollment.objects.filter(status="banned").count(), 3)
+        self.assertTrue(User.objects.get(pk=students[3].pk).is_active)
+
+        audit = ModerationAction.objects.get(pk=response.data["audit_id"])
+        self.assertEqual((audit.action, audit.performed_by, audit.reason), ("ban", admin, "exam misconduct"))
+
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(reverse('course-list'), **auth).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.force_authenticate(user=admin)
+        self.client.post(url, {"action": "unban", "ids": [students[0].id]}, format="json")
+        self.assertEqual(CourseEnrollment.objects.get(user=students[0]).status, "active")
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(reverse('course-list'), **auth).status_code, status.HTTP_200_OK)
+
+    #people search finds names with typos, ranks prefix matches first, filters by role and status and pages by cursor
+    def test_people_search(self):
+        admin = User.objects.create_superuser(email="root@cookieuniversity.com", password="admin")
+        smith = User.objects.create_user(email="jsmith@cookieuniversity.com", password="x", role="student",
+                                         first_name="Jonathan", last_name="Smith")
+        smyth = User.objects.create_user(email="joan@cookieuniversity.com", password="x", role="teacher",
+                                         first_name="Joan", last_name="Smyth", is_approved=False)
+        jones = User.objects.create_user(email="mary@cookieuniversity.com", password="x", role="student",
+                                         first_name="Mary", last_name="Jones", is_active=False)
+        self.client.force_authenticate(user=admin)
+        url = reverse("people-search")
+
+        def ids(response):
+            self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+            return [user["id"] for user in response.data["results"]]
+
+        self.assertEqual(ids(self.client.get(url, {"q": "smyth"})), [smyth.id, smith.id])  # exact first, then the near miss
+        self.assertEqual(ids(self.client.get(url, {"q": "jonathon smith"})), [smith.id])
+        self.assertEqual(ids(self.client.get(url, {"role": "student", "status": "banned"})), [jones.id])
+        self.assertEqual(ids(self.client.get(url, {"q": "smith", "role": "teacher", "status": "pending"})), [smyth.id])
+
+        response = self.client.get(url, {"q": "smith", "page_size": 1})
+        self.assertEqual(ids(response), [smith.id])
+        response = self.client.get(response.data["next"])
+        self.assertEqual(ids(response), [smyth.id])
+        self.assertIsNone(response.data["next"])
+
+        # a rename is found straight away
+        jones.last_name = "Smithers"
+        jones.save()
+        self.assertEqual(ids(self.client.get(url, {"q": "smithe"})), [jones.id, smith.id])
+        self.assertEqual(self.client.get(url, {"cursor": "nonsense"}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {"status": "gone"}).status_code, status.HTTP_400_BAD_REQUEST)
 
 #I acknowledge the use of CoPilot (integrated into VScode) to help with minor debugging of the code and understanding the syntax of django for making the test cases. Prompts mainly included the bug/issue I was facing.
 # The output and syntax was  well understood by me was then modified further suit the needs of this project.
\ No newline at end of file
@@ -8,7 +8,7 @@ from .views import (
     deactiveStudentAccountView, TeachersListView, StudentsListView,
     BanTeacherView, UnbanTeacherView, UnbanStudentAccountView,
     MeView, ChangePasswordView, UserEnrolledCoursesView, UserTeachingCoursesView,
-    UniversityCountsReportView)
+    UniversityCountsReportView, UserImportView, BulkModerationView, PeopleSearchView)
 
 
 urlpatterns = [
@@ -16,6 +16,9 @@ urlpatterns = [
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('register/', RegistrationView.as_view(), name='register'),  #this is where they go when registering
     path('users/', seeUserListView.as_view(), name='user-list'),  #this is for the admin to view the list of users
+    path('users/search/', PeopleSearchView.as_view(), name='people-search'),  #admin search by name or email, typos allowed
+    path('users/moderate/', BulkModerationView.as_view(), name='bulk-moderation'),  #admin bulk ban/unban/deactivate
+    path('users/import/', UserImportView.as_view(), name='user-import'),  #admin bulk onboarding from a csv
     path('teachers/', TeachersListView.as_view(), name='teacher-list'), # this is to get the list of teachers
     path('students/', StudentsListView.as_view(), name='student-list'), # this is to get the list of students
     path('approve-teacher/<int:id>/', approveTeacherView.as_view(), name='approve-teacher'),  #to approve a teacher
@@ -1,9 +1,9 @@
 from django.shortcuts import render
 from rest_framework_simplejwt.views import TokenObtainPairView
-from django.db.models import Avg
+from django.db.models import Avg, Sum
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
-from accounts.permissions import IsTeacherOrAdmin
+from accounts.permissions import IsSuperuser, IsTeacherOrAdmin
 
 from rest_framework import permissions, status
 from lessons.models import LessonCompletion
@@ -18,6 +18,10 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 
 from django.contrib.auth import get_user_model
+from pawgress_lms.parsers import CSVRowsParser, request_rows
+from . import bulk_import, moderation, people_search
+from pawgress_lms.pagination import KeysetPagination
+from rest_framework.utils.urls import replace_query_param
 
 
 User = get_user_model()
@@ -189,6 +193,7 @@ class UserEnrolledCoursesView(generics.GenericAPIView):
     def get(self, request, user_id, *args, **kwargs):
         from courses.models import CourseEnrollment
         from courses.serializers import CourseSerializer
+        from courses.viewer import ViewerContext
         
         try:
             user = User.objects.get(id=user_id)
@@ -200,13 +205,14 @@ class UserEnrolledCoursesView(generics.GenericAPIView):
             user=user, 
             role="student", 
             status="active"
-        ).select_related('course')
+        ).select_related('course').prefetch_related('course__lessons', 'course__lessons__prerequisites')
         
         # Get the courses
         courses = [enrollment.course for enrollment in enrollments]
         
         # Serialize the courses with context
-        serializer = CourseSerializer(courses, many=True, context={'request': request})
+        viewer = ViewerContext(request.user).preload(course.id for course in courses)
+        serializer = CourseSerializer(courses, many=True, context={'request': request, 'viewer': viewer})
         
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -217,6 +223,7 @@ class UserTeachingCoursesView(generics.GenericAPIView):
     def get(self, request, user_id, *args, **kwargs):
         from courses.models import Course
         from courses.serializers import CourseSerializer
+        from courses.viewer import ViewerContext
         
         try:
             user = User.objects.get(id=user_id)
@@ -228,10 +235,11 @@ class UserTeachingCoursesView(generics.GenericAPIView):
             return Response({"error": "User is not a teacher"}, status=status.HTTP_400_BAD_REQUEST)
         
         # Get all courses where this user is the teacher
-        courses = Course.objects.filter(teacher=user).exclude(status="archived")
+        courses = Course.objects.filter(teacher=user).exclude(status="archived").prefetch_related('lessons', 'lessons__prerequisites')
         
         # Serialize the courses with context
-        serializer = CourseSerializer(courses, many=True, context={'request': request})
+        viewer = ViewerContext(request.user).preload(course.id for course in courses)
+        serializer = CourseSerializer(courses, many=True, context={'request': request, 'viewer': viewer})
         
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -251,7 +259,96 @@ class UniversityAverageGradeReportView(APIView):
     permission_classes = [IsAuthenticated, IsTeacherOrAdmin]
 
     def get(self, request):
-        # Since LessonCompletion doesn't have a grade field, return None for now
-        # This can be implemented later when grade functionality is added
-        avg_grade = None
+        from courses.models import CourseGradeSummary
+
+        # one aggregate over the per course grade summaries, not over every completion
+        totals = CourseGradeSummary.objects.aggregate(credits=Sum("credit_total"), points=Sum("grade_point_total"))
+        avg_grade = round(totals["points"] / totals["credits"], 2) if totals["credits"] else None
         return Response({"average_grade": avg_grade}, status=status.HTTP_200_OK)
+
+
+
+#admin only: onboard a whole intake from a csv (or json list), see accounts/bulk_import.py
+class UserImportView(APIView):
+    permission_classes = [IsAuthenticated, IsSuperuser]
+    parser_classes = [JSONParser, CSVRowsParser, MultiPartParser, FormParser]
+
+    def post(self, request):
+        role = request.query_params.get("role", "student")
+        if role not in bulk_import.ROLES:
+            return Response({"detail": "role must be student or teacher"}, status=status.HTTP_400_BAD_REQUEST)
+        rows = request_rows(request, "users")
+        if rows is None:
+            return Response({"detail": "Send a CSV file or a list of users"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            clean, duplicates, errors = bulk_import.validate_rows(rows, role)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        dry_run = request.query_params.get("dry_run") in ("1", "true")
+        created, enrollments = (0, 0) if dry_run else bulk_import.import_users(clean)
+        return Response({
+            "created": created,
+            "enrollments": enrollments,
+            "would_create": len(clean) if dry_run else None,
+            "duplicates": duplicates,
+            "errors": errors,
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+
+
+#admin only: ban, unban or deactivate many users in one go, see accounts/moderation.py
+class BulkModerationView(APIView):
+    permission_classes = [IsAuthenticated, IsSuperuser]
+    query_budget = 6  # the same for 1 user or 10,000
+
+    def post(self, request):
+        action = request.data.get("action")
+        if action not in moderation.ACTIONS:
+            return Response({"detail": f"action must be one of {', '.join(moderation.ACTIONS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        ids = request.data.get("ids") or []
+        emails = request.data.get("emails") or []
+        if not isinstance(ids, list) or not all(isinstance(user_id, int) for user_id in ids):
+            return Response({"detail": "ids must be a list of user ids"}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(emails, list) or not all(isinstance(email, str) for email in emails):
+            return Response({"detail": "emails must be a list of emails"}, status=status.HTTP_400_BAD_REQUEST)
+        if not ids and not emails:
+            return Response({"detail": "Give the users as ids and/or emails"}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = moderation.moderate(action, ids, emails, actor=request.user, reason=str(request.data.get("reason", "")))
+        return Response(result, status=status.HTTP_200_OK)
+
+
+#typo tolerant search over email and names for the admin user pages, see accounts/people_search.py
+class PeopleSearchView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+    query_budget = 4  # plus one when the in-process index is rebuilt
+
+    def get(self, request):
+        params = request.query_params
+        role, user_status = params.get("role") or None, params.get("status") or None
+        if role is not None and role not in people_search.ROLES:
+            return Response({"detail": f"role must be one of {', '.join(people_search.ROLES)}"}, status=status.HTTP_400_BAD_REQUEST)
+        if user_status is not None and user_status not in people_search.STATUSES:
+            return Response({"detail": f"status must be one of {', '.join(people_search.STATUSES)}"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            page_size = min(int(params.get("page_size", KeysetPagination.page_size)), KeysetPagination.max_page_size)
+            after = people_search.decode_cursor(params["cursor"]) if params.get("cursor") else None
+        except ValueError:
+            return Response({"detail": "Invalid cursor or page_size"}, status=status.HTTP_400_BAD_REQUEST)
+        if page_size < 1:
+            return Response({"detail": "page_size must be positive"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # one extra hit tells whether there is a next page
+        hits = people_search.search(params.get("q", ""), role, user_status, after, limit=page_size + 1)
+        page = hits[:page_size]
+        users = User.objects.in_bulk([user_id for _, user_id in page])
+        next_url = None
+        if len(hits) > page_size:
+            next_url = replace_query_param(request.build_absolute_uri(), "cursor", people_search.encode_cursor(*page[-1]))
+        return Response({
+            "next": next_url,
+            "results": UserSerializer(
+                [users[user_id] for _, user_id in page if user_id in users], many=True, context={"request": request}
+            ).data,
+        }, status=status.HTTP_200_OK)
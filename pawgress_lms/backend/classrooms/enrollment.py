@@ -0,0 +1,107 @@
+"""
+Contention-safe student enrollment.
+
+A seat is taken with a single conditional UPDATE on the classroom counter
+(``enrolled_count < capacity``). The database applies those updates one at a
+time, so any number of concurrent requests can never oversubscribe a
+classroom; an UPDATE that matches no row simply means the classroom is full
+and the student goes on the waitlist instead. Requests from the same student
+are serialised on their user row, which keeps the one-classroom-per-course
+rule and the (student, classroom) unique row safe without a retry dance.
+"""
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from pawgress_lms import cache as catalogue_cache
+
+from .models import Classroom, Enrollment
+
+User = get_user_model()
+
+ENROLLED = "enrolled"
+WAITLISTED = "waitlisted"
+PROMOTED = "promoted"
+ALREADY_ENROLLED = "already_enrolled"
+ALREADY_WAITLISTED = "already_waitlisted"
+COURSE_CONFLICT = "course_conflict"
+
+
+def claim_seat(classroom_id):
+    """Take one seat if there is one. Returns True when the seat was taken."""
+    return Classroom.objects.filter(
+        pk=classroom_id, enrolled_count__lt=F("capacity")
+    ).update(enrolled_count=F("enrolled_count") + 1) == 1
+
+
+def enroll_student(student, classroom):
+    """Enroll ``student`` in ``classroom`` or waitlist them if it is full. Returns (outcome, enrollment)."""
+    try:
+        with transaction.atomic():
+            return _enroll(student, classroom)
+    except IntegrityError:
+        # a parallel request for the same student inserted the row first
+        existing = Enrollment.objects.get(student=student, classroom=classroom)
+        outcome = ALREADY_ENROLLED if existing.status == Enrollment.STATUS_ENROLLED else ALREADY_WAITLISTED
+        return outcome, existing
+
+
+def _drop_other_waitlists(student, classroom):
+    """A student promoted into a seat no longer needs their place on the course's other waitlists."""
+    if classroom.course_id is None:
+        return
+    other_waitlists = Enrollment.objects.filter(
+        student=student,
+        classroom__course_id=classroom.course_id,
+        status=Enrollment.STATUS_WAITLISTED,
+    ).exclude(classroom=classroom)
+    affected = set(other_waitlists.values_list("classroom_id", flat=True))
+    if affected:
+        other_waitlists.delete()
+        Classroom.refresh_counts(affected)
+
+
+def _enroll(student, classroom):
+    # lock the student's row so their own concurrent requests queue up behind each other
+    list(User.objects.select_for_update().filter(pk=student.pk).values_list("pk", flat=True))
+
+    if classroom.course_id is not None and Enrollment.objects.filter(
+        student=student,
+        classroom__course_id=classroom.course_id,
+        status=Enrollment.STATUS_ENROLLED,
+    ).exists():
+        return COURSE_CONFLICT, None
+
+    existing = Enrollment.objects.filter(student=student, classroom=classroom).first()
+    if existing is not None and existing.status == Enrollment.STATUS_ENROLLED:
+        return ALREADY_ENROLLED, existing
+
+    seat = claim_seat(classroom.pk)
+
+    if existing is None:
+        enrollment = Enrollment(
+            student=student,
+            classroom=classroom,
+            status=Enrollment.STATUS_ENROLLED if seat else Enrollment.STATUS_WAITLISTED,
+        )
+        if seat:
+            # claim_seat already counted it, don't let save() count it again
+            enrollment._counted_status = Enrollment.STATUS_ENROLLED
+        enrollment.save()
+        return (ENROLLED if seat else WAITLISTED), enrollment
+
+    if not seat:
+        return ALREADY_WAITLISTED, existing
+
+    # off the waitlist into the claimed seat, same shape as the promotion update
+    Enrollment.objects.filter(pk=existing.pk).update(
+        status=Enrollment.STATUS_ENROLLED, waitlisted_at=None, waitlist_seq=None
+    )
+    Classroom.adjust_counts(classroom.pk, waitlisted=-1)
+    _drop_other_waitlists(student, classroom)
+    catalogue_cache.bump(catalogue_cache.user_scope(student.pk))
+    existing.status = Enrollment.STATUS_ENROLLED
+    existing.waitlisted_at = None
+    existing.waitlist_seq = None
+    existing._counted_status = Enrollment.STATUS_ENROLLED
+    return PROMOTED, existing
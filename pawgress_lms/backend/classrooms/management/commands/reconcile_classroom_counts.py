@@ -0,0 +1,62 @@
+"""
+Check the stored Classroom.enrolled_count / waitlisted_count against the
+Enrollment table and fix any drift (e.g. after rows were changed with raw
+SQL or a bulk queryset update that skipped Enrollment.save).
+
+Run via:
+  python manage.py reconcile_classroom_counts            # report and fix
+  python manage.py reconcile_classroom_counts --dry-run  # report only
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from classrooms.models import Classroom
+
+
+class Command(BaseCommand):
+    help = "Recount classroom enrollment counters from the Enrollment table and repair any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report drift, don't fix it")
+        parser.add_argument("--classroom", type=int, action="append", dest="classrooms",
+                            help="Only check this classroom id (can be repeated)")
+
+    def handle(self, *args, **options):
+        classrooms = Classroom.objects.all()
+        if options["classrooms"]:
+            classrooms = classrooms.filter(pk__in=options["classrooms"])
+
+        with transaction.atomic():
+            stored = {
+                pk: (enrolled, waitlisted)
+                for pk, enrolled, waitlisted in classrooms.select_for_update()
+                .values_list("pk", "enrolled_count", "waitlisted_count")
+            }
+            actual = Classroom.actual_counts(stored.keys())
+
+            drifted = []
+            for pk, counts in stored.items():
+                expected = actual.get(pk, (0, 0))
+                if counts != expected:
+                    drifted.append(pk)
+                    self.stdout.write(
+                        f"classroom {pk}: enrolled {counts[0]} -> {expected[0]}, "
+                        f"waitlisted {counts[1]} -> {expected[1]}"
+                    )
+
+            if drifted and not options["dry_run"]:
+                Classroom.objects.bulk_update(
+                    [
+                        Classroom(pk=pk, enrolled_count=actual.get(pk, (0, 0))[0], waitlisted_count=actual.get(pk, (0, 0))[1])
+                        for pk in drifted
+                    ],
+                    ["enrolled_count", "waitlisted_count"],
+                    batch_size=1000,
+                )
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS(f"Checked {len(stored)} classrooms, all counters match."))
+        elif options["dry_run"]:
+            self.stdout.write(self.style.WARNING(f"{len(drifted)} of {len(stored)} classrooms have drifted (dry run, nothing changed)."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Fixed counters on {len(drifted)} of {len(stored)} classrooms."))
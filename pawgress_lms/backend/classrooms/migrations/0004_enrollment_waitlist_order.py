@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:41
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_waitlist_order(apps, schema_editor):
+    # Existing waitlists have no join time, so keep their current (id) order
+    Classroom = apps.get_model("classrooms", "Classroom")
+    Enrollment = apps.get_model("classrooms", "Enrollment")
+    now = timezone.now()
+    sequences = {}
+    waitlisted = Enrollment.objects.filter(status="waitlisted").order_by("classroom_id", "id")
+    for enrollment in waitlisted.iterator():
+        seq = sequences.get(enrollment.classroom_id, 0) + 1
+        sequences[enrollment.classroom_id] = seq
+        enrollment.waitlist_seq = seq
+        enrollment.waitlisted_at = now
+        enrollment.save(update_fields=["waitlist_seq", "waitlisted_at"])
+    for classroom_id, seq in sequences.items():
+        Classroom.objects.filter(pk=classroom_id).update(waitlist_sequence=seq)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classrooms', '0003_remove_enrollment_enrolled_at_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classroom',
+            name='waitlist_sequence',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='waitlist_seq',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='waitlisted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['classroom', 'status', 'waitlist_seq'], name='enrollment_waitlist_idx'),
+        ),
+        migrations.RunPython(backfill_waitlist_order, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:44
+
+from django.db import migrations, models
+
+
+def backfill_counters(apps, schema_editor):
+    Classroom = apps.get_model("classrooms", "Classroom")
+    Enrollment = apps.get_model("classrooms", "Enrollment")
+    rows = (
+        Enrollment.objects.filter(student__role="student")
+        .values("classroom_id")
+        .annotate(
+            enrolled=models.Count("id", filter=models.Q(status="enrolled")),
+            waitlisted=models.Count("id", filter=models.Q(status="waitlisted")),
+        )
+        .order_by()
+    )
+    for row in rows:
+        Classroom.objects.filter(pk=row["classroom_id"]).update(
+            enrolled_count=row["enrolled"], waitlisted_count=row["waitlisted"]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classrooms', '0004_enrollment_waitlist_order'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classroom',
+            name='enrolled_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='classroom',
+            name='waitlisted_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classrooms', '0005_classroom_enrollment_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classroom',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
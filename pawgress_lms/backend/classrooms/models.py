@@ -1,8 +1,9 @@
 from django.conf import settings
-from django.db import models
+from django.db import connection, models
 from django.utils import timezone
 from courses.models import Course
 from lessons.models import Lesson
+from pawgress_lms import cache as catalogue_cache
 
 User = settings.AUTH_USER_MODEL
 
@@ -34,15 +35,80 @@ class Classroom(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="scheduled")
 
     lessons = models.ManyToManyField(Lesson, blank=True, related_name="classrooms")
+
+    # last waitlist sequence number handed out, gives every waitlist a stable FIFO order
+    waitlist_sequence = models.PositiveIntegerField(default=0)
+
+    # denormalised student counts, kept up to date by Enrollment.save/delete and
+    # refresh_counts (see reconcile_classroom_counts for repairing drift)
+    enrolled_count = models.PositiveIntegerField(default=0)
+    waitlisted_count = models.PositiveIntegerField(default=0)
+
+    # edits to the classroom itself, seat counters move without touching it
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         constraints = [
             models.CheckConstraint(check=models.Q(capacity__lte=20), name="capacity_max_20")
         ]
     
+    @staticmethod
+    def next_waitlist_seq_for(classroom_id):
+        """Reserve the next waitlist sequence number (call inside a transaction)."""
+        # the UPDATE row-locks the classroom until commit, so concurrent joins never share a number
+        Classroom.objects.filter(pk=classroom_id).update(waitlist_sequence=models.F("waitlist_sequence") + 1)
+        return Classroom.objects.values_list("waitlist_sequence", flat=True).get(pk=classroom_id)
+
+    @staticmethod
+    def adjust_counts(classroom_id, enrolled=0, waitlisted=0):
+        """Atomically shift the stored counters (F() update, no read-modify-write)."""
+        changes = {}
+        if enrolled:
+            changes["enrolled_count"] = models.F("enrolled_count") + enrolled
+        if waitlisted:
+            changes["waitlisted_count"] = models.F("waitlisted_count") + waitlisted
+        if changes:
+            Classroom.objects.filter(pk=classroom_id).update(**changes)
+            catalogue_cache.bump(catalogue_cache.CLASSROOMS)
+
+    @staticmethod
+    def actual_counts(classroom_ids=None):
+        """Recount student enrollments from the Enrollment table: {classroom_id: (enrolled, waitlisted)}."""
+        rows = Enrollment.objects.filter(student__role="student")
+        if classroom_ids is not None:
+            rows = rows.filter(classroom_id__in=classroom_ids)
+        rows = rows.values("classroom_id").annotate(
+            enrolled=models.Count("id", filter=models.Q(status=Enrollment.STATUS_ENROLLED)),
+            waitlisted=models.Count("id", filter=models.Q(status=Enrollment.STATUS_WAITLISTED)),
+        ).order_by()
+        return {row["classroom_id"]: (row["enrolled"], row["waitlisted"]) for row in rows}
+
+    @staticmethod
+    def refresh_counts(classroom_ids):
+        """Recompute the counters of the given classrooms, used after bulk queryset changes."""
+        classroom_ids = list(classroom_ids)
+        counts = Classroom.actual_counts(classroom_ids)
+        for classroom_id in classroom_ids:
+            enrolled, waitlisted = counts.get(classroom_id, (0, 0))
+            Classroom.objects.filter(pk=classroom_id).update(enrolled_count=enrolled, waitlisted_count=waitlisted)
+        if classroom_ids:
+            catalogue_cache.bump(catalogue_cache.CLASSROOMS)
+
+    COUNTER_FIELDS = ("enrolled_count", "waitlisted_count", "waitlist_sequence")
+
+    def save(self, *args, **kwargs):
+        # a plain save of a loaded classroom (e.g. the edit serializer) must not write back
+        # counters that other requests may have moved since it was read
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     @property
     def occupancy(self):
-        return self.enrollments.filter(status=Enrollment.STATUS_ENROLLED).count()
+        return self.enrolled_count
 
     def __str__(self):
         return f"{self.course.name} – Classroom {self.pk}"
@@ -60,14 +126,115 @@ class Enrollment(models.Model):
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='enrollments')
     classroom = models.ForeignKey(Classroom, on_delete=models.CASCADE, related_name='enrollments')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_ENROLLED)
+    waitlisted_at = models.DateTimeField(null=True, blank=True)
+    waitlist_seq = models.PositiveIntegerField(null=True, blank=True)
     
     class Meta:
         unique_together = ('student', 'classroom')
+        indexes = [
+            models.Index(fields=["classroom", "status", "waitlist_seq"], name="enrollment_waitlist_idx"),
+        ]
+
+    # FIFO order of a classroom's waitlist
+    WAITLIST_ORDER = ("waitlist_seq", "id")
+
+    COUNTER_DELTAS = {
+        STATUS_ENROLLED: {"enrolled": 1},
+        STATUS_WAITLISTED: {"waitlisted": 1},
+    }
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remember the stored status so save/delete know how to move the classroom counters
+        instance._counted_status = instance.__dict__.get("status")
+        return instance
+
+    def _counts_towards_capacity(self):
+        return getattr(self.student, "role", None) == "student"
+
+    def _shift_counters(self, old_status, new_status):
+        if old_status == new_status or not self._counts_towards_capacity():
+            return
+        deltas = {"enrolled": 0, "waitlisted": 0}
+        for key, value in self.COUNTER_DELTAS.get(old_status, {}).items():
+            deltas[key] -= value
+        for key, value in self.COUNTER_DELTAS.get(new_status, {}).items():
+            deltas[key] += value
+        Classroom.adjust_counts(self.classroom_id, **deltas)
+
+    def delete(self, *args, **kwargs):
+        counted_status = getattr(self, "_counted_status", self.status)
+        result = super().delete(*args, **kwargs)
+        self._shift_counters(counted_status, None)
+        self._counted_status = None
+        return result
+
+    def save(self, *args, **kwargs):
+        # Keep the waitlist timestamp/sequence in step with the status on every save
+        if self.status == self.STATUS_WAITLISTED and self.waitlist_seq is None:
+            self.waitlisted_at = timezone.now()
+            self.waitlist_seq = Classroom.next_waitlist_seq_for(self.classroom_id)
+        elif self.status != self.STATUS_WAITLISTED and self.waitlist_seq is not None:
+            self.waitlisted_at = None
+            self.waitlist_seq = None
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "status" in update_fields:
+            kwargs["update_fields"] = set(update_fields) | {"waitlisted_at", "waitlist_seq"}
+        # new rows count from nothing unless the caller already moved the counters (see enrollment.claim_seat)
+        counted_status = getattr(self, "_counted_status", None)
+        super().save(*args, **kwargs)
+        self._shift_counters(counted_status, self.status)
+        self._counted_status = self.status
     
     def __str__(self):
         return f"{self.student.username} - {self.classroom.title} ({self.status})"
 
 
+WAITLIST_POSITIONS_SQL = """
+    SELECT ranked.classroom_id, ranked.position FROM (
+        SELECT e.classroom_id, e.student_id,
+               ROW_NUMBER() OVER (PARTITION BY e.classroom_id ORDER BY e.waitlist_seq, e.id) AS position
+        FROM {table} e
+        JOIN {users} u ON u.id = e.student_id
+        WHERE u.role = %s AND e.status = %s AND e.classroom_id IN (
+            SELECT mine.classroom_id FROM {table} mine
+            WHERE mine.student_id = %s AND mine.status = %s {classroom_filter}
+        )
+    ) ranked
+    WHERE ranked.student_id = %s
+"""
+
+
+def waitlist_positions(student_id, classroom_ids=None):
+    """
+    Return {classroom_id: position} for every waitlist the student is on, in one query.
+
+    The student filter has to be applied after ROW_NUMBER() is computed over the
+    whole waitlist, which the ORM can't express, so this runs raw SQL. Only
+    students are ranked, like the teacher's waitlist queue.
+    """
+    params = ["student", Enrollment.STATUS_WAITLISTED, student_id, Enrollment.STATUS_WAITLISTED]
+    classroom_filter = ""
+    if classroom_ids is not None:
+        classroom_ids = list(classroom_ids)
+        if not classroom_ids:
+            return {}
+        classroom_filter = "AND mine.classroom_id IN (%s)" % ", ".join(["%s"] * len(classroom_ids))
+        params.extend(classroom_ids)
+    params.append(student_id)
+
+    sql = WAITLIST_POSITIONS_SQL.format(
+        table=Enrollment._meta.db_table,
+        users=Enrollment._meta.get_field("student").related_model._meta.db_table,
+        classroom_filter=classroom_filter,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return dict(cursor.fetchall())
+
+
 class LessonProgress(models.Model):
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name="lesson_progress")
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name="progress")
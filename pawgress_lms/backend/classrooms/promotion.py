@@ -0,0 +1,94 @@
+"""
+Waitlist promotion engine.
+
+Fills free seats in a classroom from the head of its waitlist in one locked
+batch: the classroom row is locked, free seats are read from its counter, the first N
+eligible waitlisted enrollments are locked in FIFO order and moved to enrolled
+with a single UPDATE. A ``waitlist_promoted`` signal is sent for every
+promoted student once the transaction commits.
+"""
+from django.db import transaction
+
+from .models import Classroom, Enrollment
+from .signals import waitlist_promoted
+from pawgress_lms import cache as catalogue_cache
+
+
+def _free_seats(classroom):
+    # the classroom row is locked, so its stored counter is current
+    return max(classroom.capacity - classroom.enrolled_count, 0)
+
+
+def promote_waitlist(classroom_id):
+    """Promote as many waitlisted students as there are free seats. Returns the promoted enrollments."""
+    with transaction.atomic():
+        classroom = Classroom.objects.select_for_update().filter(pk=classroom_id).first()
+        if classroom is None or classroom.status != "scheduled":
+            return []
+
+        free = _free_seats(classroom)
+        if free <= 0:
+            return []
+
+        # Students already sitting in another classroom of this course can't take a seat here
+        already_placed = Enrollment.objects.filter(
+            classroom__course_id=classroom.course_id,
+            status=Enrollment.STATUS_ENROLLED,
+        ).exclude(classroom_id=classroom.id).values("student_id")
+
+        head = list(
+            Enrollment.objects.select_for_update(of=("self",))
+            .filter(classroom=classroom, status=Enrollment.STATUS_WAITLISTED, student__role="student")
+            .exclude(student_id__in=already_placed)
+            .order_by(*Enrollment.WAITLIST_ORDER)[:free]
+        )
+        if not head:
+            return []
+
+        Enrollment.objects.filter(id__in=[enrollment.id for enrollment in head]).update(
+            status=Enrollment.STATUS_ENROLLED, waitlisted_at=None, waitlist_seq=None
+        )
+        Classroom.adjust_counts(classroom.id, enrolled=len(head), waitlisted=-len(head))
+        promoted_students = [enrollment.student_id for enrollment in head]
+        # the queryset update sends no signals, so invalidate the students' cached catalogue here
+        catalogue_cache.bump(*(catalogue_cache.user_scope(student_id) for student_id in promoted_students))
+        if classroom.course_id is not None:
+            # A promoted student no longer needs their place on the course's other waitlists
+            other_waitlists = Enrollment.objects.filter(
+                student_id__in=promoted_students,
+                classroom__course_id=classroom.course_id,
+                status=Enrollment.STATUS_WAITLISTED,
+            )
+            affected = set(other_waitlists.values_list("classroom_id", flat=True))
+            other_waitlists.delete()
+            Classroom.refresh_counts(affected)
+
+        for enrollment in head:
+            enrollment.status = Enrollment.STATUS_ENROLLED
+            enrollment.waitlisted_at = None
+            enrollment.waitlist_seq = None
+            transaction.on_commit(
+                lambda enrollment=enrollment: waitlist_promoted.send(
+                    sender=Enrollment,
+                    classroom=classroom,
+                    enrollment=enrollment,
+                    student_id=enrollment.student_id,
+                )
+            )
+        return head
+
+
+def promote_course_waitlists(course_id):
+    """Run promotion for every classroom of a course that has a waitlist. Returns {classroom_id: [enrollments]}."""
+    classroom_ids = (
+        Enrollment.objects.filter(classroom__course_id=course_id, status=Enrollment.STATUS_WAITLISTED)
+        .values_list("classroom_id", flat=True)
+        .distinct()
+        .order_by("classroom_id")
+    )
+    results = {}
+    for classroom_id in list(classroom_ids):
+        promoted = promote_waitlist(classroom_id)
+        if promoted:
+            results[classroom_id] = promoted
+    return results
@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
+from pawgress_lms.fieldsets import SparseFieldsetMixin
 from lessons.serializers import LessonSerializer
 from .models import Classroom, Enrollment
 from courses.models import Course, CourseEnrollment
@@ -279,7 +280,7 @@ class TeacherBriefSerializer(serializers.ModelSerializer):
         model = User
         fields = ("id", "username", "email", "first_name", "last_name")
 
-class ClassroomSerializer(serializers.ModelSerializer):
+class ClassroomSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     teacher_name = serializers.CharField(source='teacher.username', read_only=True)
     teacher_id = serializers.IntegerField(source='teacher.id', read_only=True)
     enrolled_students_count = serializers.SerializerMethodField()
@@ -300,11 +301,15 @@ class ClassroomSerializer(serializers.ModelSerializer):
         ]
 
     def get_enrolled_students_count(self, obj):
-        return obj.enrollments.filter(status=Enrollment.STATUS_ENROLLED).count()
+        return obj.enrolled_count
 
     def get_is_enrolled(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated and request.user.role == 'student':
+            # list views pass the student's enrolled classroom ids so this isn't a query per row
+            enrolled_ids = self.context.get('enrolled_classroom_ids')
+            if enrolled_ids is not None:
+                return obj.id in enrolled_ids
             return obj.enrollments.filter(
                 student=request.user,
                 status=Enrollment.STATUS_ENROLLED
@@ -0,0 +1,22 @@
+#this file is used for the signals sent by the classrooms app
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from pawgress_lms import cache as catalogue_cache
+
+# Sent once per student promoted off a waitlist, after the promotion is committed.
+# Arguments: classroom, enrollment, student_id
+waitlist_promoted = Signal()
+
+
+@receiver(post_save, sender="classrooms.Classroom")
+@receiver(post_delete, sender="classrooms.Classroom")
+def invalidate_classroom_catalogue(sender, instance, **kwargs):
+    catalogue_cache.bump(catalogue_cache.CLASSROOMS)
+
+
+@receiver(post_save, sender="classrooms.Enrollment")
+@receiver(post_delete, sender="classrooms.Enrollment")
+def invalidate_enrollment_catalogue(sender, instance, **kwargs):
+    # seat counts are shared, is_enrolled belongs to the student
+    catalogue_cache.bump(catalogue_cache.CLASSROOMS, catalogue_cache.user_scope(instance.student_id))
@@ -1,3 +1,259 @@
-from django.test import TestCase
+import datetime
+import threading
+import time
 
-# Create your tests here.
+from django.db import OperationalError, connection
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase, APITransactionTestCase
+from accounts.models import User
+from classrooms.models import Classroom, Enrollment
+from courses.models import Course
+
+STRESS_STUDENTS = 40
+
+class ClassroomWaitlistTests(APITestCase):
+
+    #setting up a teacher, a full classroom and a few students for the waitlist tests
+    def setUp(self):
+        self.teacher = User.objects.create_user(
+            email="teacher@cookieuniversity.com", password="teacher", role="teacher", is_approved=True
+        )
+        self.course = Course.objects.create(
+            title="V100 Vet Practical", description="Practical", teacher=self.teacher, status="published"
+        )
+        self.classroom = self.make_classroom("Practical A", capacity=1)
+        self.students = [
+            User.objects.create_user(email=f"student{n}@cookieuniversity.com", password="student", role="student")
+            for n in range(4)
+        ]
+
+    def make_classroom(self, title, capacity):
+        return Classroom.objects.create(
+            title=title, course=self.course, teacher=self.teacher, capacity=capacity,
+            class_start_date=datetime.date(2026, 11, 2), class_end_date=datetime.date(2026, 11, 16),
+            class_start_time=datetime.time(9, 0), class_end_time=datetime.time(10, 0),
+        )
+
+    def enroll(self, student, classroom):
+        self.client.force_authenticate(user=student)
+        return self.client.post(reverse("student-classroom-enroll", args=[classroom.id]))
+
+    #the waitlist is first in first out and positions move up when someone leaves
+    def test_waitlist_positions_are_fifo(self):
+        first, second, third, fourth = self.students
+        self.assertEqual(self.enroll(first, self.classroom).status_code, status.HTTP_201_CREATED)
+
+        response = self.enroll(second, self.classroom)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["waitlist_position"], 1)
+        self.assertEqual(self.enroll(third, self.classroom).data["waitlist_position"], 2)
+        self.assertEqual(self.enroll(fourth, self.classroom).data["waitlist_position"], 3)
+
+        self.client.force_authenticate(user=second)
+        self.client.delete(reverse("student-leave-waitlist", args=[self.classroom.id]))
+
+        self.client.force_authenticate(user=fourth)
+        response = self.client.get(reverse("student-my-waitlists"))
+        self.assertEqual(response.data[0]["position"], 2)
+        self.assertIsNotNone(response.data[0]["joined_date"])
+
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.get(reverse("teacher-classroom-waitlist", args=[self.classroom.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(entry["position"], entry["student_id"]) for entry in response.data["waitlist"]],
+            [(1, third.id), (2, fourth.id)],
+        )
+
+    #the positions for every waitlist a student is on come back from one query
+    def test_my_waitlists_positions_in_one_query(self):
+        other = self.make_classroom("Practical B", capacity=1)
+        first, second, third, _ = self.students
+        self.enroll(first, self.classroom)
+        self.enroll(second, self.classroom)
+        self.enroll(second, other)
+        self.enroll(third, self.classroom)
+        self.enroll(third, other)
+
+        self.client.force_authenticate(user=third)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("student-my-waitlists"))
+        positions = {entry["classroom_id"]: entry["position"] for entry in response.data}
+        self.assertEqual(positions, {self.classroom.id: 2, other.id: 1})
+        self.assertEqual(Enrollment.objects.get(student=third, classroom=self.classroom).waitlist_seq, 2)
+
+    #students list the open classrooms from the catalogue cache, seat counts and is_enrolled follow their enrolment
+    def test_student_available_classrooms(self):
+        first, second, _, _ = self.students
+        url = reverse("student-classrooms-available")
+        self.client.force_authenticate(user=first)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(row["id"], row["enrolled_students_count"], row["is_enrolled"]) for row in response.data],
+            [(self.classroom.id, 0, False)],
+        )
+
+        self.enroll(first, self.classroom)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(row["enrolled_students_count"], row["is_enrolled"]) for row in response.data], [(1, True)])
+        self.client.force_authenticate(user=second)
+        self.assertEqual([row["is_enrolled"] for row in self.client.get(url).data], [False])
+
+    #a staff member on the waitlist doesn't push students down, positions match the teacher's queue
+    def test_waitlist_positions_only_rank_students(self):
+        first, second, _, _ = self.students
+        self.enroll(first, self.classroom)
+        assistant = User.objects.create_user(
+            email="assistant@cookieuniversity.com", password="teacher", role="teacher", is_approved=True
+        )
+        Enrollment.objects.create(student=assistant, classroom=self.classroom, status=Enrollment.STATUS_WAITLISTED)
+
+        self.assertEqual(self.enroll(second, self.classroom).data["waitlist_position"], 1)
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.get(reverse("teacher-classroom-waitlist", args=[self.classroom.id]))
+        self.assertEqual(
+            [(entry["position"], entry["student_id"]) for entry in response.data["waitlist"]], [(1, second.id)]
+        )
+
+    #a seat freed by unenrolling goes to the head of the waitlist and a signal is sent
+    def test_unenroll_promotes_head_of_waitlist(self):
+        from classrooms.signals import waitlist_promoted
+
+        first, second, third, _ = self.students
+        for student in (first, second, third):
+            self.enroll(student, self.classroom)
+
+        promoted = []
+        def receiver(sender, student_id, **kwargs):
+            promoted.append(student_id)
+        waitlist_promoted.connect(receiver)
+        self.addCleanup(waitlist_promoted.disconnect, receiver)
+
+        self.client.force_authenticate(user=first)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(reverse("student-classroom-unenroll", args=[self.classroom.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(promoted, [second.id])
+        self.assertEqual(Enrollment.objects.get(student=second, classroom=self.classroom).status, Enrollment.STATUS_ENROLLED)
+        self.assertEqual(Enrollment.objects.get(student=third, classroom=self.classroom).status, Enrollment.STATUS_WAITLISTED)
+
+    #a student who takes a seat from the waitlist leaves the course's other waitlists
+    def test_seat_from_waitlist_drops_other_course_waitlists(self):
+        other = self.make_classroom("Practical B", capacity=1)
+        first, second, third, _ = self.students
+        self.enroll(first, self.classroom)
+        self.enroll(second, other)
+        self.enroll(third, self.classroom)
+        self.enroll(third, other)
+
+        Classroom.objects.filter(pk=other.pk).update(capacity=2)
+        self.assertEqual(self.enroll(third, other).status_code, status.HTTP_200_OK)
+        self.assertEqual(Enrollment.objects.get(student=third, classroom=other).status, Enrollment.STATUS_ENROLLED)
+        self.assertFalse(Enrollment.objects.filter(student=third, classroom=self.classroom).exists())
+        self.classroom.refresh_from_db()
+        self.assertEqual((self.classroom.enrolled_count, self.classroom.waitlisted_count), (1, 0))
+
+    #raising the capacity fills the new seats from the waitlist
+    def test_capacity_increase_promotes_waitlist(self):
+        for student in self.students:
+            self.enroll(student, self.classroom)
+
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.put(reverse("teacher-classroom-edit", args=[self.classroom.id]), {"capacity": 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["enrolled_students_count"], 3)
+        self.assertEqual(
+            list(Enrollment.objects.filter(status=Enrollment.STATUS_WAITLISTED).values_list("student_id", flat=True)),
+            [self.students[3].id],
+        )
+
+    #the stored counters follow enrol/waitlist/unenrol and the reconcile command repairs drift
+    def test_enrollment_counters_stay_in_step(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        first, second, third, _ = self.students
+        for student in (first, second, third):
+            self.enroll(student, self.classroom)
+        self.classroom.refresh_from_db()
+        self.assertEqual((self.classroom.enrolled_count, self.classroom.waitlisted_count), (1, 2))
+
+        self.client.force_authenticate(user=third)
+        self.client.delete(reverse("student-leave-waitlist", args=[self.classroom.id]))
+        self.client.force_authenticate(user=first)
+        self.client.delete(reverse("student-classroom-unenroll", args=[self.classroom.id]))
+        self.classroom.refresh_from_db()
+        self.assertEqual((self.classroom.enrolled_count, self.classroom.waitlisted_count), (1, 0))
+
+        Classroom.objects.filter(pk=self.classroom.pk).update(enrolled_count=7, waitlisted_count=3)
+        out = StringIO()
+        call_command("reconcile_classroom_counts", stdout=out)
+        self.assertIn("enrolled 7 -> 1", out.getvalue())
+        self.classroom.refresh_from_db()
+        self.assertEqual((self.classroom.enrolled_count, self.classroom.waitlisted_count), (1, 0))
+
+
+class ClassroomEnrollmentConcurrencyTests(APITransactionTestCase):
+
+    #a burst of parallel enroll requests fills the classroom exactly to capacity and waitlists the rest
+    def test_parallel_enrollment_never_oversubscribes(self):
+        teacher = User.objects.create_user(
+            email="rush.teacher@cookieuniversity.com", password="teacher", role="teacher", is_approved=True
+        )
+        course = Course.objects.create(title="V200 Rush", description="Rush", teacher=teacher, status="published")
+        classroom = Classroom.objects.create(
+            title="Rush A", course=course, teacher=teacher, capacity=5,
+            class_start_date=datetime.date(2026, 11, 2), class_end_date=datetime.date(2026, 11, 16),
+            class_start_time=datetime.time(9, 0), class_end_time=datetime.time(10, 0),
+        )
+        students = [
+            User.objects.create_user(email=f"rush{n}@cookieuniversity.com", password="student", role="student")
+            for n in range(STRESS_STUDENTS)
+        ]
+        url = reverse("student-classroom-enroll", args=[classroom.id])
+        barrier = threading.Barrier(len(students))
+        results, errors = [], []
+
+        def enroll(student):
+            client = APIClient()
+            client.force_authenticate(user=student)
+            try:
+                barrier.wait()
+                for attempt in range(50):
+                    try:
+                        results.append(client.post(url).status_code)
+                        break
+                    except OperationalError:
+                        # the sqlite stand-in locks whole tables, retry like a client would after a 503
+                        time.sleep(0.01 * (attempt + 1))
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=enroll, args=(student,)) for student in students]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(results), len(students))
+        self.assertTrue(all(code < 500 for code in results))
+        if connection.vendor == "postgresql":
+            # no lock retries on postgres, so every request got its first-time answer
+            self.assertEqual(results.count(status.HTTP_201_CREATED), 5)
+            self.assertEqual(results.count(status.HTTP_202_ACCEPTED), len(students) - 5)
+
+        rows = Enrollment.objects.filter(classroom=classroom)
+        self.assertEqual(rows.count(), len(students))
+        self.assertEqual(rows.filter(status=Enrollment.STATUS_ENROLLED).count(), 5)
+        classroom.refresh_from_db()
+        self.assertEqual((classroom.enrolled_count, classroom.waitlisted_count), (5, len(students) - 5))
+        self.assertEqual(
+            sorted(rows.filter(status=Enrollment.STATUS_WAITLISTED).values_list("waitlist_seq", flat=True)),
+            list(range(1, len(students) - 4)),
+        )
@@ -13,6 +13,7 @@ urlpatterns = [
     path('teacher/classrooms/<int:classroom_id>/allocate/', views.TeacherAllocateView.as_view(), name='teacher-classroom-allocate'),
     path('teacher/classrooms/<int:classroom_id>/waitlist/', views.TeacherClassroomWaitlistView.as_view(), name='teacher-classroom-waitlist'),
     path('teacher/all-waitlists/', views.TeacherAllWaitlistsView.as_view(), name='teacher-all-waitlists'),
+    path('teacher/courses/<int:course_id>/promote-waitlists/', views.TeacherCoursePromoteWaitlistsView.as_view(), name='teacher-course-promote-waitlists'),
     
     # Student URLs
     path('student/classrooms/available/', views.StudentAvailableClassroomsView.as_view(), name='student-classrooms-available'),
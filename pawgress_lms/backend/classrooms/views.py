@@ -2,7 +2,7 @@ from django.forms import ValidationError
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import get_user_model
 from django.db import IntegrityError, transaction, models
-from django.db.models import Count, Q, BooleanField, Case, When, F
+from django.db.models import Q, BooleanField, Case, When, F
 from rest_framework import generics, status
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
@@ -10,8 +10,13 @@ from rest_framework.views import APIView
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .models import Classroom, Enrollment, Waitlist
+from .models import Classroom, Enrollment, Waitlist, waitlist_positions
 from .serializer import ClassroomCreateSerializer, ClassroomSerializer
+from .promotion import promote_waitlist, promote_course_waitlists
+from . import enrollment as enrollment_service
+from pawgress_lms import cache as catalogue_cache
+from pawgress_lms.conditional import ConditionalGetMixin
+from courses.models import Course, CourseEnrollment
 
 User = get_user_model()
 
@@ -27,6 +32,7 @@ class ClassroomApiRoot(APIView):
             "teacher_classroom_create": f"{base}teacher/classrooms/create/",
             "teacher_classroom_allocate": f"{base}teacher/classrooms/<classroom_id>/allocate/",
             "teacher_classroom_waitlist": f"{base}teacher/classrooms/<classroom_id>/waitlist/",
+            "teacher_course_promote_waitlists": f"{base}teacher/courses/<course_id>/promote-waitlists/",
             "student_classrooms_available":f"{base}student/classrooms/available/",
             "student_classrooms_list": f"{base}student/classrooms/",
             "student_classroom_detail": f"{base}student/classrooms/<classroom_id>/",
@@ -35,33 +41,30 @@ class ClassroomApiRoot(APIView):
             "student_classroom_join_waitlist": f"{base}student/classrooms/<classroom_id>/join-waitlist/"
         })
 
-STUDENT_ENROLLED_FILTER = Q(
-    enrollments__status=Enrollment.STATUS_ENROLLED,
-    enrollments__student__role="student")
-
-WAITLIST_FILTER = Q(
-    enrollments__status=Enrollment.STATUS_WAITLISTED, 
-    enrollments__student__role="student")
-
 def annotate_occupancy(queryset):
+    # reads the stored counters, no per-row aggregation over enrollments
     annotated = queryset.annotate(
-        occupancy_count=Count("enrollments", filter=STUDENT_ENROLLED_FILTER, distinct=True),
-        waitlisted_count=Count("enrollments", filter=WAITLIST_FILTER, distinct=True),
-    ).annotate(
+        occupancy_count=F("enrolled_count"),
         has_space_flag=Case(
-            When(occupancy_count__lt=F("capacity"), then=models.Value(True)),
+            When(enrolled_count__lt=F("capacity"), then=models.Value(True)),
             default=models.Value(False),
             output_field=BooleanField(),
         )
     )
     return annotated
 
-def seats_left(classroom: Classroom) -> int:
-    current = classroom.enrollments.filter(
-        status=Enrollment.STATUS_ENROLLED,
-        student__role="student",
-    ).count()
-    return max(classroom.capacity - current, 0)
+def seats_left(classroom: Classroom, refresh: bool = False) -> int:
+    # refresh=True after changing enrollments in this request, the instance counters are stale by then
+    if refresh:
+        classroom.refresh_from_db(fields=["capacity", "enrolled_count", "waitlisted_count"])
+    return max(classroom.capacity - classroom.enrolled_count, 0)
+
+def enrolled_classroom_ids(user) -> set:
+    if getattr(user, "role", None) != "student":
+        return set()
+    return set(
+        Enrollment.objects.filter(student=user, status=Enrollment.STATUS_ENROLLED).values_list("classroom_id", flat=True)
+    )
 
 # TEACHER VIEWS
 class TeacherClassroomCreateView(generics.CreateAPIView):
@@ -79,13 +82,16 @@ class TeacherClassroomCreateView(generics.CreateAPIView):
         context['request'] = self.request
         return context
 
-class TeacherClassroomListView(generics.ListAPIView):
+class TeacherClassroomListView(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = ClassroomSerializer
     permission_classes = [IsAuthenticated]
     
+    def get_validator_scopes(self):
+        return [catalogue_cache.CLASSROOMS]
+
     def get_queryset(self):
         if self.request.user.role == 'teacher':
-            return Classroom.objects.all()
+            return Classroom.objects.select_related('teacher', 'course')
         return Classroom.objects.none()
     
     def get_serializer_context(self):
@@ -93,9 +99,18 @@ class TeacherClassroomListView(generics.ListAPIView):
         context['request'] = self.request
         return context
 
-class TeacherClassroomDetailView(APIView):
+class TeacherClassroomDetailView(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
     
+    def get_validator_scopes(self):
+        return [catalogue_cache.CLASSROOMS]
+
+    def is_detail_request(self):
+        return True
+
+    def get_validator_queryset(self):
+        return Classroom.objects.filter(id=self.kwargs["classroom_id"])
+
     def get(self, request, classroom_id):
         """Get classroom details for editing"""
         if request.user.role != 'teacher':
@@ -127,6 +142,10 @@ class TeacherClassroomDetailView(APIView):
             serializer = ClassroomSerializer(classroom, data=request.data, partial=True, context={'request': request})
             if serializer.is_valid():
                 serializer.save()
+                if 'capacity' in serializer.validated_data:
+                    # extra seats go straight to the head of the waitlist
+                    promote_waitlist(classroom.id)
+                    classroom.refresh_from_db(fields=["enrolled_count", "waitlisted_count"])
                 return Response(serializer.data)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         except Classroom.DoesNotExist:
@@ -212,6 +231,10 @@ class TeacherClassroomEditView(APIView):
             serializer = ClassroomSerializer(classroom, data=request.data, partial=True, context={'request': request})
             if serializer.is_valid():
                 serializer.save()
+                if 'capacity' in serializer.validated_data:
+                    # extra seats go straight to the head of the waitlist
+                    promote_waitlist(classroom.id)
+                    classroom.refresh_from_db(fields=["enrolled_count", "waitlisted_count"])
                 return Response(serializer.data)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         except Classroom.DoesNotExist:
@@ -260,7 +283,7 @@ class TeacherAllocateView(APIView):
         else:
             desired = Enrollment.STATUS_ENROLLED if left > 0 else Enrollment.STATUS_WAITLISTED
 
-        enroll = Enrollment.objects.filter(student=target, classroom=classroom).first()
+        enroll = Enrollment.objects.select_related("student").filter(student=target, classroom=classroom).first()
         if enroll:
             if enroll.status == desired:
                 msg = "Already enrolled." if desired == Enrollment.STATUS_ENROLLED else "Already waitlisted."
@@ -268,7 +291,7 @@ class TeacherAllocateView(APIView):
             enroll.status = desired
             enroll.save(update_fields=["status"])
             return Response(
-                {"detail": "Enrollment updated.", "status": desired, "seats_left": seats_left(classroom)},
+                {"detail": "Enrollment updated.", "status": desired, "seats_left": seats_left(classroom, refresh=True)},
                 status=status.HTTP_200_OK,
             )
 
@@ -277,7 +300,7 @@ class TeacherAllocateView(APIView):
             {
                 "detail": "Enrolled successfully." if desired == Enrollment.STATUS_ENROLLED else "Added to waitlist.",
                 "status": desired,
-                "seats_left": seats_left(classroom),
+                "seats_left": seats_left(classroom, refresh=True),
             },
             status=status.HTTP_201_CREATED if desired == Enrollment.STATUS_ENROLLED else status.HTTP_202_ACCEPTED,
         )
@@ -305,16 +328,17 @@ class TeacherClassroomWaitlistView(APIView):
             classroom=classroom,
             status=Enrollment.STATUS_WAITLISTED,
             student__role="student"
-        ).select_related('student').order_by('created_at')
+        ).select_related('student').order_by(*Enrollment.WAITLIST_ORDER)
         
         waitlist_data = []
-        for enrollment in waitlisted_enrollments:
+        for position, enrollment in enumerate(waitlisted_enrollments, start=1):
             waitlist_data.append({
                 'enrollment_id': enrollment.id,
+                'position': position,
                 'student_id': enrollment.student.id,
                 'student_name': f"{enrollment.student.first_name} {enrollment.student.last_name}",
                 'student_email': enrollment.student.email,
-                'joined_waitlist': enrollment.created_at,
+                'joined_waitlist': enrollment.waitlisted_at,
                 'student_username': enrollment.student.username
             })
         
@@ -366,7 +390,7 @@ class TeacherClassroomWaitlistView(APIView):
             )
         
         try:
-            enrollment = Enrollment.objects.get(
+            enrollment = Enrollment.objects.select_related("student").get(
                 classroom=classroom,
                 student=student,
                 status=Enrollment.STATUS_WAITLISTED
@@ -383,7 +407,7 @@ class TeacherClassroomWaitlistView(APIView):
         return Response({
             'detail': f'Successfully allocated {student.first_name} {student.last_name} to the classroom',
             'student_name': f"{student.first_name} {student.last_name}",
-            'seats_left': seats_left(classroom)
+            'seats_left': seats_left(classroom, refresh=True)
         }, status=status.HTTP_200_OK)
 
 class TeacherAllWaitlistsView(APIView):
@@ -399,25 +423,28 @@ class TeacherAllWaitlistsView(APIView):
         
         teacher_classrooms = Classroom.objects.filter(teacher=request.user)
         all_waitlists = []
+
+        # One ordered query for every waitlist, grouped per classroom in FIFO order
+        queues = {}
+        waitlisted_enrollments = Enrollment.objects.filter(
+            classroom__teacher=request.user,
+            status=Enrollment.STATUS_WAITLISTED,
+            student__role="student"
+        ).select_related('student').order_by('classroom_id', *Enrollment.WAITLIST_ORDER)
+        for enrollment in waitlisted_enrollments:
+            queue = queues.setdefault(enrollment.classroom_id, [])
+            queue.append({
+                'enrollment_id': enrollment.id,
+                'position': len(queue) + 1,
+                'student_id': enrollment.student.id,
+                'student_name': f"{enrollment.student.first_name} {enrollment.student.last_name}",
+                'student_email': enrollment.student.email,
+                'student_username': enrollment.student.username,
+                'joined_waitlist': enrollment.waitlisted_at,
+            })
         
         for classroom in teacher_classrooms:
-            waitlisted_enrollments = Enrollment.objects.filter(
-                classroom=classroom,
-                status=Enrollment.STATUS_WAITLISTED,
-                student__role="student"
-            ).select_related('student').order_by('id')
-            
-            waitlist_data = []
-            for enrollment in waitlisted_enrollments:
-                waitlist_data.append({
-                    'enrollment_id': enrollment.id,
-                    'student_id': enrollment.student.id,
-                    'student_name': f"{enrollment.student.first_name} {enrollment.student.last_name}",
-                    'student_email': enrollment.student.email,
-                    'student_username': enrollment.student.username,
-                    'joined_waitlist': enrollment.id,
-                })
-            
+            waitlist_data = queues.get(classroom.id, [])
             if waitlist_data:
                 all_waitlists.append({
                     'classroom_id': classroom.id,
@@ -432,7 +459,7 @@ class TeacherAllWaitlistsView(APIView):
             classroom__teacher=request.user,
             status=Enrollment.STATUS_WAITLISTED,
             student__role="student"
-        ).select_related('student', 'classroom').order_by('id')
+        ).select_related('student', 'classroom').order_by('waitlisted_at', 'id')
         
         global_waitlist = []
         for enrollment in all_students_on_waitlist:
@@ -444,7 +471,7 @@ class TeacherAllWaitlistsView(APIView):
                 'student_username': enrollment.student.username,
                 'current_classroom_title': enrollment.classroom.title,
                 'current_classroom_id': enrollment.classroom.id,
-                'joined_waitlist': enrollment.id,
+                'joined_waitlist': enrollment.waitlisted_at,
             })
         
         return Response({
@@ -510,7 +537,7 @@ class TeacherAllWaitlistsView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        target_enrollment = Enrollment.objects.filter(
+        target_enrollment = Enrollment.objects.select_related("student").filter(
             student=student,
             classroom=target_classroom
         ).first()
@@ -524,52 +551,108 @@ class TeacherAllWaitlistsView(APIView):
             else:
                 target_enrollment.status = Enrollment.STATUS_ENROLLED
                 target_enrollment.save()
-                Enrollment.objects.filter(
+                other_waitlists = Enrollment.objects.filter(
                     student=student,
                     classroom__teacher=request.user,
                     status=Enrollment.STATUS_WAITLISTED
-                ).exclude(id=target_enrollment.id).delete()
+                ).exclude(id=target_enrollment.id)
         else:
             Enrollment.objects.create(
                 student=student,
                 classroom=target_classroom,
                 status=Enrollment.STATUS_ENROLLED
             )
-            Enrollment.objects.filter(
+            other_waitlists = Enrollment.objects.filter(
                 student=student,
                 classroom__teacher=request.user,
                 status=Enrollment.STATUS_WAITLISTED
-            ).delete()
+            )
+        # bulk delete skips Enrollment.delete, so recount the classrooms it touched
+        affected_classrooms = set(other_waitlists.values_list("classroom_id", flat=True))
+        other_waitlists.delete()
+        Classroom.refresh_counts(affected_classrooms)
         
         return Response({
             'detail': f'Successfully allocated {student.first_name} {student.last_name} to {target_classroom.title}',
             'student_name': f"{student.first_name} {student.last_name}",
             'classroom_title': target_classroom.title,
-            'seats_left': seats_left(target_classroom)
+            'seats_left': seats_left(target_classroom, refresh=True)
+        }, status=status.HTTP_200_OK)
+
+class TeacherCoursePromoteWaitlistsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, course_id):
+        """Fill free seats from the waitlists of every classroom in a course"""
+        if request.user.role != 'teacher':
+            return Response(
+                {"detail": "Only teachers can promote waitlists"}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        course = get_object_or_404(Course, id=course_id)
+        is_course_teacher = course.teacher_id == request.user.id or CourseEnrollment.objects.filter(
+            user=request.user, course=course, role="teacher", status="active"
+        ).exists()
+        if not is_course_teacher:
+            return Response(
+                {"detail": "Only teachers of this course can promote its waitlists"}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        promoted = promote_course_waitlists(course.id)
+        return Response({
+            'course_id': course.id,
+            'promoted_count': sum(len(enrollments) for enrollments in promoted.values()),
+            'classrooms': [
+                {
+                    'classroom_id': classroom_id,
+                    'promoted_student_ids': [enrollment.student_id for enrollment in enrollments],
+                } for classroom_id, enrollments in promoted.items()
+            ]
         }, status=status.HTTP_200_OK)
 
 # STUDENT VIEWS
-class StudentAvailableClassroomsView(generics.ListAPIView):
+class StudentAvailableClassroomsView(ConditionalGetMixin, catalogue_cache.CatalogueCacheMixin, generics.ListAPIView):
     serializer_class = ClassroomSerializer
     permission_classes = [IsAuthenticated]
+    catalogue_scopes = [catalogue_cache.CLASSROOMS]
     
+    def get_validator_scopes(self):
+        return [catalogue_cache.CLASSROOMS]
+
     def get_queryset(self):
         if self.request.user.role != 'student':
             return Classroom.objects.none()
         
-        queryset = Classroom.objects.all()
+        queryset = Classroom.objects.select_related('teacher', 'course')
         annotated_queryset = annotate_occupancy(queryset)
         return annotated_queryset
     
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['request'] = self.request
+        context['enrolled_classroom_ids'] = enrolled_classroom_ids(self.request.user)
         return context
 
-class StudentMyClassroomsListView(generics.ListAPIView):
+    def use_catalogue_cache(self):
+        return super().use_catalogue_cache() and self.request.user.role == 'student'
+
+    def get_catalogue_rows(self):
+        # every student sees the same classrooms, is_enrolled comes from the serializer context
+        return catalogue_cache.get_or_build(
+            'open-classrooms',
+            [catalogue_cache.CLASSROOMS],
+            lambda: list(annotate_occupancy(Classroom.objects.select_related('teacher', 'course'))),
+        )
+
+class StudentMyClassroomsListView(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = ClassroomSerializer
     permission_classes = [IsAuthenticated]
     
+    def get_validator_scopes(self):
+        return [catalogue_cache.CLASSROOMS]
+
     def get_queryset(self):
         if self.request.user.role != 'student':
             return Classroom.objects.none()
@@ -577,21 +660,25 @@ class StudentMyClassroomsListView(generics.ListAPIView):
         queryset = Classroom.objects.filter(
             enrollments__student=self.request.user,
             enrollments__status=Enrollment.STATUS_ENROLLED
-        ).distinct()
+        ).select_related('teacher', 'course').distinct()
         
         return annotate_occupancy(queryset)
     
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['request'] = self.request
+        context['enrolled_classroom_ids'] = enrolled_classroom_ids(self.request.user)
         return context
 
-class StudentClassroomDetailView(generics.RetrieveAPIView):
+class StudentClassroomDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
     serializer_class = ClassroomSerializer
     permission_classes = [IsAuthenticated]
     lookup_field = 'id'
     lookup_url_kwarg = 'classroom_id'
     
+    def get_validator_scopes(self):
+        return [catalogue_cache.CLASSROOMS]
+
     def get_queryset(self):
         if self.request.user.role != 'student':
             return Classroom.objects.none()
@@ -605,8 +692,8 @@ class StudentClassroomDetailView(generics.RetrieveAPIView):
 
 class StudentEnrollView(APIView):
     permission_classes = [IsAuthenticated]
+    query_budget = 15
     
-    @transaction.atomic
     def post(self, request, classroom_id):
         """Enroll student in classroom or add to waitlist if full"""
         if request.user.role != 'student':
@@ -616,130 +703,39 @@ class StudentEnrollView(APIView):
             )
         
         classroom = get_object_or_404(Classroom, id=classroom_id)
+        # seats are taken with a conditional update, safe under a registration rush
+        outcome, enrollment = enrollment_service.enroll_student(request.user, classroom)
         
-        if hasattr(classroom, 'course'):
-            existing_enrollment_in_course = Enrollment.objects.filter(
-                student=request.user,
-                classroom__course=classroom.course,
-                status=Enrollment.STATUS_ENROLLED
-            ).exists()
-            
-            if existing_enrollment_in_course:
-                return Response({
-                    "detail": "You are already enrolled in a classroom for this course"
-                }, status=status.HTTP_400_BAD_REQUEST)
-        
-        existing_enrollment = Enrollment.objects.filter(
-            student=request.user,
-            classroom=classroom
-        ).first()
-        
-        available_seats = seats_left(classroom)
+        if outcome == enrollment_service.COURSE_CONFLICT:
+            return Response({
+                "detail": "You are already enrolled in a classroom for this course"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if outcome == enrollment_service.ALREADY_ENROLLED:
+            return Response({
+                "detail": "Already enrolled",
+            }, status=status.HTTP_200_OK)
+        if outcome == enrollment_service.PROMOTED:
+            return Response({
+                "detail": "Successfully enrolled (promoted from waitlist)",
+            }, status=status.HTTP_200_OK)
+        if outcome == enrollment_service.ALREADY_WAITLISTED:
+            return Response({
+                "detail": "Already on waitlist - classroom is full",
+                "available_seats": 0
+            }, status=status.HTTP_200_OK)
         
-        if existing_enrollment:
-            if existing_enrollment.status == Enrollment.STATUS_ENROLLED:
-                return Response({
-                    "detail": "Already enrolled",
-                }, status=status.HTTP_200_OK)
-            elif existing_enrollment.status == Enrollment.STATUS_WAITLISTED:
-                if available_seats > 0:
-                    existing_enrollment.status = Enrollment.STATUS_ENROLLED
-                    existing_enrollment.save()
-                    return Response({
-                        "detail": "Successfully enrolled (promoted from waitlist)",
-                    }, status=status.HTTP_200_OK)
-                else:
-                    return Response({
-                        "detail": "Already on waitlist - classroom is full",
-                        "available_seats": 0
-                    }, status=status.HTTP_200_OK)
-            else:
-                if available_seats > 0:
-                    existing_enrollment.status = Enrollment.STATUS_ENROLLED
-                    existing_enrollment.save()
-                    return Response({
-                        "detail": "Successfully enrolled",
-                    }, status=status.HTTP_200_OK)
-                else:
-                    existing_enrollment.status = Enrollment.STATUS_WAITLISTED
-                    existing_enrollment.save()
-                    return Response({
-                        "detail": "Classroom is full - added to waitlist",
-                        "available_seats": 0
-                    }, status=status.HTTP_202_ACCEPTED)
+        if outcome == enrollment_service.ENROLLED:
+            return Response({
+                "detail": "Successfully enrolled",
+                "available_seats": seats_left(classroom, refresh=True)
+            }, status=status.HTTP_201_CREATED)
         
-        try:
-            if available_seats > 0:
-                enrollment_status = Enrollment.STATUS_ENROLLED
-                detail_message = "Successfully enrolled"
-                response_status = status.HTTP_201_CREATED
-            else:
-                enrollment_status = Enrollment.STATUS_WAITLISTED
-                detail_message = "Classroom is full - added to waitlist"
-                response_status = status.HTTP_202_ACCEPTED
-            
-            enrollment = Enrollment.objects.create(
-                student=request.user,
-                classroom=classroom,
-                status=enrollment_status
-            )
-            
-            response_data = {
-                "detail": detail_message,
-                "available_seats": seats_left(classroom)
-            }
-            
-            if enrollment_status == Enrollment.STATUS_WAITLISTED:
-                try:
-                    if hasattr(enrollment, 'created_at'):
-                        waitlist_position = Enrollment.objects.filter(
-                            classroom=classroom,
-                            status=Enrollment.STATUS_WAITLISTED,
-                            created_at__lte=enrollment.created_at
-                        ).count()
-                    else:
-                        waitlist_position = Enrollment.objects.filter(
-                            classroom=classroom,
-                            status=Enrollment.STATUS_WAITLISTED
-                        ).count()
-                except AttributeError:
-                    waitlist_position = Enrollment.objects.filter(
-                        classroom=classroom,
-                        status=Enrollment.STATUS_WAITLISTED
-                    ).count()
-                
-                response_data["waitlist_position"] = waitlist_position
-            
-            return Response(response_data, status=response_status)
-            
-        except IntegrityError:
-            existing_enrollment = Enrollment.objects.get(
-                student=request.user,
-                classroom=classroom
-            )
-            if existing_enrollment.status == Enrollment.STATUS_ENROLLED:
-                return Response({
-                    "detail": "Already enrolled",
-                }, status=status.HTTP_200_OK)
-            elif existing_enrollment.status == Enrollment.STATUS_WAITLISTED:
-                return Response({
-                    "detail": "Already on waitlist",
-                    "available_seats": seats_left(classroom)
-                }, status=status.HTTP_200_OK)
-            else:
-                if available_seats > 0:
-                    existing_enrollment.status = Enrollment.STATUS_ENROLLED
-                    existing_enrollment.save()
-                    return Response({
-                        "detail": "Successfully enrolled",
-                    }, status=status.HTTP_200_OK)
-                else:
-                    existing_enrollment.status = Enrollment.STATUS_WAITLISTED
-                    existing_enrollment.save()
-                    return Response({
-                        "detail": "Classroom is full - added to waitlist",
-                        "available_seats": 0
-                    }, status=status.HTTP_202_ACCEPTED)
+        positions = waitlist_positions(request.user.id, [classroom.id])
+        return Response({
+            "detail": "Classroom is full - added to waitlist",
+            "available_seats": seats_left(classroom, refresh=True),
+            "waitlist_position": positions.get(classroom.id),
+        }, status=status.HTTP_202_ACCEPTED)
 
 class StudentUnenrollView(APIView):
     permission_classes = [IsAuthenticated]
@@ -756,13 +752,15 @@ class StudentUnenrollView(APIView):
         classroom = get_object_or_404(Classroom, id=classroom_id)
         
         try:
-            enrollment = Enrollment.objects.get(
+            enrollment = Enrollment.objects.select_related("student").get(
                 student=request.user, 
                 classroom=classroom
             )
             
             if enrollment.status == Enrollment.STATUS_ENROLLED:
                 enrollment.delete()
+                # the freed seat goes to the head of the waitlist
+                promote_waitlist(classroom.id)
                 return Response({
                     "detail": "Successfully unenrolled"
                 }, status=status.HTTP_200_OK)
@@ -802,7 +800,7 @@ class StudentJoinWaitlistView(APIView):
                     "detail": "You are already enrolled in a classroom for this course"
                 }, status=status.HTTP_400_BAD_REQUEST)
         
-        existing_enrollment = Enrollment.objects.filter(
+        existing_enrollment = Enrollment.objects.select_related("student").filter(
             student=request.user,
             classroom=classroom
         ).first()
@@ -830,32 +828,16 @@ class StudentJoinWaitlistView(APIView):
                 status=Enrollment.STATUS_WAITLISTED
             )
             
-            try:
-                if hasattr(enrollment, 'created_at'):
-                    waitlist_position = Enrollment.objects.filter(
-                        classroom=classroom,
-                        status=Enrollment.STATUS_WAITLISTED,
-                        created_at__lte=enrollment.created_at
-                    ).count()
-                else:
-                    waitlist_position = Enrollment.objects.filter(
-                        classroom=classroom,
-                        status=Enrollment.STATUS_WAITLISTED
-                    ).count()
-            except AttributeError:
-                waitlist_position = Enrollment.objects.filter(
-                    classroom=classroom,
-                    status=Enrollment.STATUS_WAITLISTED
-                ).count()
+            positions = waitlist_positions(request.user.id, [classroom.id])
             
             return Response({
                 "detail": "Successfully joined the waitlist",
-                "waitlist_position": waitlist_position,
-                "available_seats": seats_left(classroom)
+                "waitlist_position": positions.get(classroom.id),
+                "available_seats": seats_left(classroom, refresh=True)
             }, status=status.HTTP_201_CREATED)
             
         except IntegrityError:
-            existing_enrollment = Enrollment.objects.get(
+            existing_enrollment = Enrollment.objects.select_related("student").get(
                 student=request.user,
                 classroom=classroom
             )
@@ -885,7 +867,7 @@ class StudentLeaveWaitlistView(APIView):
         classroom = get_object_or_404(Classroom, id=classroom_id)
         
         try:
-            enrollment = Enrollment.objects.get(
+            enrollment = Enrollment.objects.select_related("student").get(
                 student=request.user,
                 classroom=classroom,
                 status=Enrollment.STATUS_WAITLISTED
@@ -917,36 +899,16 @@ class StudentMyWaitlistsView(APIView):
             status=Enrollment.STATUS_WAITLISTED
         ).select_related('classroom')
         
+        # Positions for every waitlist in a single ROW_NUMBER() query
+        positions = waitlist_positions(request.user.id)
+        
         waitlist_data = []
         for enrollment in waitlists:
-            try:
-                if hasattr(enrollment, 'created_at'):
-                    position = Enrollment.objects.filter(
-                        classroom=enrollment.classroom,
-                        status=Enrollment.STATUS_WAITLISTED,
-                        created_at__lte=enrollment.created_at
-                    ).count()
-                    joined_date = enrollment.created_at
-                else:
-                    position = Enrollment.objects.filter(
-                        classroom=enrollment.classroom,
-                        status=Enrollment.STATUS_WAITLISTED,
-                        id__lte=enrollment.id
-                    ).count()
-                    joined_date = None
-            except AttributeError:
-                position = Enrollment.objects.filter(
-                    classroom=enrollment.classroom,
-                    status=Enrollment.STATUS_WAITLISTED,
-                    id__lte=enrollment.id
-                ).count()
-                joined_date = None
-            
             waitlist_data.append({
                 'classroom_id': enrollment.classroom.id,
                 'classroom_title': enrollment.classroom.title,
-                'joined_date': joined_date,
-                'position': position
+                'joined_date': enrollment.waitlisted_at,
+                'position': positions.get(enrollment.classroom_id)
             })
         
         return Response(waitlist_data, status=status.HTTP_200_OK)
@@ -0,0 +1,216 @@
+"""
+Gradebook exports: one row per enrolled student, a grade and completion time
+per lesson, then their completed credits and GPA.
+
+Rows are produced by a generator that walks two ordered, server-side cursors
+(``iterator(chunk_size=...)``) side by side: the course's students and the
+course's completions, both sorted by student id. Nothing holds more than one
+chunk of either, so memory stays flat however big the cohort is.
+
+* ``csv_stream`` turns the rows into CSV lines for a ``StreamingHttpResponse``;
+* ``write_xlsx`` writes them into a write-only openpyxl workbook (an optional
+  dependency, ``pip install openpyxl``);
+* ``write_export`` is the university-wide version used by the
+  ``export_gradebook`` command and the admin export endpoint: every course
+  into one file under ``MEDIA_ROOT/exports/`` (a zip of CSVs, one per course,
+  or one XLSX sheet per course). It writes to a ``.part`` file and renames it
+  when done, so a listed export is always complete.
+"""
+import csv
+import datetime
+import io
+import os
+import secrets
+import threading
+import zipfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.utils import timezone
+
+from lessons.grading import GRADE_POINTS, effective_credit
+from lessons.models import LessonCompletion
+
+from .models import Course
+
+CHUNK_SIZE = 2000
+FORMATS = ("csv", "xlsx")
+EXPORT_DIR = "exports"
+
+# cells starting with these are run as formulas by spreadsheet apps
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _text(value):
+    value = value or ""
+    return "'" + value if value.startswith(_FORMULA_PREFIXES) else value
+
+
+def gradebook_header(lessons):
+    columns = ["student_id", "email", "first_name", "last_name"]
+    for lesson in lessons:
+        label = f"{_text(lesson.title)} (#{lesson.id})"
+        columns += [f"{label} grade", f"{label} completed_at"]
+    return columns + ["completed_lessons", "completed_credits", "gpa"]
+
+
+def gradebook_rows(course, chunk_size=CHUNK_SIZE):
+    """Yield the header, then one row per active student of ``course`` in id order."""
+    lessons = list(course.lessons.order_by("id").only("id", "title", "credit_value"))
+    yield gradebook_header(lessons)
+
+    students = get_user_model().objects.filter(
+        course_enrollments__course=course,
+        course_enrollments__role="student",
+        course_enrollments__status="active",
+    ).order_by("id").values_list("id", "email", "first_name", "last_name").distinct().iterator(chunk_size=chunk_size)
+    completions = LessonCompletion.objects.filter(lesson__course=course).order_by("student_id", "lesson_id").values_list(
+        "student_id", "lesson_id", "grade", "completed_at"
+    ).iterator(chunk_size=chunk_size)
+
+    credits = {lesson.id: lesson.credit_value for lesson in lessons}
+    pending = next(completions, None)
+    for student_id, email, first_name, last_name in students:
+        # completions of students who aren't (or no longer) enrolled are skipped
+        while pending is not None and pending[0] < student_id:
+            pending = next(completions, None)
+        done = {}
+        while pending is not None and pending[0] == student_id:
+            done[pending[1]] = pending
+            pending = next(completions, None)
+
+        row = [student_id, _text(email), _text(first_name), _text(last_name)]
+        completed_credits = credit_total = grade_points = 0.0
+        for lesson in lessons:
+            completion = done.get(lesson.id)
+            if completion is None:
+                row += ["", ""]
+                continue
+            _, _, grade, completed_at = completion
+            row += [grade or "", completed_at.isoformat() if completed_at else ""]
+            completed_credits += float(credits[lesson.id] or 0.0)
+            if grade:
+                credit = effective_credit(credits[lesson.id])
+                credit_total += credit
+                grade_points += GRADE_POINTS[grade] * credit
+        gpa = round(grade_points / credit_total, 2) if credit_total else ""
+        yield row + [len(done), completed_credits, gpa]
+
+
+class _Echo:
+    """A file-like object that hands back what csv.writer writes to it."""
+
+    def write(self, value):
+        return value
+
+
+def csv_stream(rows):
+    writer = csv.writer(_Echo())
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def write_csv(rows, handle):
+    writer = csv.writer(handle)
+    for row in rows:
+        writer.writerow(row)
+
+
+def load_openpyxl():
+    """openpyxl, or None when it isn't installed."""
+    try:
+        import openpyxl
+    except ImportError:
+        return None
+    return openpyxl
+
+
+def write_xlsx(sheets, target):
+    """Write ``(title, rows)`` pairs as sheets of a write-only workbook saved to ``target``."""
+    openpyxl = load_openpyxl()
+    if openpyxl is None:
+        raise RuntimeError("XLSX export needs openpyxl (pip install openpyxl)")
+    workbook = openpyxl.Workbook(write_only=True)
+    for title, rows in sheets:
+        sheet = workbook.create_sheet(title=_sheet_title(title))
+        for row in rows:
+            sheet.append(row)
+    workbook.save(target)
+
+
+def _sheet_title(title):
+    # excel sheet names: 31 chars, none of []:*?/\
+    return "".join("_" if char in "[]:*?/\\" else char for char in title)[:31] or "Sheet"
+
+
+def course_file_name(course, export_format):
+    slug = "".join(char if char.isalnum() else "-" for char in course.title.lower()).strip("-")
+    return f"gradebook-{course.id}-{slug[:40]}.{export_format}"
+
+
+def export_dir():
+    return os.path.join(settings.MEDIA_ROOT, EXPORT_DIR)
+
+
+def new_export_name(export_format):
+    # the random part keeps the file name from being guessed
+    extension = "zip" if export_format == "csv" else export_format
+    return f"gradebook-{timezone.now():%Y%m%d-%H%M%S}-{secrets.token_hex(6)}.{extension}"
+
+
+def write_export(name, export_format="csv", course_ids=None, chunk_size=CHUNK_SIZE):
+    """Export the gradebook of every course (or ``course_ids``) to ``exports/<name>``, returns the path."""
+    courses = Course.objects.order_by("id")
+    if course_ids:
+        courses = courses.filter(id__in=course_ids)
+    os.makedirs(export_dir(), exist_ok=True)
+    path = os.path.join(export_dir(), name)
+    partial = path + ".part"
+    try:
+        if export_format == "xlsx":
+            write_xlsx(
+                ((f"{course.id} {course.title}", gradebook_rows(course, chunk_size)) for course in courses.iterator()),
+                partial,
+            )
+        else:
+            with zipfile.ZipFile(partial, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+                for course in courses.iterator():
+                    with archive.open(course_file_name(course, "csv"), "w") as member:
+                        with io.TextIOWrapper(member, encoding="utf-8", newline="") as handle:
+                            write_csv(gradebook_rows(course, chunk_size), handle)
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return path
+
+
+def start_export(export_format="csv", course_ids=None):
+    """Run ``write_export`` on a background thread, returns the file name it will have."""
+    name = new_export_name(export_format)
+
+    def run():
+        try:
+            write_export(name, export_format, course_ids)
+        finally:
+            # the thread opened its own connection
+            connection.close()
+
+    threading.Thread(target=run, name=f"export-{name}", daemon=True).start()
+    return name
+
+
+def finished_exports():
+    """Completed export files, newest first."""
+    try:
+        entries = list(os.scandir(export_dir()))
+    except FileNotFoundError:
+        return []
+    files = [entry for entry in entries if entry.is_file() and not entry.name.endswith(".part")]
+    files.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    return [
+        {"name": entry.name, "size": entry.stat().st_size,
+         "created_at": datetime.datetime.fromtimestamp(entry.stat().st_mtime, tz=datetime.timezone.utc)}
+        for entry in files
+    ]
@@ -0,0 +1,36 @@
+"""
+Export the gradebook of every course (students x lessons, with grades,
+completion times, credits and GPA) into MEDIA_ROOT/exports/.
+
+CSV exports are a zip with one file per course, XLSX exports one sheet per
+course (needs openpyxl). Rows are streamed from the database in chunks, so
+this is safe to run for the whole university, e.g. from cron or with nohup.
+
+Run via:
+  python manage.py export_gradebook                      # every course, csv
+  python manage.py export_gradebook --format xlsx
+  python manage.py export_gradebook --course 12 --course 15
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from courses import export
+
+
+class Command(BaseCommand):
+    help = "Export every course's gradebook to a file under MEDIA_ROOT/exports."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=export.FORMATS, default="csv", dest="export_format")
+        parser.add_argument("--course", type=int, action="append", dest="courses",
+                            help="Only export this course id (can be repeated)")
+        parser.add_argument("--name", help="File name inside the exports directory (default: timestamped)")
+        parser.add_argument("--chunk-size", type=int, default=export.CHUNK_SIZE,
+                            help="Rows fetched from the database at a time")
+
+    def handle(self, *args, **options):
+        export_format = options["export_format"]
+        if export_format == "xlsx" and export.load_openpyxl() is None:
+            raise CommandError("XLSX export needs openpyxl (pip install openpyxl)")
+        name = options["name"] or export.new_export_name(export_format)
+        path = export.write_export(name, export_format, options["courses"], options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Gradebook exported to {path}"))
@@ -0,0 +1,41 @@
+"""
+Rebuild the materialized gradebook (GradebookEntry) and the course grade
+summaries from LessonCompletion.
+
+The rows are normally kept up to date by the LessonCompletion signals; run
+this after bulk loads or raw SQL changes that bypassed them.
+
+Run via:
+  python manage.py rebuild_gradebook                 # every course
+  python manage.py rebuild_gradebook --course 12 --course 15
+"""
+from django.core.management.base import BaseCommand
+
+from courses.models import Course, CourseGradeSummary, GradebookEntry
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per student gradebook and per course grade summaries from lesson completions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--course", type=int, action="append", dest="courses",
+                            help="Only rebuild this course id (can be repeated)")
+        parser.add_argument("--batch-size", type=int, default=500,
+                            help="Courses rebuilt per grouped query")
+
+    def handle(self, *args, **options):
+        course_ids = options["courses"] or list(Course.objects.order_by("id").values_list("id", flat=True))
+
+        entries = 0
+        for chunk in _chunks(course_ids, options["batch_size"]):
+            entries += GradebookEntry.rebuild(course_ids=chunk)
+            CourseGradeSummary.rebuild(chunk)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {entries} gradebook entries across {len(course_ids)} courses."
+        ))
@@ -0,0 +1,25 @@
+"""
+Rebuild the full-text search index of courses and lessons.
+
+The index is maintained by database triggers (see courses/search.py), so
+this is only needed after restoring a dump without them or if the SQLite
+index ever gets out of step. It reinstalls the triggers and refills the
+index from the tables.
+
+Run via:
+  python manage.py rebuild_search_index
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from courses import search
+
+
+class Command(BaseCommand):
+    help = "Reinstall and refill the course and lesson full-text search index."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            for kind in search.KINDS:
+                search.install(connection, kind)
+        self.stdout.write(self.style.SUCCESS(f"Search index rebuilt on {connection.vendor}."))
@@ -0,0 +1,72 @@
+"""
+Roll a faculty's courses over to a new semester: every course is cloned as
+a draft with its lessons and prerequisites (and, with --shift-days, its
+classrooms moved that many days later), all in one transaction.
+
+There is no faculty model, a faculty is the teachers who run its courses.
+Archived courses are left behind unless they are named with --course.
+
+Run via:
+  python manage.py rollover_courses --teacher a@uni.edu --teacher b@uni.edu --title-suffix " (2027 S1)"
+  python manage.py rollover_courses --course 12 --course 15 --shift-days 182
+  python manage.py rollover_courses --all --shift-days 182 --dry-run
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from courses.models import Course
+from courses.rollover import MAX_SHIFT_DAYS, clone_courses
+
+
+class DryRun(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Clone a faculty's courses (lessons, prerequisites and optionally classrooms) for a new semester."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--teacher", action="append", dest="teachers", default=[],
+                            help="Email of a teacher whose courses are rolled over (can be repeated)")
+        parser.add_argument("--course", type=int, action="append", dest="courses", default=[],
+                            help="Also roll over this course id (can be repeated)")
+        parser.add_argument("--all", action="store_true", help="Roll over every course that isn't archived")
+        parser.add_argument("--title-suffix", default="", help='Appended to every title, e.g. " (2027 S1)"')
+        parser.add_argument("--shift-days", type=int,
+                            help="Also copy the classrooms, this many days later")
+        parser.add_argument("--dry-run", action="store_true", help="Clone inside a transaction and roll it back")
+
+    def handle(self, *args, **options):
+        if not (options["teachers"] or options["courses"] or options["all"]):
+            raise CommandError("Name the courses with --teacher, --course or --all")
+
+        if options["shift_days"] is not None and abs(options["shift_days"]) > MAX_SHIFT_DAYS:
+            raise CommandError(f"--shift-days can be at most {MAX_SHIFT_DAYS} days either way")
+
+        course_ids = set(options["courses"])
+        if options["all"] or options["teachers"]:
+            courses = Course.objects.exclude(status="archived")
+            if not options["all"]:
+                emails = [email.strip().lower() for email in options["teachers"]]
+                teachers = dict(get_user_model().objects.filter(email__in=emails).values_list("email", "id"))
+                missing = sorted(set(emails) - set(teachers))
+                if missing:
+                    raise CommandError(f"No user with email {', '.join(missing)}")
+                courses = courses.filter(teacher_id__in=teachers.values())
+            course_ids.update(courses.values_list("id", flat=True))
+
+        try:
+            with transaction.atomic():
+                summary = clone_courses(sorted(course_ids), title_suffix=options["title_suffix"],
+                                        shift_days=options["shift_days"])
+                if options["dry_run"]:
+                    raise DryRun
+        except DryRun:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Would clone' if options['dry_run'] else 'Cloned'} {len(summary['courses'])} courses with "
+            f"{summary['lessons']} lessons, {summary['prerequisites']} prerequisite links and "
+            f"{summary['classrooms']} classrooms."
+        ))
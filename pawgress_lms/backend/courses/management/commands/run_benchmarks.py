@@ -0,0 +1,174 @@
+"""
+Benchmark the key API endpoints through the DRF test client.
+
+Each endpoint is called --iterations times as a representative user and the
+latency percentiles, query count and peak Python memory are written to a
+JSON file. Passing --compare with an earlier file reports every endpoint
+that regressed by more than --threshold and exits non-zero.
+
+Run via:
+  python manage.py seed_university --students 2000 --courses 200 --completions 50000
+  python manage.py run_benchmarks --output bench_baseline.json
+  python manage.py run_benchmarks --compare bench_baseline.json
+"""
+import json
+import statistics
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from classrooms.models import Classroom, Enrollment
+from courses.models import Course, CourseEnrollment
+
+User = get_user_model()
+
+
+def _endpoints(student, teacher, admin, course, classroom):
+    """(name, user, url) for every endpoint in the benchmark."""
+    endpoints = [
+        ("course-list (student)", student, reverse("course-list")),
+        ("available-courses (student)", student, reverse("available-courses")),
+        ("course-list (teacher)", teacher, reverse("course-list")),
+        ("lesson-list (student)", student, reverse("lesson-list", args=[course.id])),
+        ("course-gpa (student)", student, reverse("course-gpa", args=[course.id])),
+        ("bulk-gpa (student)", student, reverse("bulk-gpa")),
+        ("my-lesson-completions (student)", student, reverse("my-lesson-completions")),
+        ("student-classrooms-available", student, reverse("student-classrooms-available")),
+        ("student-my-waitlists", student, reverse("student-my-waitlists")),
+        ("teacher-all-waitlists", teacher, reverse("teacher-all-waitlists")),
+        ("course-students (teacher)", teacher, reverse("course-students", args=[course.id])),
+        ("report-course-completion", teacher, reverse("report-course-completion", args=[course.id])),
+        ("report-courses-batch (teacher)", teacher, reverse("report-courses-batch")),
+        ("report-university-counts", admin, reverse("report-university-counts")),
+        ("user-list (admin)", admin, reverse("user-list")),
+    ]
+    if classroom is not None:
+        endpoints.append(
+            ("teacher-classroom-waitlist", classroom.teacher, reverse("teacher-classroom-waitlist", args=[classroom.id]))
+        )
+    return endpoints
+
+
+class Command(BaseCommand):
+    help = "Benchmark key API endpoints and record latency, query counts and peak memory as JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument("--output", help="Write the results to this JSON file")
+        parser.add_argument("--compare", help="Baseline JSON file to compare the results against")
+        parser.add_argument("--threshold", type=float, default=0.2,
+                            help="Allowed relative regression before an endpoint is reported (default 20%%)")
+        parser.add_argument("--filter", default="", help="Only run endpoints whose name contains this text")
+
+    def handle(self, *args, **options):
+        student, teacher, admin, course, classroom = self._pick_subjects()
+        # Broken endpoints should show up as failed results, not abort the run
+        client = APIClient(raise_request_exception=False)
+        results = {}
+
+        for name, user, url in _endpoints(student, teacher, admin, course, classroom):
+            if options["filter"] not in name:
+                continue
+            client.force_authenticate(user=user)
+            for _ in range(options["warmup"]):
+                client.get(url)
+
+            timings, queries = [], []
+            tracemalloc.start()
+            for _ in range(options["iterations"]):
+                with CaptureQueriesContext(connection) as captured:
+                    start = time.perf_counter()
+                    response = client.get(url)
+                    timings.append((time.perf_counter() - start) * 1000)
+                queries.append(len(captured.captured_queries))
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            if response.status_code >= 400:
+                self.stderr.write(f"{name}: HTTP {response.status_code}")
+            timings.sort()
+            results[name] = {
+                "url": url,
+                "status": response.status_code,
+                "p50_ms": round(statistics.median(timings), 3),
+                "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+                "max_ms": round(timings[-1], 3),
+                "queries": max(queries),
+                "peak_memory_kb": round(peak / 1024, 1),
+                "response_bytes": len(response.content),
+            }
+            self.stdout.write(
+                f"{name:40} p50 {results[name]['p50_ms']:9.2f} ms  "
+                f"queries {results[name]['queries']:5}  peak {results[name]['peak_memory_kb']:9.1f} KB"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w") as handle:
+                json.dump({"dataset": self._dataset_size(), "results": results}, handle, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if options["compare"]:
+            self._compare(results, options["compare"], options["threshold"])
+
+    def _pick_subjects(self):
+        # The busiest student and teacher give the most representative numbers
+        student = (
+            User.objects.filter(role="student", is_active=True)
+            .annotate(n=Count("course_enrollments")).order_by("-n", "id").first()
+        )
+        teacher = (
+            User.objects.filter(role="teacher", is_active=True)
+            .annotate(n=Count("courses")).order_by("-n", "id").first()
+        )
+        admin = User.objects.filter(is_superuser=True).first()
+        if not (student and teacher and admin):
+            raise CommandError("Need at least one student, teacher and admin, run seed_university first.")
+
+        enrollment = CourseEnrollment.objects.filter(user=student, role="student").select_related("course").first()
+        course = enrollment.course if enrollment else Course.objects.filter(teacher=teacher).first()
+        if course is None:
+            raise CommandError("No courses found, run seed_university first.")
+        classroom = (
+            Classroom.objects.filter(enrollments__status=Enrollment.STATUS_WAITLISTED)
+            .select_related("teacher").exclude(teacher=None).first()
+        )
+        return student, teacher, admin, course, classroom
+
+    def _dataset_size(self):
+        from lessons.models import Lesson, LessonCompletion
+        return {
+            "users": User.objects.count(),
+            "courses": Course.objects.count(),
+            "lessons": Lesson.objects.count(),
+            "completions": LessonCompletion.objects.count(),
+            "classrooms": Classroom.objects.count(),
+            "classroom_enrollments": Enrollment.objects.count(),
+        }
+
+    def _compare(self, results, baseline_path, threshold):
+        with open(baseline_path) as handle:
+            baseline = json.load(handle)["results"]
+
+        regressions = []
+        for name, current in results.items():
+            previous = baseline.get(name)
+            if previous is None:
+                continue
+            for metric in ("p50_ms", "p95_ms", "queries", "peak_memory_kb"):
+                before, after = previous[metric], current[metric]
+                if before and (after - before) / before > threshold:
+                    regressions.append(f"{name}: {metric} {before} -> {after}")
+
+        if regressions:
+            for line in regressions:
+                self.stderr.write(line)
+            raise CommandError(f"{len(regressions)} regression(s) against {baseline_path}")
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {baseline_path}"))
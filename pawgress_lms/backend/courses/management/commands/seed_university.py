@@ -0,0 +1,288 @@
+"""
+Generate a synthetic, university-sized dataset for benchmarking.
+
+Unlike dummy_users/dummy_courses/dummy_lessons (a handful of rows, one
+create() each), everything here is written with bulk_create in batches, so
+the full default dataset is feasible on a laptop Postgres.
+
+Run via:
+  python manage.py seed_university --students 50000 --teachers 2000 --courses 5000 \
+      --lessons-per-course 20 --completions 2000000
+
+All generated accounts use the email prefix given by --prefix so the data can
+be removed again with --reset.
+"""
+import random
+from datetime import date, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from classrooms.models import Classroom, Enrollment
+from courses.models import Course, CourseEnrollment, CourseGradeSummary, GradebookEntry
+from lessons.models import Lesson, LessonCompletion
+from lessons.prerequisites import rebuild_course_closures
+from pawgress_lms import cache as catalogue_cache
+
+User = get_user_model()
+
+GRADES = ["HD", "D", "C", "P", "F"]
+CREDIT_CHOICES = [0.5, 1.0, 1.5, 2.0]
+SUBJECTS = [
+    "Anatomy", "Physiology", "Pharmacology", "Surgery", "Pathology", "Parasitology",
+    "Radiology", "Anaesthesia", "Nutrition", "Epidemiology", "Dermatology", "Dentistry",
+]
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = "Bulk-generate a synthetic university dataset (users, courses, lessons, completions, classrooms)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=50000)
+        parser.add_argument("--teachers", type=int, default=2000)
+        parser.add_argument("--courses", type=int, default=5000)
+        parser.add_argument("--lessons-per-course", type=int, default=20)
+        parser.add_argument("--max-prerequisites", type=int, default=2,
+                            help="Maximum prerequisites per lesson (always earlier lessons, so the graph is a DAG)")
+        parser.add_argument("--courses-per-student", type=int, default=4)
+        parser.add_argument("--completions", type=int, default=2000000,
+                            help="Approximate number of LessonCompletion rows to generate")
+        parser.add_argument("--graded-ratio", type=float, default=0.6)
+        parser.add_argument("--classrooms-per-course", type=int, default=2)
+        parser.add_argument("--waitlist-per-classroom", type=int, default=10)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--prefix", default="bench")
+        parser.add_argument("--reset", action="store_true",
+                            help="Delete previously generated data with the same prefix first")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.batch = options["batch_size"]
+        prefix = options["prefix"]
+        generated = User.objects.filter(email__startswith=f"{prefix}.")
+
+        if generated.exists():
+            if not options["reset"]:
+                raise CommandError(f"Data with prefix '{prefix}' already exists, use --reset to regenerate it.")
+            self.stdout.write("Removing previously generated data...")
+            Course.objects.filter(teacher__in=generated).delete()
+            generated.delete()
+
+        with transaction.atomic():
+            teacher_ids = self._create_users(prefix, "teacher", options["teachers"])
+            student_ids = self._create_users(prefix, "student", options["students"])
+            courses = self._create_courses(prefix, teacher_ids, options["courses"], options["lessons_per_course"])
+            lessons_by_course = self._create_lessons(courses, options["lessons_per_course"], options["max_prerequisites"])
+            enrollments = self._create_course_enrollments(courses, student_ids, options["courses_per_student"])
+            self._create_completions(enrollments, lessons_by_course, options["completions"], options["graded_ratio"])
+            self._create_classrooms(courses, enrollments, options["classrooms_per_course"], options["waitlist_per_classroom"])
+            # bulk_create sends no signals, drop the shared catalogue caches by hand
+            catalogue_cache.bump(catalogue_cache.COURSES, catalogue_cache.CLASSROOMS)
+
+        self.stdout.write(self.style.SUCCESS("Synthetic dataset generated."))
+
+    def _bulk(self, model, objects):
+        created = []
+        for chunk in _chunks(objects, self.batch):
+            created.extend(model.objects.bulk_create(chunk, batch_size=self.batch))
+        return created
+
+    def _create_users(self, prefix, role, count):
+        # Hashing is the slow part of creating users; every generated account shares one hash
+        password = make_password("password")
+        users = (
+            User(
+                email=f"{prefix}.{role}{n}@cookieuniversity.edu",
+                username=f"{prefix}.{role}{n}@cookieuniversity.edu",
+                first_name=f"{role.title()}{n}",
+                last_name=self.rng.choice(SUBJECTS),
+                password=password,
+                role=role,
+                is_approved=True,
+                is_staff=(role == "teacher"),
+            )
+            for n in range(count)
+        )
+        self._bulk(User, users)
+        ids = list(User.objects.filter(email__startswith=f"{prefix}.{role}").values_list("id", flat=True))
+        self.stdout.write(f"  {len(ids)} {role}s")
+        return ids
+
+    def _create_courses(self, prefix, teacher_ids, count, lessons_per_course):
+        if not teacher_ids and count:
+            raise CommandError("At least one teacher is needed to create courses.")
+        courses = self._bulk(Course, (
+            Course(
+                teacher_id=teacher_ids[n % len(teacher_ids)],
+                title=f"{prefix.upper()}{n:05d} {self.rng.choice(SUBJECTS)}",
+                description="Synthetic benchmark course",
+                total_credits=0.0,
+                duration=self.rng.choice(["2_weeks", "3_weeks", "4_weeks"]),
+                status="published",
+            )
+            for n in range(count)
+        ))
+        self._bulk(CourseEnrollment, (
+            CourseEnrollment(user_id=course.teacher_id, course_id=course.id, role="teacher", status="active")
+            for course in courses
+        ))
+        self.stdout.write(f"  {len(courses)} courses")
+        return courses
+
+    def _create_lessons(self, courses, lessons_per_course, max_prerequisites):
+        lessons = self._bulk(Lesson, (
+            Lesson(
+                course_id=course.id,
+                author_id=course.teacher_id,
+                title=f"{course.title} - Lesson {n + 1}",
+                description="Synthetic benchmark lesson",
+                objectives="- Objective one\n- Objective two",
+                credit_value=self.rng.choice(CREDIT_CHOICES),
+                status="published",
+            )
+            for course in courses
+            for n in range(lessons_per_course)
+        ))
+        lessons_by_course = {}
+        for lesson in lessons:
+            lessons_by_course.setdefault(lesson.course_id, []).append(lesson)
+
+        # Prerequisites only point at earlier lessons in the same course, which keeps the graph acyclic
+        through = Lesson.prerequisites.through
+
+        def edges():
+            for course_lessons in lessons_by_course.values():
+                for index, lesson in enumerate(course_lessons[1:], start=1):
+                    count = self.rng.randint(0, min(max_prerequisites, index))
+                    for earlier in self.rng.sample(course_lessons[:index], count):
+                        yield through(from_lesson_id=lesson.id, to_lesson_id=earlier.id)
+
+        self._bulk(through, edges())
+        # bulk_create skips the m2m signals that keep the prerequisite closure
+        rebuild_course_closures(lessons_by_course)
+
+        # Course totals match their lessons so the courses are publishable
+        for course in courses:
+            course.total_credits = sum(lesson.credit_value for lesson in lessons_by_course.get(course.id, []))
+        for chunk in _chunks(courses, self.batch):
+            Course.objects.bulk_update(chunk, ["total_credits"])
+        self.stdout.write(f"  {len(lessons)} lessons")
+        return lessons_by_course
+
+    def _create_course_enrollments(self, courses, student_ids, per_student):
+        course_ids = [course.id for course in courses]
+        per_student = min(per_student, len(course_ids))
+        enrollments = [
+            (student_id, course_id)
+            for student_id in student_ids
+            for course_id in self.rng.sample(course_ids, per_student)
+        ]
+        self._bulk(CourseEnrollment, (
+            CourseEnrollment(user_id=student_id, course_id=course_id, role="student", status="active")
+            for student_id, course_id in enrollments
+        ))
+        self.stdout.write(f"  {len(enrollments)} student course enrollments")
+        return enrollments
+
+    def _create_completions(self, enrollments, lessons_by_course, target, graded_ratio):
+        if not enrollments:
+            return
+        average = target / len(enrollments)
+        now = timezone.now()
+
+        def completions():
+            for student_id, course_id in enrollments:
+                course_lessons = lessons_by_course.get(course_id, [])
+                # Students work through a course in order, so complete a prefix of its lessons
+                count = min(len(course_lessons), self.rng.randint(0, max(0, int(round(2 * average)))))
+                for lesson in course_lessons[:count]:
+                    graded = self.rng.random() < graded_ratio
+                    yield LessonCompletion(
+                        student_id=student_id,
+                        lesson_id=lesson.id,
+                        grade=self.rng.choice(GRADES) if graded else None,
+                        graded_at=now if graded else None,
+                    )
+
+        created = 0
+        for chunk in _chunks(completions(), self.batch):
+            LessonCompletion.objects.bulk_create(chunk, batch_size=self.batch)
+            created += len(chunk)
+        # bulk_create skips the grade signals, build the grade summaries and gradebook in one pass
+        CourseGradeSummary.rebuild(lessons_by_course.keys())
+        GradebookEntry.rebuild(course_ids=lessons_by_course.keys())
+        self.stdout.write(f"  {created} lesson completions")
+
+    def _create_classrooms(self, courses, enrollments, per_course, waitlist_size):
+        students_by_course = {}
+        for student_id, course_id in enrollments:
+            students_by_course.setdefault(course_id, []).append(student_id)
+
+        start = date.today() + timedelta(days=14)
+        classrooms = self._bulk(Classroom, (
+            Classroom(
+                title=f"{course.title} - Practical {n + 1}",
+                description="Synthetic benchmark classroom",
+                course_id=course.id,
+                teacher_id=course.teacher_id,
+                class_start_date=start,
+                class_end_date=start + timedelta(weeks=2),
+                class_start_time=time(9, 0),
+                class_end_time=time(10, 0),
+                location=f"Clinic {n + 1}",
+                capacity=20,
+            )
+            for course in courses
+            for n in range(per_course)
+        ))
+
+        classrooms_by_course = {}
+        for classroom in classrooms:
+            classrooms_by_course.setdefault(classroom.course_id, []).append(classroom)
+
+        def classroom_enrollments():
+            # Fill each classroom to capacity, then put the next students on its waitlist
+            for course_id, course_classrooms in classrooms_by_course.items():
+                students = iter(students_by_course.get(course_id, []))
+                for classroom in course_classrooms:
+                    for _ in range(classroom.capacity):
+                        student_id = next(students, None)
+                        if student_id is None:
+                            break
+                        classroom.enrolled_count += 1
+                        yield Enrollment(student_id=student_id, classroom_id=classroom.id, status=Enrollment.STATUS_ENROLLED)
+                    for _ in range(waitlist_size):
+                        student_id = next(students, None)
+                        if student_id is None:
+                            break
+                        classroom.waitlist_sequence += 1
+                        classroom.waitlisted_count += 1
+                        yield Enrollment(
+                            student_id=student_id,
+                            classroom_id=classroom.id,
+                            status=Enrollment.STATUS_WAITLISTED,
+                            waitlisted_at=now,
+                            waitlist_seq=classroom.waitlist_sequence,
+                        )
+
+        now = timezone.now()
+        enrolled = self._bulk(Enrollment, classroom_enrollments())
+        for chunk in _chunks(classrooms, self.batch):
+            # bulk_create skips Enrollment.save, so the counters were tracked above
+            Classroom.objects.bulk_update(chunk, ["waitlist_sequence", "enrolled_count", "waitlisted_count"])
+        self.stdout.write(f"  {len(classrooms)} classrooms, {len(enrolled)} classroom enrollments")
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_grade_summaries(apps, schema_editor):
+    from lessons.grading import grade_aggregates
+
+    LessonCompletion = apps.get_model("lessons", "LessonCompletion")
+    CourseGradeSummary = apps.get_model("courses", "CourseGradeSummary")
+    rows = (
+        LessonCompletion.objects.filter(grade__isnull=False)
+        .values("lesson__course_id")
+        .annotate(**grade_aggregates())
+        .order_by()
+    )
+    CourseGradeSummary.objects.bulk_create(
+        [CourseGradeSummary(course_id=row.pop("lesson__course_id"), **row) for row in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_alter_course_status_default_to_draft'),
+        ('lessons', '0006_lessoncompletion_comment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseGradeSummary',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='grade_summary', serialize=False, to='courses.course')),
+                ('graded_count', models.PositiveIntegerField(default=0)),
+                ('credit_total', models.FloatField(default=0.0)),
+                ('grade_point_total', models.FloatField(default=0.0)),
+                ('hd_count', models.PositiveIntegerField(default=0)),
+                ('d_count', models.PositiveIntegerField(default=0)),
+                ('c_count', models.PositiveIntegerField(default=0)),
+                ('p_count', models.PositiveIntegerField(default=0)),
+                ('f_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_grade_summaries, migrations.RunPython.noop),
+    ]
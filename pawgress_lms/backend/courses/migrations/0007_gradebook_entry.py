@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_gradebook(apps, schema_editor):
+    from lessons.grading import gradebook_totals
+
+    LessonCompletion = apps.get_model("lessons", "LessonCompletion")
+    GradebookEntry = apps.get_model("courses", "GradebookEntry")
+    rows = []
+    for (student_id, course_id), totals in gradebook_totals(completions=LessonCompletion.objects.all()).items():
+        last_activity_at = totals.pop("last_activity_at")
+        rows.append(GradebookEntry(
+            student_id=student_id, course_id=course_id, last_activity_at=last_activity_at,
+            **{field: value or 0 for field, value in totals.items()},
+        ))
+    GradebookEntry.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_course_grade_summary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradebookEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('graded_count', models.PositiveIntegerField(default=0)),
+                ('credit_total', models.FloatField(default=0.0)),
+                ('grade_point_total', models.FloatField(default=0.0)),
+                ('hd_count', models.PositiveIntegerField(default=0)),
+                ('d_count', models.PositiveIntegerField(default=0)),
+                ('c_count', models.PositiveIntegerField(default=0)),
+                ('p_count', models.PositiveIntegerField(default=0)),
+                ('f_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('completed_count', models.PositiveIntegerField(default=0)),
+                ('completed_credits', models.FloatField(default=0.0)),
+                ('last_activity_at', models.DateTimeField(blank=True, null=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gradebook_entries', to='courses.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gradebook_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['course', 'student'], name='gradebook_course_idx')],
+                'constraints': [models.UniqueConstraint(fields=('student', 'course'), name='unique_gradebook_entry')],
+            },
+        ),
+        migrations.RunPython(backfill_gradebook, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:00
+
+from django.db import migrations
+
+
+def install_search_index(apps, schema_editor):
+    from courses import search
+
+    search.install(schema_editor.connection, "course")
+
+
+def remove_search_index(apps, schema_editor):
+    from courses import search
+
+    search.uninstall(schema_editor.connection, "course")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_gradebook_entry'),
+    ]
+
+    operations = [
+        # a tsvector column + trigger + GIN index on postgres, an FTS5 table + triggers on sqlite (see courses/search.py)
+        migrations.RunPython(install_search_index, remove_search_index),
+    ]
@@ -1,5 +1,8 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
+
+from lessons.grading import GRADE_COUNT_FIELDS, GRADE_POINTS, course_grade_totals, effective_credit, gradebook_totals
 
 User = settings.AUTH_USER_MODEL
 
@@ -82,3 +85,158 @@ class CourseEnrollment(models.Model):
         self.status = "archived"
         self.save(update_fields=["status", "updated_at"])
 
+
+class GradeTotals(models.Model):
+    """Running credit weighted grade totals, shared by the course summary and the gradebook."""
+    graded_count = models.PositiveIntegerField(default=0)
+    credit_total = models.FloatField(default=0.0)  # credits of the graded completions
+    grade_point_total = models.FloatField(default=0.0)  # sum of grade point x credit
+    hd_count = models.PositiveIntegerField(default=0)
+    d_count = models.PositiveIntegerField(default=0)
+    c_count = models.PositiveIntegerField(default=0)
+    p_count = models.PositiveIntegerField(default=0)
+    f_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    GRADE_FIELDS = GRADE_COUNT_FIELDS
+    TOTAL_FIELDS = ["graded_count", "credit_total", "grade_point_total", *GRADE_COUNT_FIELDS.values()]
+
+    class Meta:
+        abstract = True
+
+    @property
+    def average_grade(self):
+        if not self.credit_total:
+            return None
+        return round(self.grade_point_total / self.credit_total, 2)
+
+    @property
+    def grade_distribution(self):
+        return {grade: getattr(self, field) for grade, field in self.GRADE_FIELDS.items()}
+
+    @property
+    def grade_totals(self):
+        """The totals in the shape lessons.grading.grade_aggregates() returns."""
+        return {field: getattr(self, field) for field in self.TOTAL_FIELDS}
+
+    @staticmethod
+    def grade_deltas(credit, old_grade, new_grade):
+        """Field deltas for moving one completion from old_grade to new_grade (either may be None)."""
+        credit = effective_credit(credit)
+        changes = {}
+        for grade, sign in ((old_grade, -1), (new_grade, 1)):
+            if grade is None:
+                continue
+            for field, delta in (
+                ("graded_count", 1),
+                ("credit_total", credit),
+                ("grade_point_total", GRADE_POINTS[grade] * credit),
+                (GRADE_COUNT_FIELDS[grade], 1),
+            ):
+                changes[field] = changes.get(field, 0) + sign * delta
+        return changes
+
+
+#per course grade totals kept up to date as grades change, so the grade reports
+#read one row per course instead of aggregating every LessonCompletion
+class CourseGradeSummary(GradeTotals):
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, primary_key=True, related_name="grade_summary")
+
+    @staticmethod
+    def apply_change(course_id, credit, old_grade, new_grade):
+        """Move one completion's contribution from old_grade to new_grade (either may be None)."""
+        if old_grade == new_grade:
+            return
+        changes = GradeTotals.grade_deltas(credit, old_grade, new_grade)
+        updated = CourseGradeSummary.objects.filter(course_id=course_id).update(**{
+            field: models.F(field) + delta for field, delta in changes.items() if delta
+        }, updated_at=timezone.now())
+        if not updated and new_grade is not None:
+            # first grade in this course (or the row went missing), build it from the completions
+            CourseGradeSummary.rebuild([course_id])
+
+    @staticmethod
+    def rebuild(course_ids=None):
+        """Recompute summaries from LessonCompletion, for all courses when course_ids is None."""
+        totals = course_grade_totals(course_ids)
+        if course_ids is None:
+            course_ids = list(Course.objects.values_list("id", flat=True))
+        rows = []
+        for course_id in course_ids:
+            row = totals.get(course_id, {})
+            rows.append(CourseGradeSummary(
+                course_id=course_id, **{field: row.get(field) or 0 for field in GradeTotals.TOTAL_FIELDS}
+            ))
+        CourseGradeSummary.objects.bulk_create(
+            rows, batch_size=1000, update_conflicts=True, unique_fields=["course"],
+            update_fields=[*GradeTotals.TOTAL_FIELDS, "updated_at"],
+        )
+
+    def __str__(self):
+        return f"Grade summary for course {self.course_id}"
+
+
+#one row per student per course with their progress and grade totals, the most read
+#numbers in the app (every course card shows progress), kept up to date by the
+#LessonCompletion signals instead of being recomputed from completions on every read
+class GradebookEntry(GradeTotals):
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name="gradebook_entries")
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="gradebook_entries")
+    completed_count = models.PositiveIntegerField(default=0)
+    completed_credits = models.FloatField(default=0.0)
+    last_activity_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["student", "course"], name="unique_gradebook_entry"),
+        ]
+        indexes = [
+            models.Index(fields=["course", "student"], name="gradebook_course_idx"),
+        ]
+
+    @staticmethod
+    def apply_change(student_id, course_id, credit, completed=0, old_grade=None, new_grade=None):
+        """
+        Shift one student's row: ``completed`` is +1/-1 when a completion is
+        added/removed, the grades move the grade totals like the course summary.
+        """
+        changes = GradeTotals.grade_deltas(credit, old_grade, new_grade) if old_grade != new_grade else {}
+        if completed:
+            changes["completed_count"] = completed
+            changes["completed_credits"] = completed * float(credit or 0.0)
+        updates = {field: models.F(field) + delta for field, delta in changes.items() if delta}
+        if not updates:
+            return
+        now = timezone.now()
+        if completed > 0 or new_grade is not None:
+            updates["last_activity_at"] = now
+        updated = GradebookEntry.objects.filter(student_id=student_id, course_id=course_id).update(**updates, updated_at=now)
+        if not updated and (completed > 0 or new_grade is not None):
+            GradebookEntry.rebuild(course_ids=[course_id], student_ids=[student_id])
+
+    @staticmethod
+    def rebuild(course_ids=None, student_ids=None):
+        """Recompute rows from LessonCompletion, optionally limited to some courses and/or students."""
+        from django.db import transaction
+
+        scope = GradebookEntry.objects.all()
+        if course_ids is not None:
+            scope = scope.filter(course_id__in=list(course_ids))
+        if student_ids is not None:
+            scope = scope.filter(student_id__in=list(student_ids))
+
+        totals = gradebook_totals(course_ids, student_ids)
+        rows = []
+        for (student_id, course_id), row in totals.items():
+            last_activity_at = row.pop("last_activity_at")
+            rows.append(GradebookEntry(
+                student_id=student_id, course_id=course_id, last_activity_at=last_activity_at,
+                **{field: value or 0 for field, value in row.items()},
+            ))
+        with transaction.atomic():
+            scope.delete()
+            GradebookEntry.objects.bulk_create(rows, batch_size=1000)
+        return len(rows)
+
+    def __str__(self):
+        return f"Gradebook for student {self.student_id} in course {self.course_id}"
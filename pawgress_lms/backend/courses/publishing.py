@@ -0,0 +1,84 @@
+"""
+Course auto-publish, recomputed once per transaction per course.
+
+A course with a credit target (``total_credits > 0``) is published once its
+lessons add up to the target and every lesson is published, and goes back
+to draft when either stops being true.
+
+Lesson saves and deletes don't evaluate that themselves any more; they call
+``schedule_publish_check(course_id)``. Inside a transaction the course is
+added to a set that is evaluated once, on commit, so saving all 40 lessons
+of a course in one transaction costs one check, not 40. Outside a
+transaction the check runs straight away, as before.
+
+``recompute_publish_state`` evaluates any number of courses with one
+conditional aggregate (credit sum, lesson count and unpublished lesson
+count per course) and flips the ones that change with at most two UPDATEs.
+"""
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from pawgress_lms import cache as catalogue_cache
+
+from .models import Course
+
+# the on_commit callback of the current transaction, with its pending course ids
+_PENDING_ATTR = "_pawgress_pending_publish_check"
+
+
+def recompute_publish_state(course_ids):
+    """Publish or unpublish each course whose lessons meet or stop meeting its credit target."""
+    course_ids = set(course_ids)
+    if not course_ids:
+        return {"published": [], "drafted": []}
+    courses = Course.objects.filter(
+        id__in=course_ids, total_credits__gt=0, status__in=["draft", "published"]
+    ).annotate(
+        lesson_credits=Sum("lessons__credit_value"),
+        lesson_count=Count("lessons"),
+        unpublished_count=Count("lessons", filter=~Q(lessons__status="published")),
+    ).values_list("id", "status", "total_credits", "lesson_credits", "lesson_count", "unpublished_count")
+
+    to_publish, to_draft = [], []
+    for course_id, status, total_credits, lesson_credits, lesson_count, unpublished_count in courses:
+        ready = lesson_count > 0 and unpublished_count == 0 and (lesson_credits or 0) >= total_credits
+        if status == "draft" and ready:
+            to_publish.append(course_id)
+        elif status == "published" and not ready:
+            to_draft.append(course_id)
+
+    now = timezone.now()
+    if to_publish:
+        Course.objects.filter(id__in=to_publish, status="draft").update(status="published", updated_at=now)
+    if to_draft:
+        Course.objects.filter(id__in=to_draft, status="published").update(status="draft", updated_at=now)
+    changed = to_publish + to_draft
+    if changed:
+        # .update() skips the Course post_save that bumps the catalogue
+        catalogue_cache.bump(catalogue_cache.COURSES, *(catalogue_cache.course_scope(course_id) for course_id in changed))
+    return {"published": to_publish, "drafted": to_draft}
+
+
+def schedule_publish_check(course_id, using=None):
+    """Recompute the course's publish state when the current transaction commits (or now, outside one)."""
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        recompute_publish_state([course_id])
+        return
+
+    pending = getattr(connection, _PENDING_ATTR, None)
+    # a rolled back transaction or savepoint drops its callbacks, then start a fresh batch
+    if pending is None or not any(func is pending[0] for _, func, _ in connection.run_on_commit):
+        course_ids = set()
+
+        def flush():
+            if getattr(connection, _PENDING_ATTR, None) is pending_entry:
+                setattr(connection, _PENDING_ATTR, None)
+            recompute_publish_state(course_ids)
+
+        pending_entry = (flush, course_ids)
+        setattr(connection, _PENDING_ATTR, pending_entry)
+        transaction.on_commit(flush, using=using)
+        pending = pending_entry
+    pending[1].add(course_id)
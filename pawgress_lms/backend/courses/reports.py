@@ -0,0 +1,53 @@
+"""
+Batched course report metrics.
+
+The per-course report views run several counts each, and the reports page
+called two of them for every course. ``course_report_metrics`` computes the
+same numbers for any number of courses with three queries: grouped lesson
+totals, grouped completion/student counts and the courses' grade summaries.
+"""
+from django.db.models import Count
+
+from lessons.models import Lesson, LessonCompletion
+
+from .models import CourseGradeSummary
+
+
+def course_report_metrics(course_ids):
+    """Return {course_id: metrics} for every id in ``course_ids``."""
+    course_ids = list(course_ids)
+    if not course_ids:
+        return {}
+
+    total_lessons = dict(
+        Lesson.objects.filter(course_id__in=course_ids)
+        .values("course_id").annotate(n=Count("id")).order_by()
+        .values_list("course_id", "n")
+    )
+
+    completion_rows = (
+        LessonCompletion.objects.filter(lesson__course_id__in=course_ids)
+        .values("lesson__course_id")
+        .annotate(students=Count("student_id", distinct=True), completed=Count("id"))
+        .order_by()
+    )
+    completions = {row["lesson__course_id"]: row for row in completion_rows}
+
+    summaries = {summary.course_id: summary for summary in CourseGradeSummary.objects.filter(course_id__in=course_ids)}
+
+    metrics = {}
+    for course_id in course_ids:
+        lessons = total_lessons.get(course_id, 0)
+        row = completions.get(course_id)
+        students = row["students"] if row and lessons else 0
+        average = round(row["completed"] / (lessons * students) * 100, 2) if students else 0.0
+        summary = summaries.get(course_id) or CourseGradeSummary(course_id=course_id)
+        metrics[course_id] = {
+            "average_completion_percent": average,
+            "students_count": students,
+            "total_lessons": lessons,
+            "average_grade": summary.average_grade,
+            "graded_count": summary.graded_count,
+            "grade_distribution": summary.grade_distribution,
+        }
+    return metrics
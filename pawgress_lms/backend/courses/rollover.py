@@ -0,0 +1,149 @@
+"""
+Course cloning and semester rollover.
+
+``clone_courses`` deep-copies any number of courses in one transaction with a
+fixed number of statements per table, whatever the size of the faculty:
+
+* the courses themselves (as drafts, optionally retitled or handed to
+  another teacher) and their active teacher enrollments;
+* every lesson, then the prerequisite edges with both ends remapped to the
+  copies (a prerequisite in a course that isn't being cloned keeps pointing
+  at the original lesson), and the prerequisite closure of the copies;
+* optionally the classrooms, as templates moved ``shift_days`` later with no
+  students, together with the lessons they cover.
+
+Students, completions and grades stay with the old courses. Once everything
+is in, the copies go through the usual publish check, so a copy whose lessons
+are all published and add up to its credit target is published straight
+away, like any other course.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+
+from classrooms.models import Classroom
+from lessons.models import Lesson
+from lessons.prerequisites import Edge, recompute_closure
+from pawgress_lms import cache as catalogue_cache
+
+from .models import Course, CourseEnrollment
+from .publishing import recompute_publish_state
+
+BATCH_SIZE = 1000
+# ten years either way, far beyond that the date arithmetic overflows
+MAX_SHIFT_DAYS = 3650
+
+
+def _copy(instance, **changes):
+    """An unsaved copy of ``instance`` with every concrete field but the primary key, ``changes`` applied."""
+    model = type(instance)
+    values = {
+        field.attname: getattr(instance, field.attname)
+        for field in model._meta.concrete_fields if not field.primary_key
+    }
+    values.update(changes)
+    return model(**values)
+
+
+def _clone_classrooms(course_map, lesson_map, shift_days):
+    shift = timedelta(days=shift_days)
+    # cancelled sessions aren't worth carrying into the new semester
+    sources = list(Classroom.objects.filter(course_id__in=list(course_map)).exclude(status="cancelled").order_by("id"))
+    copies = [
+        _copy(
+            classroom, course_id=course_map[classroom.course_id], status="scheduled",
+            class_start_date=classroom.class_start_date + shift, class_end_date=classroom.class_end_date + shift,
+            enrolled_count=0, waitlisted_count=0, waitlist_sequence=0,
+        )
+        for classroom in sources
+    ]
+    Classroom.objects.bulk_create(copies, batch_size=BATCH_SIZE)
+    classroom_map = {source.pk: copy.pk for source, copy in zip(sources, copies)}
+
+    Through = Classroom.lessons.through
+    links = [
+        Through(classroom_id=classroom_map[classroom_id], lesson_id=lesson_map.get(lesson_id, lesson_id))
+        for classroom_id, lesson_id in Through.objects.filter(classroom_id__in=list(classroom_map)).values_list(
+            "classroom_id", "lesson_id"
+        )
+    ]
+    Through.objects.bulk_create(links, batch_size=BATCH_SIZE)
+    return len(copies)
+
+
+def _cloned_title(title, suffix):
+    """``title`` with ``suffix`` appended, the title cut short so the whole fits the column."""
+    max_length = Course._meta.get_field("title").max_length
+    return (title[:max(max_length - len(suffix), 0)] + suffix)[:max_length]
+
+
+def clone_courses(course_ids, title_suffix="", titles=None, teacher=None, shift_days=None):
+    """
+    Clone the courses in ``course_ids``, returns a summary with ``courses``
+    mapping each original id to its copy.
+
+    ``titles`` ({course_id: title}) overrides ``title_suffix`` per course;
+    ``teacher`` hands every copy to another teacher; classrooms are only
+    copied when ``shift_days`` is given (0 keeps their dates).
+    """
+    titles = titles or {}
+    sources = list(Course.objects.filter(id__in=list(course_ids)).order_by("id"))
+    if not sources:
+        return {"courses": {}, "lessons": 0, "prerequisites": 0, "classrooms": 0, "published": []}
+
+    with transaction.atomic():
+        copies = [
+            _copy(
+                course, status="draft", title=titles.get(course.pk) or _cloned_title(course.title, title_suffix),
+                teacher_id=teacher.pk if teacher is not None else course.teacher_id,
+            )
+            for course in sources
+        ]
+        # every backend the app runs on returns the new ids, they key everything below
+        Course.objects.bulk_create(copies, batch_size=BATCH_SIZE)
+        course_map = {source.pk: copy.pk for source, copy in zip(sources, copies)}
+
+        # the owner plus any co-teachers, like CourseCreateView enrolling its creator
+        teaching = set(CourseEnrollment.objects.filter(
+            course_id__in=list(course_map), role="teacher", status="active"
+        ).values_list("course_id", "user_id")) if teacher is None else set()
+        teaching |= {(source.pk, copy.teacher_id) for source, copy in zip(sources, copies)}
+        CourseEnrollment.objects.bulk_create(
+            [CourseEnrollment(course_id=course_map[course_id], user_id=user_id, role="teacher", status="active")
+             for course_id, user_id in sorted(teaching)],
+            batch_size=BATCH_SIZE,
+        )
+
+        lessons = list(Lesson.objects.filter(course_id__in=list(course_map)).order_by("id"))
+        lesson_copies = [_copy(lesson, course_id=course_map[lesson.course_id]) for lesson in lessons]
+        Lesson.objects.bulk_create(lesson_copies, batch_size=BATCH_SIZE)
+        lesson_map = {lesson.pk: copy.pk for lesson, copy in zip(lessons, lesson_copies)}
+
+        edges = [
+            Edge(from_lesson_id=lesson_map[from_id], to_lesson_id=lesson_map.get(to_id, to_id))
+            for from_id, to_id in Edge.objects.filter(from_lesson_id__in=list(lesson_map)).values_list(
+                "from_lesson_id", "to_lesson_id"
+            )
+        ]
+        # a copy of a DAG is a DAG, so the edges skip the cycle-checking m2m signal
+        Edge.objects.bulk_create(edges, batch_size=BATCH_SIZE)
+        if edges:
+            recompute_closure({edge.from_lesson_id for edge in edges}, include_dependents=False)
+
+        classrooms = _clone_classrooms(course_map, lesson_map, shift_days) if shift_days is not None else 0
+
+        published = recompute_publish_state(course_map.values())["published"]
+        # bulk_create sends no signals: the catalogue, the teachers' available courses and the timetable
+        scopes = [catalogue_cache.COURSES, *(catalogue_cache.course_scope(course_id) for course_id in course_map.values())]
+        scopes += [catalogue_cache.user_scope(user_id) for user_id in {user_id for _, user_id in teaching}]
+        if classrooms:
+            scopes.append(catalogue_cache.CLASSROOMS)
+        catalogue_cache.bump(*scopes)
+
+    return {
+        "courses": course_map,
+        "lessons": len(lesson_copies),
+        "prerequisites": len(edges),
+        "classrooms": classrooms,
+        "published": published,
+    }
@@ -0,0 +1,253 @@
+"""
+Full-text search over the catalogue (course titles and descriptions, lesson
+titles, descriptions, objectives and resources), ranked, paged and
+highlighted by the database.
+
+The search index is kept by the database itself, so every write path (saves,
+``bulk_create``, ``.update()``, raw SQL, the seed commands) keeps it current:
+
+* on PostgreSQL each table gets a ``search_vector`` tsvector column, filled
+  by a BEFORE INSERT/UPDATE trigger with the columns weighted A-D, and a GIN
+  index on it. Queries rank with ``ts_rank_cd`` and highlight with
+  ``ts_headline``;
+* on SQLite (local and dev use) each table gets an external-content FTS5
+  table (porter stemming) kept in step by AFTER INSERT/UPDATE/DELETE
+  triggers. Queries rank with ``bm25`` using the same column weights and
+  highlight with ``highlight``/``snippet``.
+
+The migrations install it with ``install``; SQLite drops a table's triggers
+when a migration rebuilds the table, so ``ensure_index`` reinstalls them
+after every ``migrate`` there. ``python manage.py rebuild_search_index``
+rebuilds everything by hand.
+
+A query is cut into words; every word has to match (stemmed) and the last
+one also matches as a prefix, so results follow the user as they type.
+Finding the page of hits is one query over both tables; the highlights are
+only computed for that page, one query per table.
+"""
+import re
+from html import escape
+
+from django.db import connection
+
+MAX_TERMS = 10
+# bm25 weights for SQLite, the same order as PostgreSQL's default A-D weights
+WEIGHTS = {"A": 10.0, "B": 4.0, "C": 2.0, "D": 1.0}
+# highlight markers, swapped for <mark> once the text has been HTML escaped
+MARK_START, MARK_END = "\ue000", "\ue001"
+
+DOCUMENTS = {
+    "course": {"table": "courses_course", "columns": (("title", "A"), ("description", "B"))},
+    "lesson": {
+        "table": "lessons_lesson",
+        "columns": (("title", "A"), ("objectives", "B"), ("description", "C"), ("resources", "D")),
+    },
+}
+KINDS = tuple(DOCUMENTS)
+
+
+class SearchUnavailable(Exception):
+    pass
+
+
+def _pg_vector(kind, row="NEW"):
+    return " || ".join(
+        f"setweight(to_tsvector('pg_catalog.english', coalesce({row}.{column}, '')), '{weight}')"
+        for column, weight in DOCUMENTS[kind]["columns"]
+    )
+
+
+def _install_postgresql(cursor, kind):
+    table = DOCUMENTS[kind]["table"]
+    columns = ", ".join(column for column, _ in DOCUMENTS[kind]["columns"])
+    cursor.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector")
+    cursor.execute(f"""
+        CREATE OR REPLACE FUNCTION {table}_search_vector() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {_pg_vector(kind)};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    cursor.execute(f"DROP TRIGGER IF EXISTS {table}_search_vector ON {table}")
+    cursor.execute(
+        f"CREATE TRIGGER {table}_search_vector BEFORE INSERT OR UPDATE OF {columns} ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION {table}_search_vector()"
+    )
+    cursor.execute(f"UPDATE {table} SET search_vector = {_pg_vector(kind, table)}")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS {table}_search_idx ON {table} USING gin (search_vector)")
+
+
+def _install_sqlite(cursor, kind):
+    table = DOCUMENTS[kind]["table"]
+    columns = [column for column, _ in DOCUMENTS[kind]["columns"]]
+    listed = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    old_values = ", ".join(f"old.{column}" for column in columns)
+    cursor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5("
+        f"{listed}, content='{table}', content_rowid='id', tokenize='porter unicode61')"
+    )
+    remove = f"INSERT INTO {table}_fts({table}_fts, rowid, {listed}) VALUES ('delete', old.id, {old_values});"
+    add = f"INSERT INTO {table}_fts(rowid, {listed}) VALUES (new.id, {new_values});"
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN {add} END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN {remove} END")
+    cursor.execute(
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF {listed} ON {table} BEGIN {remove} {add} END"
+    )
+    cursor.execute(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')")
+
+
+def install(conn, kind):
+    """Create (or repair and refill) the search index of ``kind``; a no-op on other databases."""
+    installer = {"postgresql": _install_postgresql, "sqlite": _install_sqlite}.get(conn.vendor)
+    if installer is not None:
+        with conn.cursor() as cursor:
+            installer(cursor, kind)
+
+
+def uninstall(conn, kind):
+    table = DOCUMENTS[kind]["table"]
+    with conn.cursor() as cursor:
+        if conn.vendor == "postgresql":
+            cursor.execute(f"DROP TRIGGER IF EXISTS {table}_search_vector ON {table}")
+            cursor.execute(f"DROP FUNCTION IF EXISTS {table}_search_vector()")
+            cursor.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector")
+        elif conn.vendor == "sqlite":
+            for event in ("insert", "update", "delete"):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{event}")
+            cursor.execute(f"DROP TABLE IF EXISTS {table}_fts")
+
+
+def ensure_index(sender, using="default", **kwargs):
+    """post_migrate: put back the SQLite triggers a table rebuild may have dropped."""
+    from django.db import connections
+
+    conn = connections[using]
+    if sender.name == "lessons" and conn.vendor == "sqlite":
+        tables = set(conn.introspection.table_names())
+        for kind, document in DOCUMENTS.items():
+            if f"{document['table']}_fts" in tables:
+                install(conn, kind)
+
+
+def terms(query):
+    """The words of ``query`` the index can match, at most MAX_TERMS."""
+    return re.findall(r"[^\W_]+", (query or "").lower())[:MAX_TERMS]
+
+
+def _pg_query(words):
+    return " & ".join(words[:-1] + [f"{words[-1]}:*"])
+
+
+def _sqlite_query(words):
+    return " ".join([f'"{word}"' for word in words[:-1]] + [f'"{words[-1]}"*'])
+
+
+def _visibility(public_only):
+    # students only find what the catalogue shows them
+    if not public_only:
+        return "", ""
+    return " AND c.status = 'published'", " AND l.status = 'published' AND c.status = 'published'"
+
+
+def _rank_sql(vendor, kinds, public_only):
+    course_filter, lesson_filter = _visibility(public_only)
+    if vendor == "postgresql":
+        parts = {
+            "course": "SELECT 'course' AS kind, c.id AS id, ts_rank_cd(c.search_vector, q) AS rank "
+                      "FROM courses_course c, to_tsquery('pg_catalog.english', %s) q "
+                      f"WHERE c.search_vector @@ q{course_filter}",
+            "lesson": "SELECT 'lesson' AS kind, l.id AS id, ts_rank_cd(l.search_vector, q) AS rank "
+                      "FROM lessons_lesson l JOIN courses_course c ON c.id = l.course_id, "
+                      "to_tsquery('pg_catalog.english', %s) q "
+                      f"WHERE l.search_vector @@ q{lesson_filter}",
+        }
+    else:
+        def bm25(kind):
+            weights = ", ".join(str(WEIGHTS[weight]) for _, weight in DOCUMENTS[kind]["columns"])
+            return f"-bm25({DOCUMENTS[kind]['table']}_fts, {weights})"
+
+        parts = {
+            "course": f"SELECT 'course' AS kind, c.id AS id, {bm25('course')} AS rank "
+                      "FROM courses_course_fts JOIN courses_course c ON c.id = courses_course_fts.rowid "
+                      f"WHERE courses_course_fts MATCH %s{course_filter}",
+            "lesson": f"SELECT 'lesson' AS kind, l.id AS id, {bm25('lesson')} AS rank "
+                      "FROM lessons_lesson_fts JOIN lessons_lesson l ON l.id = lessons_lesson_fts.rowid "
+                      "JOIN courses_course c ON c.id = l.course_id "
+                      f"WHERE lessons_lesson_fts MATCH %s{lesson_filter}",
+        }
+    union = " UNION ALL ".join(parts[kind] for kind in kinds)
+    return f"SELECT kind, id, rank FROM ({union}) hits ORDER BY rank DESC, kind, id LIMIT %s OFFSET %s"
+
+
+def _details_sql(vendor, kind, count):
+    table = DOCUMENTS[kind]["table"]
+    ids = ", ".join(["%s"] * count)
+    body = [column for column, _ in DOCUMENTS[kind]["columns"][1:]]
+    columns, joins = "d.id, d.title, d.status", ""
+    if kind == "lesson":
+        columns += ", d.course_id, c.title"
+        joins = " JOIN courses_course c ON c.id = d.course_id"
+    if vendor == "postgresql":
+        options = f"StartSel={MARK_START}, StopSel={MARK_END}"
+        title = f"ts_headline('pg_catalog.english', d.title, q, '{options}, HighlightAll=true')"
+        snippet = (
+            f"ts_headline('pg_catalog.english', concat_ws(' ', {', '.join(f'd.{column}' for column in body)}), q, "
+            f"'{options}, MaxWords=30, MinWords=12, MaxFragments=2')"
+        )
+        return (
+            f"SELECT {title}, {snippet}, {columns} FROM {table} d{joins}, to_tsquery('pg_catalog.english', %s) q "
+            f"WHERE d.id IN ({ids})"
+        )
+    fts = f"{table}_fts"
+    title = f"highlight({fts}, 0, '{MARK_START}', '{MARK_END}')"
+    snippet = f"snippet({fts}, -1, '{MARK_START}', '{MARK_END}', '…', 24)"
+    return (
+        f"SELECT {title}, {snippet}, {columns} FROM {fts} JOIN {table} d ON d.id = {fts}.rowid{joins} "
+        f"WHERE {fts} MATCH %s AND d.id IN ({ids})"
+    )
+
+
+def marked(text):
+    """HTML-escape ``text`` and turn the highlight markers into <mark> tags."""
+    return escape(text or "").replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+
+def search(query, kinds=KINDS, public_only=True, limit=20, offset=0):
+    """
+    Rank the courses and lessons matching ``query``, returns up to ``limit``
+    hits after ``offset`` as dicts, best first.
+
+    ``public_only`` restricts the hits to published courses and the published
+    lessons of published courses. Raises SearchUnavailable on databases
+    without an index.
+    """
+    vendor = connection.vendor
+    if vendor not in ("postgresql", "sqlite"):
+        raise SearchUnavailable(f"Full-text search is not available on {vendor}")
+    words = terms(query)
+    if not words:
+        return []
+    text = _pg_query(words) if vendor == "postgresql" else _sqlite_query(words)
+
+    with connection.cursor() as cursor:
+        cursor.execute(_rank_sql(vendor, kinds, public_only), [text] * len(kinds) + [limit, offset])
+        hits = cursor.fetchall()
+
+        details = {}
+        for kind in kinds:
+            ids = [hit_id for hit_kind, hit_id, _ in hits if hit_kind == kind]
+            if not ids:
+                continue
+            cursor.execute(_details_sql(vendor, kind, len(ids)), [text, *ids])
+            for title, snippet, hit_id, *row in cursor.fetchall():
+                hit = dict(zip(("id", "title", "status", "course_id", "course_title"), [hit_id, *row]))
+                hit.update(type=kind, highlight={"title": marked(title), "snippet": marked(snippet)})
+                details[kind, hit_id] = hit
+
+    # a row deleted between the two queries just drops out of the page
+    return [
+        dict(details[kind, hit_id], rank=round(float(rank), 6))
+        for kind, hit_id, rank in hits if (kind, hit_id) in details
+    ]
@@ -1,30 +1,24 @@
 from rest_framework import serializers
 from .models import Course, CourseEnrollment
 from lessons.serializers import LessonSerializer
+from .viewer import viewer_from_context
+from pawgress_lms.fieldsets import SparseFieldsetMixin
 
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     lessons = LessonSerializer(many=True, read_only=True)
     progress_percentage = serializers.SerializerMethodField()
     completed_credits = serializers.SerializerMethodField()
 
+    # fields answered from the ViewerContext, list views skip its preload when ?fields= drops them all
+    viewer_fields = ("completed_credits", "progress_percentage", "lessons")
+
     def get_completed_credits(self, obj):
         """Calculate credits from completed lessons for the current user"""
         request = self.context.get("request")
         if not request or not request.user.is_authenticated:
             return 0
-        
-        from lessons.models import LessonCompletion
-        completed_lesson_ids = LessonCompletion.objects.filter(
-            student=request.user,
-            lesson__course=obj
-        ).values_list('lesson_id', flat=True)
-        
-        completed_credits = sum(
-            lesson.credit_value for lesson in obj.lessons.all() 
-            if lesson.id in completed_lesson_ids
-        )
-        return completed_credits
+        return viewer_from_context(self.context).completed_credits(obj)
 
     def get_progress_percentage(self, obj):
         """Calculate progress percentage based on completed credits"""
@@ -51,6 +45,8 @@ class CourseSerializer(serializers.ModelSerializer):
             "lessons",
            # "classrooms", -- need to include this later
         ]
+        # with ?fields=, nested lessons come back as ids unless ?expand=lessons
+        expandable_fields = ("lessons",)
 
         #adding this because these fields are only meant to be read only
         extra_kwargs = {
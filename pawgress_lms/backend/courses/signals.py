@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from pawgress_lms import cache as catalogue_cache
+
+from . import search
+from .models import Course, CourseEnrollment
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_course_catalogue(sender, instance, **kwargs):
+    catalogue_cache.bump(catalogue_cache.COURSES, catalogue_cache.course_scope(instance.pk))
+
+
+@receiver(post_save, sender=CourseEnrollment)
+@receiver(post_delete, sender=CourseEnrollment)
+def invalidate_enrolled_courses(sender, instance, **kwargs):
+    # which courses are still "available" to this user
+    catalogue_cache.bump(catalogue_cache.user_scope(instance.user_id))
+
+
+# sqlite drops a table's triggers whenever a migration rebuilds it, the search index needs them back
+post_migrate.connect(search.ensure_index, dispatch_uid="courses.search.ensure_index")
@@ -1,4 +1,4 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
@@ -49,6 +49,462 @@ class CoursesTests(APITestCase):
         
 
 
+#checking the course list does not run extra queries for every course/lesson
+    def test_course_list_query_count_is_constant(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from courses.models import CourseEnrollment
+        from lessons.models import Lesson, LessonCompletion
+
+        student = User.objects.create_user(
+            email="student@cookieuniversity.com", password="student", role="student"
+        )
+
+        def add_course(n):
+            course = Course.objects.create(
+                title=f"V{n} Vet Course", description="Vet", total_credits=4.0, teacher=self.teacher
+            )
+            first = Lesson.objects.create(course=course, author=self.teacher, title="L1", description="d", credit_value=2.0, status="published")
+            second = Lesson.objects.create(course=course, author=self.teacher, title="L2", description="d", credit_value=2.0, status="published")
+            second.prerequisites.add(first)
+            CourseEnrollment.objects.create(user=student, course=course, role="student", status="active")
+            LessonCompletion.objects.create(student=student, lesson=first)
+            return course
+
+        self.client.force_authenticate(user=student)
+        url = reverse('course-list')
+
+        add_course(1)
+        with CaptureQueriesContext(connection) as one_course:
+            response = self.client.get(url)
+        self.assertEqual(response.data[0]["completed_credits"], 2.0)
+        self.assertEqual(response.data[0]["progress_percentage"], 50.0)
+        lessons = {lesson["title"]: lesson for lesson in response.data[0]["lessons"]}
+        self.assertTrue(lessons["L1"]["is_completed"])
+        self.assertTrue(lessons["L2"]["accessible"])
+
+        add_course(2)
+        add_course(3)
+        with CaptureQueriesContext(connection) as three_courses:
+            response = self.client.get(url)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(len(one_course.captured_queries), len(three_courses.captured_queries))
+        
+
+#checking the instrumentation records the endpoint and enforces query budgets
+    def test_endpoint_metrics_and_query_budget(self):
+        from unittest import mock
+        from courses.views import CourseListView
+        from pawgress_lms.instrumentation import QueryBudgetExceeded, metrics_store
+
+        metrics_store.reset()
+        self.client.get(reverse('course-list'))
+        self.client.get("/api/courses/no/such/page/")
+        self.client.get("/api/courses/nor/this/one/")
+
+        admin = User.objects.get(email="admin@cookieuniversity.edu")
+        self.client.force_authenticate(user=admin)
+        response = self.client.get(reverse('endpoint-metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stats = response.data["GET /api/courses/"]
+        self.assertEqual(stats["requests"], 1)
+        self.assertEqual(stats["query_budget"], CourseListView.query_budget)
+        self.assertEqual(response.data["GET <unmatched>"]["requests"], 2)
+        self.assertFalse([endpoint for endpoint in response.data if "no/such" in endpoint])
+
+        self.client.force_authenticate(user=self.teacher)
+        self.assertEqual(self.client.get(reverse('endpoint-metrics')).status_code, status.HTTP_403_FORBIDDEN)
+        with mock.patch.object(CourseListView, "query_budget", 0), override_settings(QUERY_BUDGET_ENFORCE=True):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse('course-list'))
+
+
+#checking the synthetic dataset and the benchmark runner work end to end on a tiny dataset
+    def test_seed_university_and_run_benchmarks(self):
+        import json
+        import os
+        import tempfile
+        from django.core.management import call_command
+        from io import StringIO
+        from lessons.models import Lesson, LessonCompletion
+
+        call_command(
+            "seed_university", students=30, teachers=2, courses=4, lessons_per_course=5,
+            completions=200, classrooms_per_course=1, waitlist_per_classroom=3, stdout=StringIO(),
+        )
+        self.assertEqual(Course.objects.filter(title__startswith="BENCH").count(), 4)
+        self.assertEqual(Lesson.objects.filter(course__title__startswith="BENCH").count(), 20)
+        self.assertTrue(LessonCompletion.objects.exists())
+
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "baseline.json")
+            call_command("run_benchmarks", iterations=2, warmup=0, output=output, stdout=StringIO(), stderr=StringIO())
+            with open(output) as handle:
+                baseline = json.load(handle)
+        self.assertIn("course-list (student)", baseline["results"])
+        self.assertEqual(baseline["results"]["course-list (student)"]["status"], 200)
+
+
+#the batched reports endpoint matches the per-course report and its query count doesn't grow with courses
+    def test_batched_course_reports(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from lessons.models import Lesson, LessonCompletion
+
+        student = User.objects.create_user(email="student@cookieuniversity.com", password="student", role="student")
+        courses = []
+        for n in range(3):
+            course = Course.objects.create(title=f"R10{n} Report", description="Report", teacher=self.teacher, status="published")
+            lessons = [Lesson.objects.create(course=course, author=self.teacher, title=f"L{i}", description="x", credit_value=1.0) for i in range(2)]
+            LessonCompletion.objects.create(student=student, lesson=lessons[0], grade="HD")
+            courses.append(course)
+
+        response = self.client.get(reverse("report-courses-batch"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row["course"]["id"] for row in response.data["courses"]], [c.id for c in courses])
+        single = self.client.get(reverse("report-course-completion", args=[courses[0].id])).data["metrics"]
+        batched = response.data["courses"][0]["metrics"]
+        for key in ("average_completion_percent", "students_count", "total_lessons"):
+            self.assertEqual(batched[key], single[key])
+        self.assertEqual(batched["grade_distribution"]["HD"], 1)
+
+        url = reverse("report-courses-batch") + "?ids=" + ",".join(str(c.id) for c in courses[:1])
+        with CaptureQueriesContext(connection) as one:
+            self.client.get(url)
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(reverse("report-courses-batch") + "?ids=" + ",".join(str(c.id) for c in courses))
+        self.assertEqual(len(one.captured_queries), len(many.captured_queries))
+        for bad in ("abc", "99999999999999999999999", "-3"):
+            response = self.client.get(reverse("report-courses-batch") + "?ids=" + bad)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        other = User.objects.create_user(email="other@cookieuniversity.com", password="teacher", role="teacher", is_approved=True)
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+
+#grade reports come from the running per course grade summary, weighted by lesson credits
+    def test_grade_summary_tracks_grading(self):
+        from courses.models import CourseGradeSummary
+        from lessons.models import Lesson, LessonCompletion
+
+        student = User.objects.create_user(email="student@cookieuniversity.com", password="student", role="student")
+        course = Course.objects.create(title="G100 Grades", description="Grades", teacher=self.teacher, status="published")
+        heavy = Lesson.objects.create(course=course, author=self.teacher, title="Heavy", description="x", credit_value=3.0)
+        light = Lesson.objects.create(course=course, author=self.teacher, title="Light", description="x", credit_value=1.0)
+        for lesson in (heavy, light):
+            LessonCompletion.objects.create(student=student, lesson=lesson)
+
+        def grade(lesson, value):
+            url = reverse("lesson-grade", args=[course.id, lesson.id])
+            self.assertEqual(self.client.post(url, {"student_id": student.id, "grade": value}).status_code, 200)
+
+        grade(heavy, "HD")
+        grade(light, "P")
+        report = self.client.get(reverse("report-course-average-grade", args=[course.id])).data["metrics"]
+        self.assertEqual(report["average_grade"], 3.25)  # (4*3 + 1*1) / 4
+        self.assertEqual(report["grade_distribution"], {"HD": 1, "D": 0, "C": 0, "P": 1, "F": 0})
+
+        grade(light, "C")
+        heavy.credit_value = 1.0
+        heavy.save()
+        self.assertEqual(self.client.get(reverse("report-university-average-grade")).data["average_grade"], 3.0)
+
+        self.client.force_authenticate(user=student)
+        self.client.delete(reverse("lesson-completion", args=[course.id, light.id]))
+        summary = CourseGradeSummary.objects.get(course=course)
+        self.assertEqual((summary.graded_count, summary.average_grade, summary.c_count), (1, 4.0, 0))
+
+        CourseGradeSummary.rebuild([course.id])
+        rebuilt = CourseGradeSummary.objects.get(course=course)
+        self.assertEqual((rebuilt.graded_count, rebuilt.credit_total, rebuilt.grade_point_total), (1, 1.0, 4.0))
+
+
+#?fields= trims the course list, lessons collapse to ids unless expanded, and the skipped work is skipped
+    def test_course_list_sparse_fieldsets(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from courses.models import CourseEnrollment
+        from lessons.models import Lesson
+
+        for n in range(3):
+            course = Course.objects.create(title=f"F10{n} Fields", description="Fields", teacher=self.teacher, status="published")
+            CourseEnrollment.objects.create(user=self.teacher, course=course, role="teacher", status="active")
+            for m in range(2):
+                Lesson.objects.create(course=course, author=self.teacher, title=f"L{m}", description="x")
+        url = reverse('course-list')
+
+        with CaptureQueriesContext(connection) as full:
+            response = self.client.get(url)
+        self.assertIn("progress_percentage", response.data[0])
+
+        with CaptureQueriesContext(connection) as sparse:
+            response = self.client.get(url, {"fields": "id,title"})
+        self.assertEqual(set(response.data[0]), {"id", "title"})
+        self.assertLess(len(sparse.captured_queries), len(full.captured_queries))
+
+        response = self.client.get(url, {"fields": "id,lessons", "page_size": 2})
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertTrue(all(isinstance(lesson, int) for lesson in response.data["results"][0]["lessons"]))
+
+        response = self.client.get(url, {"fields": "id,lessons", "expand": "lessons"})
+        self.assertTrue({"id", "title", "accessible"} <= set(response.data[0]["lessons"][0]))
+
+
+#the published catalogue is served from the cache until a signal bumps its version
+    @override_settings(CATALOGUE_CACHE_ENABLED=True)
+    def test_catalogue_cache_invalidation(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from courses.models import CourseEnrollment
+        from lessons.models import Lesson, LessonCompletion
+        from pawgress_lms import cache as catalogue_cache
+
+        catalogue_cache.get_cache().clear()
+        student = User.objects.create_user(email="student@cookieuniversity.com", password="student", role="student")
+        course = Course.objects.create(title="K100 Cache", description="Cache", teacher=self.teacher, status="published")
+        lesson = Lesson.objects.create(course=course, author=self.teacher, title="L1", description="x", status="published")
+        self.client.force_authenticate(user=student)
+        available, lessons = reverse('available-courses'), reverse('lesson-list', args=[course.id])
+
+        self.assertEqual(len(self.client.get(available).data[0]["lessons"]), 1)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(len(self.client.get(available).data[0]["lessons"]), 1)
+        self.assertEqual(len(queries.captured_queries), 0)
+
+        # without a shared cache every worker reads the database, nothing stale is served
+        with override_settings(CATALOGUE_CACHE_ENABLED=False), CaptureQueriesContext(connection) as queries:
+            self.assertEqual(len(self.client.get(available).data[0]["lessons"]), 1)
+        self.assertGreater(len(queries.captured_queries), 0)
+
+        # a new lesson bumps the course catalogue
+        Lesson.objects.create(course=course, author=self.teacher, title="L2", description="x", status="published")
+        self.assertEqual(len(self.client.get(available).data[0]["lessons"]), 2)
+
+        # a completion only bumps this student's own version
+        self.assertFalse(self.client.get(lessons).data[0]["is_completed"])
+        LessonCompletion.objects.create(student=student, lesson=lesson)
+        self.assertTrue(self.client.get(lessons).data[0]["is_completed"])
+
+        CourseEnrollment.objects.create(user=student, course=course, role="student", status="active")
+        self.assertEqual(self.client.get(available).data, [])
+
+
+#course detail answers a matching If-None-Match with an empty 304, and a new ETag after an edit
+    @override_settings(CONDITIONAL_GET_ENABLED=True, CATALOGUE_CACHE_ENABLED=True)
+    def test_course_detail_conditional_get(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from lessons.models import Lesson
+
+        course = Course.objects.create(title="E100 ETags", description="ETags", teacher=self.teacher, status="published")
+        lesson = Lesson.objects.create(course=course, author=self.teacher, title="L1", description="x")
+        url = reverse('course-detail', args=[course.id])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+        self.assertTrue(etag.startswith('"'))  # strong
+        self.assertIn("Last-Modified", response)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(len(queries.captured_queries), 0)
+
+        lesson.title = "L1 renamed"
+        lesson.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+        # another viewer never shares the ETag
+        other = User.objects.create_user(email="other@cookieuniversity.com", password="teacher", role="teacher")
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+        # per-process caches can't invalidate other workers' ETags, so none are sent without a shared one
+        with override_settings(CONDITIONAL_GET_ENABLED=False):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("ETag", response)
+
+
+#the gradebook export streams one row per enrolled student, and the university wide
+#export lands in MEDIA_ROOT where only admins can list and download it
+    def test_gradebook_export(self):
+        import csv
+        import io
+        import tempfile
+        import zipfile
+        from django.core.management import call_command
+        from courses.models import CourseEnrollment
+        from lessons.models import Lesson, LessonCompletion
+
+        course = Course.objects.create(title="E100 Export", description="Export", teacher=self.teacher)
+        lessons = [
+            Lesson.objects.create(course=course, author=self.teacher, title=title, description="x", credit_value=credit)
+            for title, credit in (("=Intro", 3.0), ("Wrap", 1.0))
+        ]
+        first, second, dropped = [
+            User.objects.create_user(email=f"student{n}@cookieuniversity.com", password="student", role="student")
+            for n in range(3)
+        ]
+        for student in (first, second):
+            CourseEnrollment.objects.create(user=student, course=course, role="student", status="active")
+        LessonCompletion.objects.create(student=first, lesson=lessons[0], grade="HD")
+        LessonCompletion.objects.create(student=first, lesson=lessons[1], grade="P")
+        LessonCompletion.objects.create(student=dropped, lesson=lessons[0], grade="F")
+
+        response = self.client.get(reverse("course-gradebook-export", args=[course.id, "csv"]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        rows = list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual(rows[0][4], f"'=Intro (#{lessons[0].id}) grade")  # no formulas smuggled into spreadsheets
+        self.assertEqual([row[0] for row in rows[1:]], [str(first.id), str(second.id)])
+        self.assertEqual((rows[1][4], rows[1][6], rows[1][-3:]), ("HD", "P", ["2", "4.0", "3.25"]))
+        self.assertEqual(rows[2][-3:], ["0", "0.0", ""])
+
+        other = User.objects.create_user(email="other@cookieuniversity.com", password="teacher", role="teacher")
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(reverse("course-gradebook-export", args=[course.id, "csv"])).status_code, 403)
+        self.assertEqual(self.client.get(reverse("gradebook-exports")).status_code, 403)
+
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+            call_command("export_gradebook", "--name", "all.zip", "--chunk-size", "1", stdout=io.StringIO())
+            admin = User.objects.create_superuser(email="root@cookieuniversity.com", password="admin")
+            self.client.force_authenticate(user=admin)
+            self.assertEqual([export["name"] for export in self.client.get(reverse("gradebook-exports")).data], ["all.zip"])
+            response = self.client.get(reverse("gradebook-export-download", args=["all.zip"]))
+            with zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content))) as archive:
+                exported = archive.read(f"gradebook-{course.id}-e100-export.csv").decode()
+            self.assertEqual(list(csv.reader(io.StringIO(exported))), rows)
+            self.assertEqual(self.client.get(reverse("gradebook-export-download", args=["..%2Fsecret"])).status_code, 404)
+
+
+#cloning a course copies its lessons, remaps the prerequisite graph and moves the
+#classrooms to the new dates, the rollover command does the same for a teacher's courses
+    def test_course_clone_and_rollover(self):
+        import io
+        from datetime import date, time
+        from django.core.management import CommandError, call_command
+        from classrooms.models import Classroom
+        from courses.models import CourseEnrollment
+        from lessons.models import Lesson
+        from lessons.prerequisites import ancestors_by_lesson
+
+        elsewhere = Course.objects.create(title="X100 Other", description="Other", teacher=self.teacher)
+        outside = Lesson.objects.create(course=elsewhere, author=self.teacher, title="Outside", description="x")
+        course = Course.objects.create(title="V200 Surgery", description="Surgery", teacher=self.teacher, total_credits=3.0)
+        CourseEnrollment.objects.create(user=self.teacher, course=course, role="teacher", status="active")
+        student = User.objects.create_user(email="student@cookieuniversity.com", password="student", role="student")
+        CourseEnrollment.objects.create(user=student, course=course, role="student", status="active")
+        first, second, third = [
+            Lesson.objects.create(course=course, author=self.teacher, title=f"L{n}", description="x",
+                                  credit_value=1.0, status="published")
+            for n in range(3)
+        ]
+        second.prerequisites.add(first, outside)
+        third.prerequisites.add(second)
+        room = Classroom.objects.create(course=course, teacher=self.teacher, title="Lab", class_start_date=date(2026, 2, 2),
+                                        class_start_time=time(9), class_end_date=date(2026, 2, 16), class_end_time=time(11),
+                                        enrolled_count=5)
+        room.lessons.add(first, third)
+        Classroom.objects.create(course=course, title="Cancelled", class_start_date=date(2026, 2, 3), class_start_time=time(9),
+                                 class_end_date=date(2026, 2, 3), class_end_time=time(10), status="cancelled")
+
+        response = self.client.post(reverse("course-clone", args=[course.id]),
+                                    {"title": "V200 Surgery (2027)", "shift_days": 7}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual((response.data["lessons"], response.data["prerequisites"], response.data["classrooms"]), (3, 3, 1))
+        clone = Course.objects.get(pk=response.data["course"]["id"])
+        self.assertEqual((clone.title, clone.teacher, clone.total_credits), ("V200 Surgery (2027)", self.teacher, 3.0))
+        self.assertEqual(clone.status, "published")  # every lesson published and the credits add up
+        self.assertEqual(list(clone.enrollments.values_list("user_id", "role")), [(self.teacher.id, "teacher")])
+
+        copies = {lesson.title: lesson for lesson in clone.lessons.all()}
+        self.assertEqual(set(copies["L1"].prerequisites.values_list("id", flat=True)), {copies["L0"].id, outside.id})
+        self.assertEqual(ancestors_by_lesson([clone.id])[copies["L2"].id], {copies["L1"].id, copies["L0"].id, outside.id})
+        self.assertEqual(set(second.prerequisites.values_list("id", flat=True)), {first.id, outside.id})  # originals untouched
+
+        new_room = Classroom.objects.get(course=clone)
+        self.assertEqual((new_room.class_start_date, new_room.class_end_date), (date(2026, 2, 9), date(2026, 2, 23)))
+        self.assertEqual((new_room.enrolled_count, new_room.status), (0, "scheduled"))
+        self.assertEqual(set(new_room.lessons.values_list("id", flat=True)), {copies["L0"].id, copies["L2"].id})
+
+        # bad input is a 400, not a crash in the query or the date arithmetic
+        admin = User.objects.get(email="admin@cookieuniversity.edu")
+        self.client.force_authenticate(user=admin)
+        for bad in ({"teacher_id": "abc"}, {"teacher_id": [1]}, {"teacher_id": True}, {"teacher_id": 10 ** 30},
+                    {"shift_days": 1000000000}, {"shift_days": "7"}):
+            response = self.client.post(reverse("course-clone", args=[course.id]), bad, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, bad)
+        with self.assertRaises(CommandError):
+            call_command("rollover_courses", "--course", course.id, "--shift-days", "1000000000", stdout=io.StringIO())
+
+        # only people teaching the course can clone it
+        self.client.force_authenticate(user=student)
+        self.assertEqual(self.client.post(reverse("course-clone", args=[course.id]), {}, format="json").status_code, 403)
+
+        before = Course.objects.count()
+        out = io.StringIO()
+        call_command("rollover_courses", "--teacher", self.teacher.email, "--dry-run", stdout=out)
+        self.assertIn("Would clone 3 courses", out.getvalue())
+        self.assertEqual(Course.objects.count(), before)
+        call_command("rollover_courses", "--course", course.id, "--title-suffix", " (S2)", stdout=io.StringIO())
+        self.assertTrue(Course.objects.filter(title="V200 Surgery (S2)", lessons__title="L2").exists())
+
+        # a long title is cut so the suffix still fits the column
+        Course.objects.filter(pk=elsewhere.pk).update(title="X" * 200)
+        call_command("rollover_courses", "--course", elsewhere.id, "--title-suffix", " (S2)", stdout=io.StringIO())
+        self.assertTrue(Course.objects.filter(title="X" * 195 + " (S2)").exists())
+
+
+#the catalogue search ranks title matches first, highlights safely, follows edits made
+#with .update() (the index is kept by the database) and hides drafts from students
+    def test_catalogue_search(self):
+        from lessons.models import Lesson
+
+        surgery = Course.objects.create(title="V300 Canine <Surgery>", description="Operating on dogs", teacher=self.teacher, status="published")
+        anatomy = Course.objects.create(title="V100 Anatomy", description="Bones before surgeries", teacher=self.teacher, status="published")
+        draft = Course.objects.create(title="V900 Surgery draft", description="x", teacher=self.teacher)
+        lesson = Lesson.objects.create(course=anatomy, author=self.teacher, title="Skull", description="x",
+                                       objectives="Prepare for surgical practice", status="published")
+        Lesson.objects.create(course=anatomy, author=self.teacher, title="Surgery notes", description="x", status="draft")
+
+        url = reverse("catalogue-search")
+        response = self.client.get(url, {"q": "surg"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        found = [(hit["type"], hit["id"]) for hit in response.data["results"]]
+        self.assertEqual(len(found), 5)
+        self.assertIn(("course", draft.id), found)  # teachers see drafts
+        courses = [hit_id for kind, hit_id in found if kind == "course"]
+        self.assertEqual(courses[-1], anatomy.id)  # only matched in the description
+        hit = next(hit for hit in response.data["results"] if hit["id"] == surgery.id and hit["type"] == "course")
+        self.assertEqual(hit["highlight"]["title"], "V300 Canine &lt;<mark>Surgery</mark>&gt;")
+
+        student = User.objects.create_user(email="student@cookieuniversity.com", password="student", role="student")
+        self.client.force_authenticate(user=student)
+        response = self.client.get(url, {"q": "surgeries", "page_size": 1})
+        self.assertEqual([(hit["type"], hit["id"]) for hit in response.data["results"]], [("course", surgery.id)])
+        self.assertIsNotNone(response.data["next"])
+        response = self.client.get(response.data["next"])
+        self.assertEqual([(hit["type"], hit["id"]) for hit in response.data["results"]], [("course", anatomy.id)])
+        self.assertIsNone(response.data["next"])
+
+        response = self.client.get(url, {"q": "surgical practice", "type": "lesson"})
+        self.assertEqual([hit["id"] for hit in response.data["results"]], [lesson.id])
+        self.assertEqual(response.data["results"][0]["course_title"], "V100 Anatomy")
+
+        Lesson.objects.filter(pk=lesson.pk).update(objectives="Radiography")
+        self.assertEqual(self.client.get(url, {"q": "surgical", "type": "lesson"}).data["results"], [])
+        surgery.delete()
+        self.assertEqual(self.client.get(url, {"q": "canine"}).data["results"], [])
+        self.assertEqual(self.client.get(url, {"q": "  "}).data["results"], [])
+        self.assertEqual(self.client.get(url, {"q": "x", "type": "teacher"}).status_code, status.HTTP_400_BAD_REQUEST)
+
 
 #I acknowledge the use of CoPilot (integrated into VScode) to help with minor debugging of the code and understanding the syntax of django for making the test cases. Prompts mainly included the bug/issue I was facing.
 # The output and syntax was  well understood by me was then modified further suit the needs of this project.
\ No newline at end of file
@@ -0,0 +1,124 @@
+from django.db.models import Q
+
+from pawgress_lms.fieldsets import uses_any
+
+from .models import CourseEnrollment, GradebookEntry
+
+
+class ViewerContext:
+    """
+    Per-request snapshot of the current user's state in a set of courses.
+
+    The course and lesson serializers used to run their own completion,
+    enrollment and prerequisite queries for every row. This object loads
+    that data once per batch of courses and answers every method field
+    from memory, so a list response costs a constant number of queries.
+    Courses that were not preloaded are loaded lazily on first access.
+    """
+
+    def __init__(self, user):
+        self.user = user if getattr(user, "is_authenticated", False) else None
+        self._loaded_course_ids = set()
+        self._completed_lesson_ids = set()
+        self._teaching_course_ids = set()
+        self._prerequisites = {}  # lesson_id -> every lesson id in its prerequisite chain
+        self._completed_credits = {}
+
+    def preload(self, course_ids):
+        """Load the viewer's data for every course id not loaded yet (4 queries)."""
+        course_ids = {cid for cid in course_ids if cid is not None} - self._loaded_course_ids
+        if not course_ids:
+            return self
+        self._loaded_course_ids |= course_ids
+
+        from lessons.models import LessonCompletion, LessonPrerequisiteClosure
+
+        # the whole chain comes from the closure table, so a prerequisite of a
+        # prerequisite counts even when it was added after the middle lesson was done
+        chains = LessonPrerequisiteClosure.objects.filter(
+            lesson__course_id__in=course_ids
+        ).values_list("lesson_id", "ancestor_id")
+        prerequisite_ids = set()
+        for lesson_id, prerequisite_id in chains:
+            self._prerequisites.setdefault(lesson_id, set()).add(prerequisite_id)
+            prerequisite_ids.add(prerequisite_id)
+
+        if self.user is None:
+            return self
+
+        # Prerequisites may live in another course, so include them explicitly
+        self._completed_lesson_ids.update(
+            LessonCompletion.objects.filter(student=self.user)
+            .filter(Q(lesson__course_id__in=course_ids) | Q(lesson_id__in=prerequisite_ids))
+            .values_list("lesson_id", flat=True)
+        )
+        self._teaching_course_ids.update(
+            CourseEnrollment.objects.filter(
+                user=self.user, course_id__in=course_ids, role="teacher", status="active"
+            ).values_list("course_id", flat=True)
+        )
+        self._completed_credits.update(dict.fromkeys(course_ids, 0.0))
+        self._completed_credits.update(
+            GradebookEntry.objects.filter(student=self.user, course_id__in=course_ids)
+            .values_list("course_id", "completed_credits")
+        )
+        return self
+
+    def _ensure(self, course_id):
+        if course_id not in self._loaded_course_ids:
+            self.preload([course_id])
+
+    def is_completed(self, lesson):
+        self._ensure(lesson.course_id)
+        return lesson.id in self._completed_lesson_ids
+
+    def teaches(self, course_id):
+        self._ensure(course_id)
+        return course_id in self._teaching_course_ids
+
+    def prerequisites_met(self, lesson):
+        self._ensure(lesson.course_id)
+        if lesson.id in self._completed_lesson_ids:
+            return True
+        return self._prerequisites.get(lesson.id, set()) <= self._completed_lesson_ids
+
+    def completed_credits(self, course):
+        """Sum of credit_value over the lessons of ``course`` the viewer completed, from their gradebook row."""
+        self._ensure(course.pk)
+        return self._completed_credits.get(course.pk, 0.0)
+
+
+def viewer_from_context(context):
+    """Return the viewer stored in a serializer context, creating it if missing."""
+    viewer = context.get("viewer")
+    if viewer is None:
+        request = context.get("request")
+        viewer = ViewerContext(getattr(request, "user", None))
+        context["viewer"] = viewer
+    return viewer
+
+
+class ViewerContextMixin:
+    """
+    Generic view mixin that puts a ViewerContext in the serializer context and
+    preloads it for whatever is about to be serialized.
+    """
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["viewer"] = ViewerContext(self.request.user)
+        return context
+
+    def get_viewer_course_ids(self, instance):
+        # Works for both courses and lessons (lessons carry course_id)
+        items = [instance] if hasattr(instance, "pk") else instance
+        return {getattr(item, "course_id", item.pk) for item in items}
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault("context", self.get_serializer_context())
+        serializer = super().get_serializer(*args, **kwargs)
+        # skip the preload when ?fields= left out everything that reads the viewer
+        viewer_fields = getattr(getattr(serializer, "child", serializer), "viewer_fields", None)
+        if args and args[0] is not None and (viewer_fields is None or uses_any(serializer, viewer_fields)):
+            kwargs["context"]["viewer"].preload(self.get_viewer_course_ids(args[0]))
+        return serializer
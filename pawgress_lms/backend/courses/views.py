@@ -1,5 +1,10 @@
+import os
+import tempfile
+
 import django
+from django.http import FileResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.contrib.auth import get_user_model
 from django.contrib.auth.models import User
 from rest_framework import generics, permissions
 from django.db.models import Avg
@@ -9,19 +14,48 @@ from .serializers import CourseSerializer, CourseEnrollmentSerializer
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.exceptions import PermissionDenied
 from django.shortcuts import get_object_or_404
-from .models import Course, CourseEnrollment
+from .models import Course, CourseEnrollment, CourseGradeSummary, GradebookEntry
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 from rest_framework import status
-from accounts.permissions import IsTeacherOrAdmin
+from accounts.permissions import IsSuperuser, IsTeacherOrAdmin
 from lessons.models import Lesson, LessonCompletion
 from .models import Course
-
-
-class CourseListView(generics.ListAPIView): #using ListAPIView  to return a list of all the courses
+from .viewer import ViewerContextMixin
+from .reports import course_report_metrics
+from . import export as gradebook_export
+from .rollover import MAX_SHIFT_DAYS, clone_courses
+from . import search as catalogue_search
+from pawgress_lms import cache as catalogue_cache
+from pawgress_lms.conditional import ConditionalGetMixin
+from pawgress_lms.fieldsets import parse_field_list
+
+# Nested lessons and their prerequisite ids are serialized for every course,
+# so list/detail querysets fetch them in two queries instead of one per row.
+COURSE_PREFETCH = ("lessons", "lessons__prerequisites")
+
+
+def course_prefetch(request):
+    """COURSE_PREFETCH trimmed to what ?fields= / ?expand= will actually render."""
+    wanted = parse_field_list(request.query_params.get("fields"))
+    if wanted is None:
+        return COURSE_PREFETCH
+    expand = parse_field_list(request.query_params.get("expand")) or set()
+    if "lessons" in expand:
+        return COURSE_PREFETCH
+    # collapsed to lesson ids, or left out entirely
+    return ("lessons",) if "lessons" in wanted else ()
+
+
+class CourseListView(ConditionalGetMixin, ViewerContextMixin, generics.ListAPIView): #using ListAPIView  to return a list of all the courses
     
     serializer_class = CourseSerializer
     permission_classes = [IsAuthenticated]
+    query_budget = 10  # constant regardless of how many courses/lessons are listed
+
+    def get_validator_scopes(self):
+        return [catalogue_cache.COURSES]
 
     def get_queryset(self):
         user = self.request.user
@@ -32,19 +66,24 @@ class CourseListView(generics.ListAPIView): #using ListAPIView  to return a list
             enrolled_ids = CourseEnrollment.objects.filter(
                 user=user, role="teacher", status="active"
             ).values_list("course_id", flat=True)
-            return Course.objects.filter(id__in=enrolled_ids).exclude(status="archived")
+            return Course.objects.filter(id__in=enrolled_ids).exclude(status="archived").prefetch_related(*course_prefetch(self.request))
 
         else:  
             enrolled_ids = CourseEnrollment.objects.filter(
                 user=user, role="student", status="active"
             ).values_list("course_id", flat=True)
-            return Course.objects.filter(id__in=enrolled_ids).exclude(status="archived")
+            return Course.objects.filter(id__in=enrolled_ids).exclude(status="archived").prefetch_related(*course_prefetch(self.request))
 
 
-class AvailableCoursesView(generics.ListAPIView): #ListAPIView will return a list of all the courses
+class AvailableCoursesView(ConditionalGetMixin, catalogue_cache.CatalogueCacheMixin, ViewerContextMixin, generics.ListAPIView): #ListAPIView will return a list of all the courses
     #List published courses available for students to enroll in.
     serializer_class = CourseSerializer
     permission_classes = [IsAuthenticated]
+    query_budget = 10  # constant regardless of how many courses/lessons are listed
+    catalogue_scopes = [catalogue_cache.COURSES]
+
+    def get_validator_scopes(self):
+        return [catalogue_cache.COURSES]
 
     def get_queryset(self):
         user = self.request.user
@@ -56,7 +95,19 @@ class AvailableCoursesView(generics.ListAPIView): #ListAPIView will return a lis
             user=user, status="active"
         ).values_list("course_id", flat=True)
 
-        return Course.objects.filter(status="published").exclude(id__in=enrolled_ids)
+        return Course.objects.filter(status="published").exclude(id__in=enrolled_ids).prefetch_related(*course_prefetch(self.request))
+
+    def get_catalogue_rows(self):
+        # the published catalogue is shared by everyone, only the enrolled filter is per user
+        published = catalogue_cache.get_or_build(
+            "published-courses",
+            [catalogue_cache.COURSES],
+            lambda: list(Course.objects.filter(status="published").prefetch_related(*COURSE_PREFETCH)),
+        )
+        enrolled_ids = set(
+            CourseEnrollment.objects.filter(user=self.request.user, status="active").values_list("course_id", flat=True)
+        )
+        return [course for course in published if course.id not in enrolled_ids]
 
 
 class CourseCreateView(generics.CreateAPIView): #CreateAPIView will make a request for all data, validate it, save it, return it
@@ -78,21 +129,24 @@ class CourseCreateView(generics.CreateAPIView): #CreateAPIView will make a reque
         )
 
 
-class CourseDetailView(generics.RetrieveUpdateDestroyAPIView): #Allows you to retrieve, update(edit) or delete a course (CRUD)
+class CourseDetailView(ConditionalGetMixin, ViewerContextMixin, generics.RetrieveUpdateDestroyAPIView): #Allows you to retrieve, update(edit) or delete a course (CRUD)
     #Retrieve, update, or delete a course.
     serializer_class = CourseSerializer
     permission_classes = [IsAuthenticated]
 
+    def get_validator_scopes(self):
+        return [catalogue_cache.course_scope(self.kwargs["pk"])]
+
     def get_queryset(self):
         user = self.request.user
 
         if user.role == "teacher":
-            return Course.objects.all()
+            return Course.objects.prefetch_related(*COURSE_PREFETCH)
 
         enrolled_ids = CourseEnrollment.objects.filter(
             user=user, status="active"
         ).values_list("course_id", flat=True)
-        return Course.objects.filter(id__in=enrolled_ids).exclude(status="archived")
+        return Course.objects.filter(id__in=enrolled_ids).exclude(status="archived").prefetch_related(*COURSE_PREFETCH)
 
     def perform_destroy(self, serializer): # allows teachers to edit courses that are empty
         if not self.request.user.role == "teacher":
@@ -233,10 +287,14 @@ class CourseStudentsView(generics.GenericAPIView):
         }, status=status.HTTP_200_OK)
 
 
-class ArchivedCoursesView(generics.ListAPIView):
+class ArchivedCoursesView(ConditionalGetMixin, ViewerContextMixin, generics.ListAPIView):
     """List all archived courses for a user"""
     serializer_class = CourseSerializer
     permission_classes = [IsAuthenticated]
+    query_budget = 10  # constant regardless of how many courses/lessons are listed
+
+    def get_validator_scopes(self):
+        return [catalogue_cache.COURSES]
 
     def get_queryset(self):
         user = self.request.user
@@ -248,7 +306,7 @@ class ArchivedCoursesView(generics.ListAPIView):
             status="archived"
         ).values_list("course_id", flat=True)
         
-        return Course.objects.filter(id__in=archived_ids)
+        return Course.objects.filter(id__in=archived_ids).prefetch_related(*course_prefetch(self.request))
 
 
 class CourseEnrollmentArchiveView(APIView):
@@ -393,15 +451,10 @@ class StudentCourseProgressView(generics.GenericAPIView):
                     status=status.HTTP_404_NOT_FOUND
                 )
             
-            # Calculate progress
-            completed_lessons = LessonCompletion.objects.filter(
-                student=student,
-                lesson__course=course
-            ).select_related('lesson')
-            
-            completed_credits = sum(
-                completion.lesson.credit_value for completion in completed_lessons
-            )
+            # Progress comes from the student's gradebook row
+            entry = GradebookEntry.objects.filter(student=student, course=course).first()
+            completed_credits = entry.completed_credits if entry else 0.0
+            completed_lessons_count = entry.completed_count if entry else 0
             
             total_credits = course.total_credits or 1
             progress_percentage = round((completed_credits / total_credits) * 100, 1)
@@ -415,7 +468,7 @@ class StudentCourseProgressView(generics.GenericAPIView):
                 "completed_credits": completed_credits,
                 "total_credits": total_credits,
                 "progress_percentage": progress_percentage,
-                "completed_lessons_count": completed_lessons.count(),
+                "completed_lessons_count": completed_lessons_count,
                 "total_lessons_count": Lesson.objects.filter(course=course).count()
             }, status=status.HTTP_200_OK)
         
@@ -485,11 +538,229 @@ class CourseAverageGradeReportView(APIView):
         if getattr(request.user, "role", None) == "teacher" and getattr(course, "teacher_id", None) != request.user.id:
             return Response({"detail": "Forbidden"}, status=status.HTTP_403_FORBIDDEN)
 
-        # Since LessonCompletion doesn't have a grade field, return None for now
-        # This can be implemented later when grade functionality is added
-        avg_grade = None
+        # credit weighted grade points, read from the course's running grade summary
+        summary = CourseGradeSummary.objects.filter(course=course).first() or CourseGradeSummary(course=course)
 
         return Response({
             "course": {"id": course.id, "title": getattr(course, "title", "")},
-            "metrics": {"average_grade": avg_grade}
+            "metrics": {
+                "average_grade": summary.average_grade,
+                "graded_count": summary.graded_count,
+                "grade_distribution": summary.grade_distribution,
+            }
+        }, status=status.HTTP_200_OK)
+
+
+
+class CatalogueSearchView(APIView):
+    """
+    Ranked full-text search over courses and lessons: ``?q=`` (every word must
+    match, the last one as a prefix), optional ``?type=course|lesson`` and
+    ``?page=`` / ``?page_size=``. Hits come best first with their title and a
+    snippet highlighted in ``<mark>``. Students only find published courses
+    and their published lessons. See courses/search.py.
+    """
+    permission_classes = [IsAuthenticated]
+    query_budget = 4  # one query for the page of hits, one per type for the highlights
+    page_size = 20
+    max_page_size = 50
+    max_page = 50  # ranked pages are offset based, nobody reads past the first few
+
+    def get(self, request):
+        query = request.query_params.get("q", "").strip()
+        kinds = catalogue_search.KINDS
+        if request.query_params.get("type"):
+            kinds = tuple(kind for kind in kinds if kind == request.query_params["type"])
+            if not kinds:
+                return Response({"detail": "type must be course or lesson"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            page = int(request.query_params.get("page", 1))
+            page_size = min(int(request.query_params.get("page_size", self.page_size)), self.max_page_size)
+        except ValueError:
+            return Response({"detail": "page and page_size must be numbers"}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= page <= self.max_page or page_size < 1:
+            return Response({"detail": f"page must be between 1 and {self.max_page}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        public_only = request.user.role == "student" and not request.user.is_staff
+        try:
+            # one extra hit tells whether there is a next page
+            hits = catalogue_search.search(query, kinds, public_only, limit=page_size + 1, offset=(page - 1) * page_size)
+        except catalogue_search.SearchUnavailable as e:
+            return Response({"detail": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        url = request.build_absolute_uri()
+        previous = None
+        if page > 1:
+            previous = replace_query_param(url, "page", page - 1) if page > 2 else remove_query_param(url, "page")
+        return Response({
+            "query": query,
+            "next": replace_query_param(url, "page", page + 1) if len(hits) > page_size and page < self.max_page else None,
+            "previous": previous,
+            "results": hits[:page_size],
+        }, status=status.HTTP_200_OK)
+
+
+#batched version of the two report views above, one round trip for the whole reports page
+class CourseReportsBatchView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsTeacherOrAdmin]
+    query_budget = 8  # constant however many courses are requested
+    MAX_COURSES = 500
+
+    def get(self, request):
+        user = request.user
+        is_teacher = getattr(user, "role", None) == "teacher"
+        raw_ids = request.query_params.get("ids", "").strip()
+
+        if raw_ids:
+            try:
+                course_ids = {int(value) for value in raw_ids.split(",") if value.strip()}
+            except ValueError:
+                course_ids = None
+            # anything past a bigint overflows in the database adapter
+            if course_ids is None or not all(0 < course_id < 2 ** 63 for course_id in course_ids):
+                return Response({"detail": "ids must be a comma separated list of course ids"}, status=status.HTTP_400_BAD_REQUEST)
+            if len(course_ids) > self.MAX_COURSES:
+                return Response({"detail": f"At most {self.MAX_COURSES} courses per request"}, status=status.HTTP_400_BAD_REQUEST)
+            courses = list(Course.objects.filter(id__in=course_ids).order_by("id"))
+            missing = course_ids - {course.id for course in courses}
+            if missing:
+                return Response({"detail": "Course not found", "course_ids": sorted(missing)}, status=status.HTTP_404_NOT_FOUND)
+            forbidden = [course.id for course in courses if is_teacher and course.teacher_id != user.id]
+            if forbidden:
+                return Response({"detail": "Forbidden", "course_ids": forbidden}, status=status.HTTP_403_FORBIDDEN)
+        else:
+            # no ids means "all my courses", everything that isn't archived for admins
+            courses = Course.objects.exclude(status="archived").order_by("id")
+            if is_teacher:
+                courses = courses.filter(teacher=user)
+            courses = list(courses)
+
+        metrics = course_report_metrics(course.id for course in courses)
+        return Response({
+            "courses": [
+                {
+                    "course": {"id": course.id, "title": course.title, "status": course.status},
+                    "metrics": metrics[course.id],
+                }
+                for course in courses
+            ]
         }, status=status.HTTP_200_OK)
+
+
+#the course gradebook (students x lessons) as a download, streamed so a big cohort
+#never sits in memory, see courses/export.py
+class CourseGradebookExportView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsTeacherOrAdmin]
+    query_budget = 2  # the rows themselves are read while the response streams
+
+    def get(self, request, pk, export_format):
+        if export_format not in gradebook_export.FORMATS:
+            return Response({"detail": "Export format must be csv or xlsx"}, status=status.HTTP_404_NOT_FOUND)
+        course = get_object_or_404(Course, pk=pk)
+        if getattr(request.user, "role", None) == "teacher" and course.teacher_id != request.user.id:
+            return Response({"detail": "Forbidden"}, status=status.HTTP_403_FORBIDDEN)
+
+        file_name = gradebook_export.course_file_name(course, export_format)
+        if export_format == "csv":
+            response = StreamingHttpResponse(
+                gradebook_export.csv_stream(gradebook_export.gradebook_rows(course)), content_type="text/csv"
+            )
+            response["Content-Disposition"] = f'attachment; filename="{file_name}"'
+            return response
+
+        if gradebook_export.load_openpyxl() is None:
+            return Response({"detail": "XLSX export needs openpyxl installed on the server"}, status=status.HTTP_400_BAD_REQUEST)
+        # a write-only workbook spools its rows to disk, it has to be finished before it can be sent
+        handle = tempfile.TemporaryFile()
+        gradebook_export.write_xlsx([(course.title, gradebook_export.gradebook_rows(course))], handle)
+        handle.seek(0)
+        return FileResponse(
+            handle, as_attachment=True, filename=file_name,
+            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+
+
+class CourseCloneView(APIView):
+    """
+    Copy a course for a new semester: the course (as a draft), its lessons
+    with their prerequisites and, when ``shift_days`` is given, its
+    classrooms moved that many days later. Takes an optional ``title``;
+    admins can also pass ``teacher_id`` to hand the copy to someone else.
+    See courses/rollover.py.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsTeacherOrAdmin]
+    query_budget = 30  # plus one per 1000 copied rows of a table and per level of the longest prerequisite chain
+
+    def post(self, request, pk):
+        course = get_object_or_404(Course, pk=pk)
+        user = request.user
+        if not user.is_superuser and course.teacher_id != user.id and not course.enrollments.filter(
+            user=user, role="teacher", status="active"
+        ).exists():
+            return Response({"detail": "You do not teach this course"}, status=status.HTTP_403_FORBIDDEN)
+
+        shift_days = request.data.get("shift_days")
+        if shift_days is not None and (
+            isinstance(shift_days, bool) or not isinstance(shift_days, int) or abs(shift_days) > MAX_SHIFT_DAYS
+        ):
+            return Response(
+                {"detail": f"shift_days must be a whole number of days, at most {MAX_SHIFT_DAYS} either way"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        teacher = None
+        raw_teacher_id = request.data.get("teacher_id")
+        if raw_teacher_id is not None:
+            if not user.is_superuser:
+                return Response({"detail": "Only admins can hand a course to another teacher"}, status=status.HTTP_403_FORBIDDEN)
+            try:
+                teacher_id = None if isinstance(raw_teacher_id, (bool, float)) else int(raw_teacher_id)
+            except (TypeError, ValueError):
+                teacher_id = None
+            if teacher_id is None or not 0 < teacher_id < 2 ** 63:
+                return Response({"detail": "teacher_id must be a user id"}, status=status.HTTP_400_BAD_REQUEST)
+            teacher = get_user_model().objects.filter(pk=teacher_id, role="teacher").first()
+            if teacher is None:
+                return Response({"detail": "No teacher with that id"}, status=status.HTTP_400_BAD_REQUEST)
+
+        title = str(request.data.get("title") or "").strip()[:200]
+        summary = clone_courses([course.pk], titles={course.pk: title}, teacher=teacher, shift_days=shift_days)
+        clone = Course.objects.values("id", "title", "status", "teacher_id").get(pk=summary["courses"][course.pk])
+        return Response({
+            "detail": "Course cloned",
+            "course": clone,
+            "lessons": summary["lessons"],
+            "prerequisites": summary["prerequisites"],
+            "classrooms": summary["classrooms"],
+        }, status=status.HTTP_201_CREATED)
+
+
+#admin only: university wide exports run in the background and land in MEDIA_ROOT/exports
+class GradebookExportJobsView(APIView):
+    permission_classes = [IsAuthenticated, IsSuperuser]
+
+    def get(self, request):
+        return Response(gradebook_export.finished_exports(), status=status.HTTP_200_OK)
+
+    def post(self, request):
+        export_format = request.data.get("format", "csv")
+        if export_format not in gradebook_export.FORMATS:
+            return Response({"detail": "format must be csv or xlsx"}, status=status.HTTP_400_BAD_REQUEST)
+        if export_format == "xlsx" and gradebook_export.load_openpyxl() is None:
+            return Response({"detail": "XLSX export needs openpyxl installed on the server"}, status=status.HTTP_400_BAD_REQUEST)
+        course_ids = request.data.get("course_ids") or None
+        if course_ids is not None and not (
+            isinstance(course_ids, list) and all(isinstance(course_id, int) for course_id in course_ids)
+        ):
+            return Response({"detail": "course_ids must be a list of ids"}, status=status.HTTP_400_BAD_REQUEST)
+        name = gradebook_export.start_export(export_format, course_ids)
+        return Response({"detail": "Export started", "name": name}, status=status.HTTP_202_ACCEPTED)
+
+
+class GradebookExportDownloadView(APIView):
+    permission_classes = [IsAuthenticated, IsSuperuser]
+
+    def get(self, request, name):
+        # only names from the listing, never a path built from user input
+        if name not in {export["name"] for export in gradebook_export.finished_exports()}:
+            return Response({"detail": "Export not found"}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(open(os.path.join(gradebook_export.export_dir(), name), "rb"), as_attachment=True, filename=name)
@@ -0,0 +1,146 @@
+"""
+Grading many completions in one request.
+
+Teachers send rows of ``student_id``, ``grade`` and an optional ``comment``
+(plus ``lesson_id`` when grading a whole course), either as a JSON array or
+as CSV with those column names. The CSV can be a ``file`` upload or the raw
+``text/csv`` body (see pawgress_lms/parsers.py).
+
+Every row is checked before anything is written. If any row is bad nothing
+is saved and the response lists the problems per row. Otherwise the grades
+go in with one ``bulk_update`` and the course summary and the gradebook rows
+of the graded students are rebuilt once, in the same transaction, instead of
+once per row through the LessonCompletion signals.
+"""
+import csv
+
+from django.db import transaction
+from django.utils import timezone
+
+from pawgress_lms import cache as catalogue_cache
+from pawgress_lms.parsers import request_rows
+
+from .grading import GRADE_POINTS
+from .models import LessonCompletion
+
+MAX_ROWS = 5000
+BATCH_SIZE = 500
+
+
+def read_rows(request):
+    """The submitted rows, see pawgress_lms/parsers.py (JSON may also be ``{"grades": [...]}``)."""
+    return request_rows(request, "grades")
+
+
+def _as_int(value):
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def validate_rows(rows, lesson_ids, default_lesson_id=None):
+    """
+    Check the shape of every row, returns (clean rows, errors).
+
+    Clean rows are dicts of row, student_id, lesson_id, grade and comment.
+    ``lesson_ids`` are the lessons the request may grade; rows must name one
+    unless ``default_lesson_id`` is given. Raises ValueError past MAX_ROWS.
+    """
+    clean, errors, seen = [], [], {}
+    try:
+        for number, row in enumerate(rows, start=1):
+            _check_row(number, row, lesson_ids, default_lesson_id, seen, clean, errors)
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise ValueError(f"Could not read the CSV: {e}") from e
+    return clean, errors
+
+
+def _check_row(number, row, lesson_ids, default_lesson_id, seen, clean, errors):
+    """Add the row to ``clean`` or its problems to ``errors``."""
+    if number > MAX_ROWS:
+        raise ValueError(f"At most {MAX_ROWS} rows can be graded at once")
+    if not isinstance(row, dict):
+        errors.append({"row": number, "errors": {"non_field_errors": "Expected an object with student_id and grade"}})
+        return
+    problems = {}
+
+    student_id = _as_int(row.get("student_id"))
+    if student_id is None:
+        problems["student_id"] = "A student id is required"
+
+    raw_lesson = row.get("lesson_id")
+    if raw_lesson in (None, "") and default_lesson_id is not None:
+        lesson_id = default_lesson_id
+    else:
+        lesson_id = _as_int(raw_lesson)
+        if lesson_id is None:
+            problems["lesson_id"] = "A lesson id is required"
+        elif lesson_id not in lesson_ids:
+            problems["lesson_id"] = "Lesson is not part of this request's course or lesson"
+
+    grade = str(row.get("grade") or "").strip().upper()
+    if grade not in GRADE_POINTS:
+        problems["grade"] = "Invalid grade"
+
+    comment = row.get("comment") or ""
+    if not isinstance(comment, str):
+        problems["comment"] = "Comment must be text"
+
+    if not problems:
+        key = (student_id, lesson_id)
+        if key in seen:
+            problems["student_id"] = f"Student is already graded for this lesson in row {seen[key]}"
+        else:
+            seen[key] = number
+
+    if problems:
+        errors.append({"row": number, "student_id": row.get("student_id"), "errors": problems})
+    else:
+        clean.append({"row": number, "student_id": student_id, "lesson_id": lesson_id,
+                      "grade": grade, "comment": comment.strip()})
+
+
+def apply_grades(course_id, clean):
+    """
+    Save the validated rows in one transaction, returns (updated count, errors).
+
+    Rows for a student who hasn't completed the lesson come back as errors and
+    then nothing is saved.
+    """
+    from courses.models import CourseGradeSummary, GradebookEntry
+
+    with transaction.atomic():
+        completions = {
+            (completion.student_id, completion.lesson_id): completion
+            for completion in LessonCompletion.objects.select_for_update().filter(
+                lesson_id__in={row["lesson_id"] for row in clean},
+                student_id__in={row["student_id"] for row in clean},
+            )
+        }
+        errors = [
+            {"row": row["row"], "student_id": row["student_id"],
+             "errors": {"student_id": "Student has not completed this lesson"}}
+            for row in clean if (row["student_id"], row["lesson_id"]) not in completions
+        ]
+        if errors:
+            return 0, errors
+
+        now = timezone.now()
+        changed = []
+        for row in clean:
+            completion = completions[(row["student_id"], row["lesson_id"])]
+            if completion.grade == row["grade"] and completion.comment == row["comment"]:
+                continue
+            completion.grade, completion.comment, completion.graded_at = row["grade"], row["comment"], now
+            changed.append(completion)
+        if not changed:
+            return 0, []
+
+        # bulk_update skips the signals that keep the totals, so rebuild them once here
+        LessonCompletion.objects.bulk_update(changed, ["grade", "graded_at", "comment"], batch_size=BATCH_SIZE)
+        student_ids = {completion.student_id for completion in changed}
+        CourseGradeSummary.rebuild([course_id])
+        GradebookEntry.rebuild(course_ids=[course_id], student_ids=student_ids)
+        catalogue_cache.bump(*(catalogue_cache.user_scope(student_id) for student_id in student_ids))
+    return len(changed), []
@@ -0,0 +1,106 @@
+"""
+Grade point mapping and the database-side aggregations built on it.
+
+Grades map to points on a 0-4 scale and are weighted by the lesson's
+credit_value, falling back to 1 credit for lessons without one (the same
+rules CourseGPAView has always used).
+"""
+from django.db.models import Case, Count, F, FloatField, Max, Q, Sum, Value, When
+
+from .models import LessonCompletion
+
+GRADE_POINTS = {
+    "HD": 4.0,
+    "D": 3.0,
+    "C": 2.0,
+    "P": 1.0,
+    "F": 0.0,
+}
+
+GRADE_COUNT_FIELDS = {"HD": "hd_count", "D": "d_count", "C": "c_count", "P": "p_count", "F": "f_count"}
+
+
+def effective_credit(credit_value):
+    return float(credit_value or 1.0)
+
+
+def credit_expression(prefix="lesson__"):
+    """credit_value of the completion's lesson, 1.0 when it has none."""
+    return Case(
+        When(**{f"{prefix}credit_value": 0}, then=Value(1.0)),
+        default=F(f"{prefix}credit_value"),
+        output_field=FloatField(),
+    )
+
+
+def grade_points_expression(field="grade"):
+    return Case(
+        *[When(**{field: grade}, then=Value(points)) for grade, points in GRADE_POINTS.items()],
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def grade_aggregates():
+    """Aggregate expressions over a LessonCompletion queryset, ungraded rows are left out."""
+    credit = credit_expression()
+    graded = Q(grade__isnull=False)
+    return {
+        "graded_count": Count("id", filter=graded),
+        "credit_total": Sum(credit, filter=graded),
+        "grade_point_total": Sum(grade_points_expression() * credit, filter=graded),
+        **{field: Count("id", filter=Q(grade=grade)) for grade, field in GRADE_COUNT_FIELDS.items()},
+    }
+
+
+def course_grade_totals(course_ids=None):
+    """{course_id: totals} over graded completions, one grouped query."""
+    graded = LessonCompletion.objects.filter(grade__isnull=False)
+    if course_ids is not None:
+        graded = graded.filter(lesson__course_id__in=list(course_ids))
+    rows = graded.values("lesson__course_id").annotate(**grade_aggregates()).order_by()
+    return {row.pop("lesson__course_id"): row for row in rows}
+
+
+def gradebook_totals(course_ids=None, student_ids=None, completions=None):
+    """{(student_id, course_id): progress and grade totals}, one grouped query over the completions."""
+    if completions is None:
+        completions = LessonCompletion.objects.all()
+    if course_ids is not None:
+        completions = completions.filter(lesson__course_id__in=list(course_ids))
+    if student_ids is not None:
+        completions = completions.filter(student_id__in=list(student_ids))
+    rows = completions.values("student_id", "lesson__course_id").annotate(
+        completed_count=Count("id"),
+        completed_credits=Sum("lesson__credit_value"),
+        last_completed_at=Max("completed_at"),
+        last_graded_at=Max("graded_at"),
+        **grade_aggregates(),
+    ).order_by()
+    totals = {}
+    for row in rows:
+        key = (row.pop("student_id"), row.pop("lesson__course_id"))
+        row["last_activity_at"] = max(filter(None, (row.pop("last_completed_at"), row.pop("last_graded_at"))), default=None)
+        totals[key] = row
+    return totals
+
+
+def with_published_lesson_count(courses):
+    """Annotate a Course queryset with published_lessons_count."""
+    return courses.annotate(published_lessons_count=Count("lessons", filter=Q(lessons__status="published")))
+
+
+def gpa_payload(totals, **fields):
+    """
+    Shape grade_aggregates() totals (or None) the way CourseGPAView always has:
+    gpa, graded count and a per-grade breakdown, or gpa None with a message.
+    """
+    if not totals or not totals["graded_count"]:
+        return {**fields, "gpa": None, "graded_lessons_count": 0, "message": "No graded lessons yet"}
+    credits = totals["credit_total"] or 0.0
+    return {
+        **fields,
+        "gpa": round(totals["grade_point_total"] / credits, 2) if credits else 0.0,
+        "graded_lessons_count": totals["graded_count"],
+        "grade_breakdown": {grade: totals[field] for grade, field in GRADE_COUNT_FIELDS.items()},
+    }
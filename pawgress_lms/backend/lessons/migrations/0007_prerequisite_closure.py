@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_prerequisite_closure(apps, schema_editor):
+    Lesson = apps.get_model("lessons", "Lesson")
+    LessonPrerequisiteClosure = apps.get_model("lessons", "LessonPrerequisiteClosure")
+    adjacency = {}
+    for lesson_id, prerequisite_id in Lesson.prerequisites.through.objects.values_list("from_lesson_id", "to_lesson_id"):
+        adjacency.setdefault(lesson_id, set()).add(prerequisite_id)
+
+    rows = []
+    for lesson_id in adjacency:
+        depths, frontier, depth = {}, adjacency[lesson_id], 1
+        while frontier:
+            frontier = {node for node in frontier if node not in depths and node != lesson_id}
+            for node in frontier:
+                depths[node] = depth
+            frontier = set().union(*(adjacency.get(node, set()) for node in frontier)) if frontier else set()
+            depth += 1
+        rows.extend(
+            LessonPrerequisiteClosure(lesson_id=lesson_id, ancestor_id=ancestor, depth=d)
+            for ancestor, d in depths.items()
+        )
+    LessonPrerequisiteClosure.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0006_lessoncompletion_comment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LessonPrerequisiteClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveSmallIntegerField(default=1)),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dependent_closure', to='lessons.lesson')),
+                ('lesson', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prerequisite_closure', to='lessons.lesson')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['ancestor', 'lesson'], name='prerequisite_ancestor_idx')],
+                'constraints': [models.UniqueConstraint(fields=('lesson', 'ancestor'), name='unique_prerequisite_closure')],
+            },
+        ),
+        migrations.RunPython(backfill_prerequisite_closure, migrations.RunPython.noop),
+    ]
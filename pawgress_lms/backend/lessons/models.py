@@ -31,14 +31,18 @@ class Lesson(models.Model):
     course = models.ForeignKey("courses.Course", related_name="lessons", on_delete=models.CASCADE)
     prerequisites = models.ManyToManyField("self", symmetrical=False, blank=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # grade summaries are weighted by credit, a credit change means recounting the course
+        instance._stored_credit = instance.__dict__.get("credit_value")
+        return instance
+
     def prerequisites_completed_by(self, user):
-        completed_ids = set(
-            LessonCompletion.objects.filter(student=user).values_list('lesson_id', flat=True)
-        )
-        for prereq in self.prerequisites.all():
-            if prereq.id not in completed_ids:
-                return False
-        return True
+        # every prerequisite down the chain, not just the direct ones, in one query
+        return not LessonPrerequisiteClosure.objects.filter(lesson=self).exclude(
+            ancestor__completions__student=user
+        ).exists()
 
     def is_public(self):
         return self.status == "published"
@@ -85,3 +89,30 @@ class LessonCompletion(models.Model):
 
     class Meta:
         unique_together = ("student", "lesson")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # the grade as stored, so the course grade summary can move it on save/delete
+        instance._stored_grade = instance.__dict__.get("grade")
+        return instance
+
+
+#transitive closure of Lesson.prerequisites: one row for every lesson that has to be
+#completed (directly or further down the chain) before ``lesson`` unlocks.
+#maintained by lessons.prerequisites whenever the prerequisite edges change
+class LessonPrerequisiteClosure(models.Model):
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name="prerequisite_closure")
+    ancestor = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name="dependent_closure")
+    depth = models.PositiveSmallIntegerField(default=1)  # shortest chain length, 1 = direct prerequisite
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["lesson", "ancestor"], name="unique_prerequisite_closure"),
+        ]
+        indexes = [
+            models.Index(fields=["ancestor", "lesson"], name="prerequisite_ancestor_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} before {self.lesson_id} (depth {self.depth})"
@@ -0,0 +1,185 @@
+"""
+Bulk lesson authoring: a whole course outline in one request.
+
+Building a unit one lesson at a time costs a request per lesson, another per
+status change, a credit re-aggregation for every create and a course publish
+check for every save. ``validate_outline`` and ``apply_outline`` take the
+whole outline at once:
+
+* ``lessons`` is a list of new lessons with the same fields as the single
+  create endpoint, plus an optional ``key`` and ``prerequisites`` given as
+  existing lesson ids or keys of other lessons in the same outline. They are
+  created in list order, which is the order the course shows them in;
+* ``status_changes`` is a list of ``{"id", "status"}`` for lessons the course
+  already has, e.g. publishing last week's drafts.
+
+Everything is validated first (fields, references, prerequisite cycles and
+the course's credit budget, once) and then written in one transaction: one
+``bulk_create`` for the lessons, one for the prerequisite edges, an UPDATE
+per target status, one closure rebuild and one publish check at commit.
+"""
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from pawgress_lms import cache as catalogue_cache
+
+from .models import Lesson
+from .prerequisites import Edge, recompute_closure
+
+MAX_LESSONS = 500
+STATUSES = ("draft", "published", "archived")
+
+
+def _prerequisite_refs(raw, keys, errors):
+    refs = []
+    for ref in raw or []:
+        if isinstance(ref, bool) or not isinstance(ref, (int, str)):
+            errors.append(f"{ref!r} is not a lesson id or key")
+        elif isinstance(ref, str) and ref not in keys:
+            errors.append(f"No lesson with key {ref!r} in this outline")
+        else:
+            refs.append(ref)
+    return refs
+
+
+def _cycle(new_edges, keys):
+    """Keys of the new lessons caught in a prerequisite cycle among themselves (empty if none)."""
+    # Kahn's algorithm: whatever can't be ordered is on a cycle
+    waiting = {key: {ref for ref in new_edges.get(key, ()) if isinstance(ref, str)} for key in keys}
+    ready = [key for key, refs in waiting.items() if not refs]
+    while ready:
+        done = ready.pop()
+        for key, refs in waiting.items():
+            if done in refs:
+                refs.discard(done)
+                if not refs:
+                    ready.append(key)
+    return sorted(key for key, refs in waiting.items() if refs)
+
+
+def validate_outline(course, lessons, status_changes, serializer_class):
+    """
+    Check the outline against ``course``, returns (plan, errors).
+
+    ``errors`` maps ``lessons`` / ``status_changes`` to per-item problems
+    (``{"index", "errors"}``) and ``non_field_errors`` to outline-wide ones;
+    the plan is only usable when it is empty.
+    """
+    errors = {"lessons": [], "status_changes": [], "non_field_errors": []}
+    if not isinstance(lessons, list) or not isinstance(status_changes, list):
+        errors["non_field_errors"].append("lessons and status_changes must be lists")
+        return None, errors
+    if len(lessons) > MAX_LESSONS:
+        errors["non_field_errors"].append(f"At most {MAX_LESSONS} lessons can be created at once")
+        return None, errors
+
+    keys = {}
+    for index, item in enumerate(lessons):
+        key = item.get("key") if isinstance(item, dict) else None
+        if key is not None:
+            key = str(key)
+            if key in keys:
+                errors["lessons"].append({"index": index, "errors": {"key": f"Key {key!r} is already used by lesson {keys[key]}"}})
+            else:
+                keys[key] = index
+
+    new_lessons, new_edges, existing_refs = [], {}, set()
+    for index, item in enumerate(lessons):
+        if not isinstance(item, dict):
+            errors["lessons"].append({"index": index, "errors": {"non_field_errors": "Expected a lesson object"}})
+            continue
+        fields = {name: value for name, value in item.items() if name not in ("key", "prerequisites")}
+        serializer = serializer_class(data=fields)
+        problems = {} if serializer.is_valid() else dict(serializer.errors)
+        ref_errors = []
+        refs = _prerequisite_refs(item.get("prerequisites"), keys, ref_errors)
+        if ref_errors:
+            problems["prerequisites"] = ref_errors
+        if problems:
+            errors["lessons"].append({"index": index, "errors": problems})
+            continue
+        key = str(item["key"]) if item.get("key") is not None else f"#{index}"
+        new_lessons.append((key, serializer.validated_data))
+        new_edges[key] = refs
+        existing_refs.update(ref for ref in refs if isinstance(ref, int))
+
+    if existing_refs:
+        found = set(Lesson.objects.filter(id__in=existing_refs).values_list("id", flat=True))
+        for missing in sorted(existing_refs - found):
+            errors["non_field_errors"].append(f"Prerequisite lesson {missing} does not exist")
+    looped = _cycle(new_edges, [key for key, _ in new_lessons])
+    if looped:
+        errors["non_field_errors"].append(f"These lessons' prerequisites form a cycle: {', '.join(looped)}")
+
+    changes = {}
+    if status_changes:
+        course_lessons = dict(Lesson.objects.filter(course=course).values_list("id", "status"))
+        has_students = course.enrollments.filter(role="student", status="active").exists()
+        seen = set()
+        for index, change in enumerate(status_changes):
+            lesson_id = change.get("id") if isinstance(change, dict) else None
+            new_status = change.get("status") if isinstance(change, dict) else None
+            if isinstance(lesson_id, bool) or not isinstance(lesson_id, int):
+                # checked before the lookup, a list or dict id isn't even hashable
+                errors["status_changes"].append({"index": index, "errors": {"id": f"{lesson_id!r} is not a lesson id"}})
+                continue
+            if lesson_id not in course_lessons:
+                problem = "Not a lesson of this course"
+            elif lesson_id in seen:
+                problem = "Lesson is listed twice"
+            elif new_status not in STATUSES:
+                problem = f"Status must be one of {', '.join(STATUSES)}"
+            elif has_students and new_status != "published" and course_lessons[lesson_id] != new_status:
+                # the same rule as the single status endpoint
+                problem = f"Cannot move a lesson to {new_status} with active students enrolled"
+            else:
+                seen.add(lesson_id)
+                if course_lessons[lesson_id] != new_status:
+                    changes.setdefault(new_status, []).append(lesson_id)
+                continue
+            errors["status_changes"].append({"index": index, "errors": {"status": problem}})
+
+    # the credit budget, checked once for the whole outline
+    if float(course.total_credits or 0) > 0 and new_lessons:
+        existing = course.lessons.aggregate(total=Sum("credit_value"))["total"] or 0.0
+        added = sum(float(data.get("credit_value", 0) or 0) for _, data in new_lessons)
+        if existing + added > float(course.total_credits):
+            errors["non_field_errors"].append(
+                f"These lessons add {added:g} credits to the {existing:g} already used, "
+                f"more than the course's {float(course.total_credits):g} total credits."
+            )
+
+    errors = {name: problems for name, problems in errors.items() if problems}
+    return {"lessons": new_lessons, "edges": new_edges, "status_changes": changes}, errors
+
+
+def apply_outline(course, author, plan):
+    """Write a validated outline, returns ([{"key", "id"}] of the new lessons, existing lessons updated)."""
+    from courses.publishing import schedule_publish_check
+
+    with transaction.atomic():
+        lessons = [Lesson(course=course, author=author, **data) for _, data in plan["lessons"]]
+        # the new ids are needed for the edges, every backend the app runs on returns them
+        Lesson.objects.bulk_create(lessons, batch_size=MAX_LESSONS)
+        ids = {key: lesson.pk for (key, _), lesson in zip(plan["lessons"], lessons)}
+
+        edges = [
+            Edge(from_lesson_id=ids[key], to_lesson_id=ids[ref] if isinstance(ref, str) else ref)
+            for key, refs in plan["edges"].items() for ref in dict.fromkeys(refs)
+        ]
+        if edges:
+            # the edges skip the m2m signal, the closure is rebuilt below (cycles were ruled out up front)
+            Edge.objects.bulk_create(edges, batch_size=1000)
+            recompute_closure({edge.from_lesson_id for edge in edges}, include_dependents=False)
+
+        updated = 0
+        now = timezone.now()
+        for new_status, lesson_ids in plan["status_changes"].items():
+            updated += Lesson.objects.filter(id__in=lesson_ids).update(status=new_status, updated_at=now)
+
+        if lessons or updated:
+            # bulk_create and update() send no signals: the catalogue and the publish state, once each
+            catalogue_cache.bump(catalogue_cache.COURSES, catalogue_cache.course_scope(course.id))
+            schedule_publish_check(course.id)
+    return [{"key": key, "id": ids[key]} for key, _ in plan["lessons"]], updated
@@ -0,0 +1,150 @@
+"""
+Prerequisite graph engine.
+
+``Lesson.prerequisites`` is a self-referential M2M edge list ("lesson ->
+lesson that must be completed first"). This module keeps its transitive
+closure in ``LessonPrerequisiteClosure`` so any question about a lesson's
+full chain is a single indexed lookup:
+
+* ``would_create_cycle`` is checked before every edge is added (the M2M
+  signal in lessons.signals rejects the write with ``PrerequisiteCycleError``),
+  so the graph is always a DAG.
+* ``recompute_closure`` rebuilds the rows of the lessons whose chains changed
+  after every edge change or lesson deletion.
+* ``unlocked_lessons`` answers "which lessons of this course are unlocked for
+  this student" with two queries and set operations.
+"""
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .models import Lesson, LessonCompletion, LessonPrerequisiteClosure
+
+Edge = Lesson.prerequisites.through
+
+
+class PrerequisiteCycleError(ValidationError):
+    pass
+
+
+def would_create_cycle(lesson_id, prerequisite_ids):
+    """True if making ``prerequisite_ids`` prerequisites of ``lesson_id`` closes a loop."""
+    prerequisite_ids = set(prerequisite_ids)
+    if lesson_id in prerequisite_ids:
+        return True
+    # a loop exists if the lesson is already somewhere in one of the new prerequisites' chains
+    return LessonPrerequisiteClosure.objects.filter(
+        lesson_id__in=prerequisite_ids, ancestor_id=lesson_id
+    ).exists()
+
+
+def check_new_edges(edges):
+    """Raise PrerequisiteCycleError if any (lesson_id, prerequisite_id) edge would close a loop."""
+    by_lesson = {}
+    for lesson_id, prerequisite_id in edges:
+        by_lesson.setdefault(lesson_id, set()).add(prerequisite_id)
+    for lesson_id, prerequisite_ids in by_lesson.items():
+        if would_create_cycle(lesson_id, prerequisite_ids):
+            raise PrerequisiteCycleError(
+                f"Lesson {lesson_id} can't require {sorted(prerequisite_ids)}: "
+                "that lesson already depends on it, which would make a prerequisite cycle."
+            )
+
+
+def dependents_of(lesson_ids):
+    """Every lesson whose chain goes through one of ``lesson_ids``."""
+    return set(
+        LessonPrerequisiteClosure.objects.filter(ancestor_id__in=list(lesson_ids))
+        .values_list("lesson_id", flat=True)
+    )
+
+
+def _load_adjacency(lesson_ids):
+    """Direct prerequisite edges reachable from ``lesson_ids``, one query per level of the chain."""
+    adjacency = {}
+    frontier = set(lesson_ids)
+    while frontier:
+        for lesson_id in frontier:
+            adjacency.setdefault(lesson_id, set())
+        reached = set()
+        for lesson_id, prerequisite_id in Edge.objects.filter(from_lesson_id__in=frontier).values_list(
+            "from_lesson_id", "to_lesson_id"
+        ):
+            adjacency[lesson_id].add(prerequisite_id)
+            reached.add(prerequisite_id)
+        frontier = reached - adjacency.keys()
+    return adjacency
+
+
+def _closure_rows(lesson_id, adjacency):
+    # breadth first so depth is the shortest chain length
+    depths = {}
+    frontier, depth = adjacency.get(lesson_id, set()), 1
+    while frontier:
+        frontier = {node for node in frontier if node not in depths and node != lesson_id}
+        for node in frontier:
+            depths[node] = depth
+        frontier = set().union(*(adjacency.get(node, set()) for node in frontier)) if frontier else set()
+        depth += 1
+    return [LessonPrerequisiteClosure(lesson_id=lesson_id, ancestor_id=ancestor, depth=d) for ancestor, d in depths.items()]
+
+
+def recompute_closure(lesson_ids, include_dependents=True):
+    """
+    Rebuild the closure rows of ``lesson_ids`` (and, by default, every lesson
+    depending on them). Returns the ids of the lessons whose chains were rebuilt.
+    """
+    lesson_ids = set(lesson_ids)
+    if include_dependents:
+        lesson_ids |= dependents_of(lesson_ids)
+    if not lesson_ids:
+        return lesson_ids
+    existing = set(Lesson.objects.filter(id__in=lesson_ids).values_list("id", flat=True))
+    adjacency = _load_adjacency(existing)
+    rows = [row for lesson_id in existing for row in _closure_rows(lesson_id, adjacency)]
+    with transaction.atomic():
+        LessonPrerequisiteClosure.objects.filter(lesson_id__in=lesson_ids).delete()
+        LessonPrerequisiteClosure.objects.bulk_create(rows, batch_size=1000)
+    return lesson_ids
+
+
+def rebuild_course_closures(course_ids):
+    """Recompute the closure of every lesson in the given courses, for bulk loads that skip the signals."""
+    lesson_ids = Lesson.objects.filter(course_id__in=list(course_ids)).values_list("id", flat=True)
+    return recompute_closure(lesson_ids)
+
+
+def ancestors_by_lesson(course_ids):
+    """{lesson_id: set of every prerequisite in its chain} for the lessons of ``course_ids``, one query."""
+    ancestors = {}
+    for lesson_id, ancestor_id in LessonPrerequisiteClosure.objects.filter(
+        lesson__course_id__in=list(course_ids)
+    ).values_list("lesson_id", "ancestor_id"):
+        ancestors.setdefault(lesson_id, set()).add(ancestor_id)
+    return ancestors
+
+
+def unlocked_lessons(student, course_id, published_only=True):
+    """
+    Split the lessons of a course into unlocked and locked for ``student`` (a user or id).
+    Returns (unlocked ids, {locked lesson id: missing prerequisite ids}).
+    """
+    lessons = Lesson.objects.filter(course_id=course_id)
+    if published_only:
+        lessons = lessons.filter(status="published")
+    lesson_ids = list(lessons.values_list("id", flat=True))
+    ancestors = ancestors_by_lesson([course_id])
+    needed = set().union(*ancestors.values()) if ancestors else set()
+    completed = set(
+        LessonCompletion.objects.filter(
+            student_id=getattr(student, "pk", student), lesson_id__in=needed | set(lesson_ids)
+        ).values_list("lesson_id", flat=True)
+    )
+    unlocked, locked = [], {}
+    for lesson_id in lesson_ids:
+        # a lesson the student already finished stays open even if its chain grew since
+        missing = set() if lesson_id in completed else ancestors.get(lesson_id, set()) - completed
+        if missing:
+            locked[lesson_id] = sorted(missing)
+        else:
+            unlocked.append(lesson_id)
+    return unlocked, locked
@@ -2,13 +2,17 @@ from rest_framework import serializers
 from .models import Lesson, LessonCompletion
 from django.contrib.auth import get_user_model
 User = get_user_model()
-from courses.models import CourseEnrollment
+from courses.viewer import viewer_from_context
+from pawgress_lms.fieldsets import SparseFieldsetMixin
 
 
-class LessonSerializer(serializers.ModelSerializer):
+class LessonSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     accessible = serializers.SerializerMethodField()
     is_completed = serializers.SerializerMethodField()
 
+    # fields answered from the ViewerContext, list views skip its preload when ?fields= drops them all
+    viewer_fields = ("accessible", "is_completed")
+
     class Meta:
         model = Lesson
         fields = [
@@ -37,27 +41,36 @@ class LessonSerializer(serializers.ModelSerializer):
             "id": {"read_only": True},
         }
 
+    def validate_prerequisites(self, value):
+        from .prerequisites import would_create_cycle
+
+        # a brand new lesson has no dependents yet, so only an update can close a loop
+        if self.instance is not None and would_create_cycle(self.instance.pk, [lesson.pk for lesson in value]):
+            raise serializers.ValidationError(
+                "These prerequisites would create a cycle: one of them already depends on this lesson."
+            )
+        return value
+
     def get_accessible(self, obj):
         request = self.context.get("request")
         user = getattr(request, "user", None)
+        viewer = viewer_from_context(self.context)
         # Teachers have access if they are course teacher or enrolled as teacher
         if user and getattr(user, "role", None) == "teacher":
             if obj.course.teacher_id == user.id:
                 return True
-            return CourseEnrollment.objects.filter(
-                user=user, course=obj.course, role="teacher", status="active"
-            ).exists()
+            return viewer.teaches(obj.course_id)
         # Students: accessible only when published and prerequisites satisfied
         if obj.status != "published":
             return False
-        return obj.prerequisites_completed_by(user)
+        return viewer.prerequisites_met(obj)
 
     def get_is_completed(self, obj):
         request = self.context.get("request")
         user = getattr(request, "user", None)
         if not user or getattr(user, "role", None) != "student":
             return False
-        return LessonCompletion.objects.filter(student=user, lesson=obj).exists()
+        return viewer_from_context(self.context).is_completed(obj)
 
 
 class LessonCompletionSerializer(serializers.ModelSerializer):
@@ -1,45 +1,132 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete
 from django.dispatch import receiver
-from .models import Lesson
+from pawgress_lms import cache as catalogue_cache
+
+from .models import Lesson, LessonCompletion
+
+
+# fields that can change whether the course is ready to publish
+PUBLISH_FIELDS = {"status", "credit_value", "course"}
 
 
 @receiver(post_save, sender=Lesson)
 @receiver(post_delete, sender=Lesson)
-def update_course_status_on_lesson_change(sender, instance, **kwargs):
+def update_course_status_on_lesson_change(sender, instance, update_fields=None, **kwargs):
     """
     Automatically update course status to 'published' when:
     1. Lesson credits equal or exceed the course's total_credits capacity
     2. All lessons in the course have 'published' status
+    and back to 'draft' when either stops being true.
+
+    The check is deferred to the end of the transaction and done once per
+    course however many of its lessons changed, see courses/publishing.py.
     """
-    course = instance.course
-    
-    # Skip if course has no credit limit set
-    if course.total_credits <= 0:
+    from courses.publishing import schedule_publish_check
+
+    if update_fields is not None and not PUBLISH_FIELDS.intersection(update_fields):
+        return
+    schedule_publish_check(instance.course_id, using=kwargs.get("using"))
+
+
+@receiver(post_save, sender=LessonCompletion)
+def update_grade_totals_on_save(sender, instance, created, **kwargs):
+    """Move a new completion / changed grade into the course grade summary and the student's gradebook row."""
+    from courses.models import CourseGradeSummary, GradebookEntry
+
+    old_grade = None if created else getattr(instance, "_stored_grade", None)
+    instance._stored_grade = instance.grade
+    if not created and old_grade == instance.grade:
+        return
+    lesson = instance.lesson
+    CourseGradeSummary.apply_change(lesson.course_id, lesson.credit_value, old_grade, instance.grade)
+    GradebookEntry.apply_change(
+        instance.student_id, lesson.course_id, lesson.credit_value,
+        completed=1 if created else 0, old_grade=old_grade, new_grade=instance.grade,
+    )
+
+
+@receiver(post_delete, sender=LessonCompletion)
+def update_grade_totals_on_delete(sender, instance, **kwargs):
+    from courses.models import CourseGradeSummary, GradebookEntry
+
+    old_grade = getattr(instance, "_stored_grade", instance.grade)
+    lesson = Lesson.objects.filter(pk=instance.lesson_id).values("course_id", "credit_value").first()
+    if lesson is None:
+        return
+    CourseGradeSummary.apply_change(lesson["course_id"], lesson["credit_value"], old_grade, None)
+    GradebookEntry.apply_change(
+        instance.student_id, lesson["course_id"], lesson["credit_value"], completed=-1, old_grade=old_grade,
+    )
+
+
+@receiver(post_save, sender=Lesson)
+def rebuild_grade_totals_on_credit_change(sender, instance, created, **kwargs):
+    from courses.models import CourseGradeSummary, GradebookEntry
+
+    stored_credit = getattr(instance, "_stored_credit", None)
+    instance._stored_credit = instance.credit_value
+    if created or stored_credit is None or stored_credit == instance.credit_value:
         return
-    
-    # Calculate sum of all lesson credits
-    lesson_credits_sum = course.calculate_total_credits()
-    
-    # Check if all lessons are published
-    all_lessons = course.lessons.all()
-    all_lessons_published = all_lessons.exists() and all(
-        lesson.status == "published" for lesson in all_lessons
+    if instance.completions.exists():
+        CourseGradeSummary.rebuild([instance.course_id])
+        GradebookEntry.rebuild(course_ids=[instance.course_id])
+
+
+@receiver(m2m_changed, sender=Lesson.prerequisites.through)
+def maintain_prerequisite_closure(sender, instance, action, reverse, pk_set, **kwargs):
+    """Reject prerequisite edges that would make a cycle and keep the closure table in step."""
+    from . import prerequisites
+
+    if action == "pre_add":
+        if reverse:
+            # instance is the prerequisite being given new dependents
+            prerequisites.check_new_edges((dependent_id, instance.pk) for dependent_id in pk_set)
+        else:
+            prerequisites.check_new_edges((instance.pk, prerequisite_id) for prerequisite_id in pk_set)
+    elif action == "pre_clear" and reverse:
+        # the dependents are gone from the edge table by post_clear, remember them now
+        instance._closure_dependents = set(
+            sender.objects.filter(to_lesson_id=instance.pk).values_list("from_lesson_id", flat=True)
+        )
+    elif action in ("post_add", "post_remove"):
+        invalidate_lesson_catalogue(prerequisites.recompute_closure(pk_set if reverse else [instance.pk]) | {instance.pk})
+    elif action == "post_clear":
+        touched = instance.__dict__.pop("_closure_dependents", set()) if reverse else [instance.pk]
+        invalidate_lesson_catalogue(prerequisites.recompute_closure(touched) | {instance.pk})
+
+
+@receiver(pre_delete, sender=Lesson)
+def remember_prerequisite_dependents(sender, instance, **kwargs):
+    from .prerequisites import dependents_of
+
+    instance._closure_dependents = dependents_of([instance.pk])
+
+
+@receiver(post_delete, sender=Lesson)
+def recompute_closure_after_lesson_delete(sender, instance, **kwargs):
+    from .prerequisites import recompute_closure
+
+    # chains that ran through the deleted lesson lose the part beyond it
+    invalidate_lesson_catalogue(
+        recompute_closure(instance.__dict__.pop("_closure_dependents", set()), include_dependents=False)
     )
-    
-    # Auto-publish course if:
-    # - Credits are met
-    # - All lessons are published
-    # - Course is currently in draft
-    if (course.status == "draft" and 
-        lesson_credits_sum >= course.total_credits and 
-        all_lessons_published):
-        course.status = "published"
-        course.save(update_fields=["status", "updated_at"])
-    
-    # Revert to draft if:
-    # - Credits fall below requirement, OR
-    # - Any lesson is not published
-    elif (course.status == "published" and 
-          (lesson_credits_sum < course.total_credits or not all_lessons_published)):
-        course.status = "draft"
-        course.save(update_fields=["status", "updated_at"])
+
+
+def invalidate_lesson_catalogue(lesson_ids):
+    """Bump the catalogue versions of the courses the given lessons belong to."""
+    course_ids = set(Lesson.objects.filter(id__in=list(lesson_ids)).values_list("course_id", flat=True))
+    catalogue_cache.bump(catalogue_cache.COURSES, *(catalogue_cache.course_scope(course_id) for course_id in course_ids))
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def invalidate_lesson_on_change(sender, instance, **kwargs):
+    # courses nest their lessons, so the course list goes stale too
+    catalogue_cache.bump(catalogue_cache.COURSES, catalogue_cache.course_scope(instance.course_id))
+
+
+@receiver(post_save, sender=LessonCompletion)
+@receiver(post_delete, sender=LessonCompletion)
+def invalidate_student_catalogue(sender, instance, **kwargs):
+    # progress, is_completed and which lessons are unlocked are all per student
+    catalogue_cache.bump(catalogue_cache.user_scope(instance.student_id))
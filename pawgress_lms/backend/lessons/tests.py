@@ -1,3 +1,416 @@
+from django.db import connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.models import User
+from courses.models import Course, CourseEnrollment
+from lessons.models import Lesson, LessonCompletion
 
-# Create your tests here.
+
+class LessonGPATests(APITestCase):
+
+    #a teacher, two students and two courses with a few credit weighted lessons
+    def setUp(self):
+        self.teacher = User.objects.create_user(
+            email="teacher@cookieuniversity.com", password="teacher", role="teacher", is_approved=True
+        )
+        self.students = [
+            User.objects.create_user(email=f"student{n}@cookieuniversity.com", password="student", role="student")
+            for n in range(2)
+        ]
+        self.courses = []
+        for n in range(2):
+            course = Course.objects.create(title=f"G20{n} GPA", description="GPA", teacher=self.teacher, status="published")
+            for credit in (3.0, 1.0, 0.0):
+                Lesson.objects.create(course=course, author=self.teacher, title=f"L{credit}", description="x",
+                                      credit_value=credit, status="published")
+            for student in self.students:
+                CourseEnrollment.objects.create(user=student, course=course, role="student", status="active")
+            self.courses.append(course)
+
+    def grade(self, student, course, grades):
+        for lesson, grade in zip(course.lessons.order_by("id"), grades):
+            LessonCompletion.objects.create(student=student, lesson=lesson, grade=grade)
+
+    #the gpa is credit weighted (lessons with no credit count as 1) and comes with the breakdown
+    def test_course_gpa_single_query(self):
+        student = self.students[0]
+        self.grade(student, self.courses[0], ["HD", "P", "F"])
+        self.client.force_authenticate(user=student)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("course-gpa", args=[self.courses[0].id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["gpa"], 2.6)  # (4*3 + 1*1 + 0*1) / 5
+        self.assertEqual(response.data["graded_lessons_count"], 3)
+        self.assertEqual(response.data["total_lessons_count"], 3)
+        self.assertEqual(response.data["grade_breakdown"], {"HD": 1, "D": 0, "C": 0, "P": 1, "F": 1})
+        self.assertLessEqual(len(queries.captured_queries), 2)
+
+        response = self.client.get(reverse("course-gpa", args=[self.courses[1].id]))
+        self.assertIsNone(response.data["gpa"])
+        self.assertEqual(response.data["message"], "No graded lessons yet")
+
+    #students get every enrolled course, teachers get every student of one course
+    def test_bulk_gpa(self):
+        first, second = self.students
+        self.grade(first, self.courses[0], ["HD", "HD"])
+        self.grade(first, self.courses[1], ["C"])
+        self.grade(second, self.courses[0], ["P", "P", "P"])
+
+        self.client.force_authenticate(user=first)
+        response = self.client.get(reverse("bulk-gpa"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(row["course_id"], row["gpa"]) for row in response.data],
+                         [(self.courses[0].id, 4.0), (self.courses[1].id, 2.0)])
+
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.get(reverse("bulk-gpa"), {"course_id": self.courses[0].id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({row["student_id"]: row["gpa"] for row in response.data["students"]},
+                         {first.id: 4.0, second.id: 1.0})
+        for bad in ("²", "abc", "99999999999999999999999"):
+            self.assertEqual(self.client.get(reverse("bulk-gpa"), {"course_id": bad}).status_code, 400)
+
+        other = User.objects.create_user(email="other@cookieuniversity.com", password="teacher", role="teacher")
+        self.client.force_authenticate(user=other)
+        response = self.client.get(reverse("bulk-gpa"), {"course_id": self.courses[0].id})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class GradebookTests(APITestCase):
+
+    #the gradebook row follows completing, grading and unmarking, and matches a full rebuild
+    def test_gradebook_follows_completions(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from courses.models import GradebookEntry
+
+        teacher = User.objects.create_user(email="teacher@cookieuniversity.com", password="teacher", role="teacher")
+        student = User.objects.create_user(email="student@cookieuniversity.com", password="student", role="student")
+        course = Course.objects.create(title="B100 Book", description="Book", teacher=teacher, total_credits=4.0)
+        CourseEnrollment.objects.create(user=teacher, course=course, role="teacher", status="active")
+        CourseEnrollment.objects.create(user=student, course=course, role="student", status="active")
+        lessons = [
+            Lesson.objects.create(course=course, author=teacher, title=f"L{n}", description="x", credit_value=credit)
+            for n, credit in enumerate((3.0, 1.0))
+        ]
+
+        self.client.force_authenticate(user=student)
+        for lesson in lessons:
+            self.client.post(reverse("lesson-completion", args=[course.id, lesson.id]))
+        self.client.force_authenticate(user=teacher)
+        self.client.post(reverse("lesson-grade", args=[course.id, lessons[0].id]), {"student_id": student.id, "grade": "D"})
+
+        entry = GradebookEntry.objects.get(student=student, course=course)
+        self.assertEqual((entry.completed_count, entry.completed_credits, entry.graded_count, entry.average_grade), (2, 4.0, 1, 3.0))
+        self.assertIsNotNone(entry.last_activity_at)
+
+        progress = self.client.get(reverse("student-course-progress", args=[course.id, student.id])).data
+        self.assertEqual((progress["completed_credits"], progress["progress_percentage"]), (4.0, 100.0))
+
+        self.client.force_authenticate(user=student)
+        self.client.delete(reverse("lesson-completion", args=[course.id, lessons[1].id]))
+        self.assertEqual(self.client.get(reverse("course-gpa", args=[course.id])).data["gpa"], 3.0)
+        entry.refresh_from_db()
+        self.assertEqual((entry.completed_count, entry.completed_credits), (1, 3.0))
+
+        GradebookEntry.objects.all().delete()
+        call_command("rebuild_gradebook", stdout=StringIO())
+        rebuilt = GradebookEntry.objects.get(student=student, course=course)
+        self.assertEqual(
+            (rebuilt.completed_count, rebuilt.completed_credits, rebuilt.graded_count, rebuilt.grade_point_total),
+            (1, 3.0, 1, 9.0),
+        )
+
+
+class BulkGradingTests(APITestCase):
+
+    #a course with two lessons that three students have completed
+    def setUp(self):
+        self.teacher = User.objects.create_user(email="teacher@cookieuniversity.com", password="teacher", role="teacher")
+        self.course = Course.objects.create(title="B200 Bulk", description="Bulk", teacher=self.teacher)
+        self.lessons = [
+            Lesson.objects.create(course=self.course, author=self.teacher, title=f"L{n}", description="x", credit_value=credit)
+            for n, credit in enumerate((3.0, 1.0))
+        ]
+        self.students = [
+            User.objects.create_user(email=f"student{n}@cookieuniversity.com", password="student", role="student")
+            for n in range(3)
+        ]
+        for student in self.students:
+            CourseEnrollment.objects.create(user=student, course=self.course, role="student", status="active")
+            for lesson in self.lessons:
+                LessonCompletion.objects.create(student=student, lesson=lesson)
+        self.client.force_authenticate(user=self.teacher)
+
+    #a json list for one lesson saves every grade and keeps the gradebook in step
+    def test_bulk_grade_lesson_json(self):
+        from courses.models import CourseGradeSummary, GradebookEntry
+
+        first, second, third = self.students
+        url = reverse("lesson-bulk-grade", args=[self.course.id, self.lessons[0].id])
+        response = self.client.post(url, [
+            {"student_id": first.id, "grade": "HD", "comment": "great"},
+            {"student_id": second.id, "grade": "p"},
+            {"student_id": third.id, "grade": "F"},
+        ], format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["updated"], 3)
+        self.assertEqual(
+            dict(LessonCompletion.objects.filter(lesson=self.lessons[0]).values_list("student_id", "grade")),
+            {first.id: "HD", second.id: "P", third.id: "F"},
+        )
+        self.assertEqual(LessonCompletion.objects.get(student=first, lesson=self.lessons[0]).comment, "great")
+        self.assertEqual(GradebookEntry.objects.get(student=first, course=self.course).average_grade, 4.0)
+        self.assertEqual(CourseGradeSummary.objects.get(course=self.course).graded_count, 3)
+
+    #one bad row and nothing is saved, the response says which rows are wrong
+    def test_bulk_grade_rejects_bad_rows(self):
+        first, second, _ = self.students
+        outsider = User.objects.create_user(email="outsider@cookieuniversity.com", password="student", role="student")
+        url = reverse("lesson-bulk-grade", args=[self.course.id, self.lessons[0].id])
+
+        response = self.client.post(url, [
+            {"student_id": first.id, "grade": "HD"},
+            {"student_id": second.id, "grade": "A+"},
+            {"student_id": first.id, "grade": "D"},
+        ], format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([error["row"] for error in response.data["errors"]], [2, 3])
+
+        response = self.client.post(url, [
+            {"student_id": first.id, "grade": "HD"},
+            {"student_id": outsider.id, "grade": "HD"},
+        ], format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["errors"][0]["row"], 2)
+        self.assertFalse(LessonCompletion.objects.filter(grade__isnull=False).exists())
+
+        other = User.objects.create_user(email="other@cookieuniversity.com", password="teacher", role="teacher")
+        self.client.force_authenticate(user=other)
+        response = self.client.post(url, [{"student_id": first.id, "grade": "HD"}], format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    #a whole course can come in as an uploaded csv or as a text/csv body
+    def test_bulk_grade_course_csv(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from courses.models import GradebookEntry
+
+        url = reverse("course-bulk-grade", args=[self.course.id])
+        lines = ["student_id,lesson_id,grade,comment"] + [
+            f"{student.id},{lesson.id},D,ok" for student in self.students for lesson in self.lessons
+        ]
+        upload = SimpleUploadedFile("grades.csv", "\n".join(lines).encode(), content_type="text/csv")
+        response = self.client.post(url, {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["updated"], 6)
+        self.assertEqual(LessonCompletion.objects.filter(grade="D", comment="ok").count(), 6)
+
+        body = "student_id,lesson_id,grade\n" + f"{self.students[0].id},{self.lessons[1].id},HD\n"
+        response = self.client.post(url, body, content_type="text/csv")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        entry = GradebookEntry.objects.get(student=self.students[0], course=self.course)
+        self.assertEqual((entry.graded_count, entry.average_grade), (2, 3.25))  # (3*3 + 4*1) / 4
+
+        response = self.client.post(url, "student_id,grade\n1,HD\n", content_type="text/csv")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("lesson_id", response.data["errors"][0]["errors"])
+
+class CoursePublishTests(APITestCase):
+
+    #saving every lesson of a course in one transaction checks the course once, on commit
+    def test_publish_check_runs_once_per_transaction(self):
+        from unittest import mock
+        from courses import publishing
+
+        teacher = User.objects.create_user(email="teacher@cookieuniversity.com", password="teacher", role="teacher")
+        course = Course.objects.create(title="A100 Auto", description="Auto", teacher=teacher, total_credits=4.0)
+
+        with mock.patch("courses.publishing.recompute_publish_state", wraps=publishing.recompute_publish_state) as check:
+            with self.captureOnCommitCallbacks(execute=True):
+                lessons = [
+                    Lesson.objects.create(course=course, author=teacher, title=f"L{n}", description="x",
+                                          credit_value=1.0, status="published")
+                    for n in range(4)
+                ]
+                course.refresh_from_db()
+                self.assertEqual(course.status, "draft")  # nothing evaluated yet
+            self.assertEqual(check.call_count, 1)
+        course.refresh_from_db()
+        self.assertEqual(course.status, "published")
+
+        # saves that can't change the outcome don't even schedule a check
+        with mock.patch("courses.publishing.recompute_publish_state") as check:
+            with self.captureOnCommitCallbacks(execute=True):
+                lessons[0].save(update_fields=["title"])
+            self.assertFalse(check.called)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Lesson.objects.filter(pk=lessons[0].pk).update(status="archived")
+            lessons[0].refresh_from_db()
+            lessons[0].save(update_fields=["status", "updated_at"])
+        course.refresh_from_db()
+        self.assertEqual(course.status, "draft")
+
+        # a rolled back savepoint takes its pending check with it, the next change still gets one
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                lessons[1].save()
+                transaction.set_rollback(True)
+            lessons[0].status = "published"
+            lessons[0].save()
+        course.refresh_from_db()
+        self.assertEqual(course.status, "published")
+
+class LessonOutlineTests(APITestCase):
+
+    #a teacher with a 6 credit course that already has one published lesson
+    def setUp(self):
+        self.teacher = User.objects.create_user(
+            email="teacher@cookieuniversity.com", password="teacher", role="teacher", is_approved=True
+        )
+        self.course = Course.objects.create(title="O100 Outline", description="Outline", teacher=self.teacher, total_credits=6.0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.intro = Lesson.objects.create(course=self.course, author=self.teacher, title="Intro", description="x",
+                                               credit_value=1.0, status="draft")
+        self.url = reverse("lesson-outline", args=[self.course.id])
+        self.client.force_authenticate(self.teacher)
+
+    #the whole outline is created in one go, prerequisites by key or id, and the course publishes once at the end
+    def test_outline_created_and_course_published(self):
+        from unittest import mock
+        from courses import publishing
+
+        outline = {
+            "lessons": [
+                {"key": "basics", "title": "Basics", "description": "x", "credit_value": 2.0,
+                 "status": "published", "prerequisites": [self.intro.id]},
+                {"key": "loops", "title": "Loops", "description": "x", "credit_value": 2.0,
+                 "status": "published", "prerequisites": ["basics"]},
+                {"key": "project", "title": "Project", "description": "x", "credit_value": 1.0,
+                 "status": "published", "prerequisites": ["basics", "loops"]},
+            ],
+            "status_changes": [{"id": self.intro.id, "status": "published"}],
+        }
+        with mock.patch("courses.publishing.recompute_publish_state", wraps=publishing.recompute_publish_state) as check:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(self.url, outline, format="json")
+            self.assertEqual(check.call_count, 1)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(response.data["updated"], 1)
+        ids = {item["key"]: item["id"] for item in response.data["created"]}
+        self.assertEqual(list(ids), ["basics", "loops", "project"])
+        self.assertEqual(sorted(ids.values()), list(ids.values()))  # outline order is lesson order
+
+        project = Lesson.objects.get(pk=ids["project"])
+        self.assertEqual(set(project.prerequisites.values_list("id", flat=True)), {ids["basics"], ids["loops"]})
+        self.assertEqual(project.author, self.teacher)
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.status, "published")
+
+        # the closure knows the transitive prerequisites too
+        from lessons.prerequisites import ancestors_by_lesson
+        self.assertEqual(ancestors_by_lesson([self.course.id])[project.pk], {self.intro.id, ids["basics"], ids["loops"]})
+
+    #one bad lesson, a cycle or a blown credit budget and nothing is saved
+    def test_invalid_outline_saves_nothing(self):
+        before = Lesson.objects.count()
+        response = self.client.post(self.url, {"lessons": [
+            {"key": "a", "title": "A", "description": "x", "credit_value": 1.0, "prerequisites": ["b"]},
+            {"key": "b", "title": "B", "description": "x", "credit_value": 1.0, "prerequisites": ["a"]},
+            {"key": "c", "description": "no title", "prerequisites": ["nope"]},
+        ]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.data["errors"]
+        self.assertEqual(errors["lessons"][0]["index"], 2)
+        self.assertIn("title", errors["lessons"][0]["errors"])
+        self.assertIn("prerequisites", errors["lessons"][0]["errors"])
+        self.assertTrue(any("cycle" in problem for problem in errors["non_field_errors"]))
+
+        response = self.client.post(self.url, {"lessons": [
+            {"title": f"L{n}", "description": "x", "credit_value": 2.0} for n in range(3)
+        ]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("credits", response.data["errors"]["non_field_errors"][0])
+        self.assertEqual(Lesson.objects.count(), before)
+
+        response = self.client.post(self.url, {"status_changes": [
+            {"id": [self.intro.id], "status": "published"}, {"id": {"id": 1}, "status": "published"},
+            {"id": True, "status": "published"},
+        ]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([problem["index"] for problem in response.data["errors"]["status_changes"]], [0, 1, 2])
+        self.assertIn("id", response.data["errors"]["status_changes"][0]["errors"])
+
+        # a teacher who doesn't teach the course can't author it
+        other = User.objects.create_user(email="other@cookieuniversity.com", password="other", role="teacher")
+        self.client.force_authenticate(other)
+        response = self.client.post(self.url, {"lessons": []}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class PrerequisiteGraphTests(APITestCase):
+
+    #a chain a <- b <- c plus a lesson from another course
+    def setUp(self):
+        self.teacher = User.objects.create_user(
+            email="teacher@cookieuniversity.com", password="teacher", role="teacher", is_approved=True
+        )
+        self.student = User.objects.create_user(email="student@cookieuniversity.com", password="student", role="student")
+        self.course = Course.objects.create(title="P100 Chains", description="Chains", teacher=self.teacher, status="published")
+        self.a, self.b, self.c = [
+            Lesson.objects.create(course=self.course, author=self.teacher, title=title, description="x", status="published")
+            for title in ("Anatomy", "Physiology", "Pathology")
+        ]
+        self.b.prerequisites.add(self.a)
+        self.c.prerequisites.add(self.b)
+
+    #the closure holds the whole chain and cycles are refused on every write path
+    def test_closure_and_cycle_rejection(self):
+        from lessons.models import LessonPrerequisiteClosure
+        from lessons.prerequisites import PrerequisiteCycleError
+
+        chain = dict(LessonPrerequisiteClosure.objects.filter(lesson=self.c).values_list("ancestor_id", "depth"))
+        self.assertEqual(chain, {self.b.id: 1, self.a.id: 2})
+
+        with self.assertRaises(PrerequisiteCycleError), transaction.atomic():
+            self.a.prerequisites.add(self.c)
+        with self.assertRaises(PrerequisiteCycleError), transaction.atomic():
+            self.c.lesson_set.add(self.a)
+
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.patch(
+            reverse("lesson-detail", args=[self.course.id, self.a.id]), {"prerequisites": [self.c.id]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("prerequisites", response.data)
+
+        # removing the middle lesson cuts the chain
+        self.b.delete()
+        self.assertFalse(LessonPrerequisiteClosure.objects.filter(lesson=self.c).exists())
+
+    #unlocking follows the full chain, even a prerequisite added after the middle lesson was done;
+    #lessons the student already completed stay unlocked
+    def test_unlocked_lessons(self):
+        extra = Lesson.objects.create(course=self.course, author=self.teacher, title="Histology", description="x", status="published")
+        LessonCompletion.objects.create(student=self.student, lesson=self.a)
+        LessonCompletion.objects.create(student=self.student, lesson=self.b)
+        self.a.prerequisites.add(extra)
+
+        self.client.force_authenticate(user=self.student)
+        response = self.client.get(reverse("unlocked-lessons", args=[self.course.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(response.data["unlocked"]), sorted([self.a.id, self.b.id, extra.id]))
+        self.assertEqual(response.data["locked"], [{"lesson_id": self.c.id, "missing_prerequisites": [extra.id]}])
+        self.assertFalse(self.c.prerequisites_completed_by(self.student))
+
+        LessonCompletion.objects.create(student=self.student, lesson=extra)
+        self.assertTrue(self.c.prerequisites_completed_by(self.student))
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.get(reverse("unlocked-lessons", args=[self.course.id]), {"student_id": self.student.id})
+        self.assertEqual(response.data["locked"], [])
+        response = self.client.get(reverse("unlocked-lessons", args=[self.course.id]), {"student_id": "²"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,21 +1,50 @@
 from django.shortcuts import render
 from rest_framework import generics, status
 from rest_framework.views import APIView
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 
 from .models import Lesson, LessonCompletion
-from courses.models import Course
+from .bulk_grading import apply_grades, read_rows, validate_rows
+from .outline import apply_outline, validate_outline
+from .grading import GRADE_POINTS, gpa_payload, with_published_lesson_count
+from .prerequisites import unlocked_lessons
+from courses.models import Course, CourseEnrollment, GradebookEntry
+from courses.viewer import ViewerContextMixin
+from pawgress_lms import cache as catalogue_cache
+from pawgress_lms.conditional import ConditionalGetMixin
+from pawgress_lms.parsers import CSVRowsParser
 from .serializers import LessonSerializer, LessonCompletionSerializer, StudentGradeSerializer
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 # Create your views here.
 
-class LessonListView(generics.ListAPIView):
+def parse_id(value):
+    """A query parameter as a database id, or None. Not isdigit(): "²" is a digit int() rejects."""
+    try:
+        parsed = int(value)
+    except (TypeError, ValueError):
+        return None
+    # past a bigint the database adapter overflows
+    return parsed if 0 < parsed < 2 ** 63 else None
+
+
+def teaches_course(user, course):
+    return course.teacher_id == user.id or CourseEnrollment.objects.filter(
+        user=user, course=course, role="teacher", status="active"
+    ).exists()
+
+
+class LessonListView(ConditionalGetMixin, catalogue_cache.CatalogueCacheMixin, ViewerContextMixin, generics.ListAPIView):
     serializer_class = LessonSerializer
     permission_classes = [IsAuthenticated]
+    query_budget = 10  # constant regardless of how many courses/lessons are listed
+
+    def get_validator_scopes(self):
+        return [catalogue_cache.course_scope(self.kwargs["course_id"])]
 
     def get_queryset(self):
         course_id = self.kwargs["course_id"]
@@ -24,14 +53,37 @@ class LessonListView(generics.ListAPIView):
 
         if user.role == "student":
             # Return all published lessons so the UI can show locked ones.
-            return Lesson.objects.filter(course=course, status="published")
+            return Lesson.objects.filter(course=course, status="published").select_related("course").prefetch_related("prerequisites")
 
         elif user.role == "teacher":
             # Teachers can view lessons for any course
-            return Lesson.objects.filter(course=course)
+            return Lesson.objects.filter(course=course).select_related("course").prefetch_related("prerequisites")
 
         raise PermissionDenied("Not allowed to view lessons")
     
+
+    # students read the published lessons of a course from the catalogue cache,
+    # teachers see drafts they are editing and always go to the database
+    def use_catalogue_cache(self):
+        return super().use_catalogue_cache() and self.request.user.role == "student"
+
+    def get_catalogue_scopes(self):
+        return [catalogue_cache.course_scope(self.kwargs["course_id"])]
+
+    def get_catalogue_rows(self):
+        course_id = self.kwargs["course_id"]
+
+        def published_lessons():
+            course = get_object_or_404(Course, id=course_id)
+            return list(
+                Lesson.objects.filter(course=course, status="published").select_related("course").prefetch_related("prerequisites")
+            )
+
+        return catalogue_cache.get_or_build(
+            "published-lessons", [catalogue_cache.course_scope(course_id)], published_lessons
+        )
+
+
 class LessonCreateView(generics.CreateAPIView):
     serializer_class = LessonSerializer
     permission_classes = [IsAuthenticated]
@@ -57,10 +109,17 @@ class LessonCreateView(generics.CreateAPIView):
 
         serializer.save(author=user, course=course)
 
-class LessonDetailView(generics.RetrieveUpdateDestroyAPIView):
+class LessonDetailView(ConditionalGetMixin, ViewerContextMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = LessonSerializer
     permission_classes = [IsAuthenticated]
 
+    def get_validator_scopes(self):
+        return [catalogue_cache.course_scope(self.kwargs["course_id"])]
+
+    def get_validator_queryset(self):
+        # the course scope only covers lessons that really belong to the course in the url
+        return super().get_validator_queryset().filter(course_id=self.kwargs["course_id"])
+
     def get_queryset(self):
         user = self.request.user
         if user.role == "teacher":
@@ -184,7 +243,7 @@ class LessonGradeView(APIView):
         comment = request.data.get("comment", "")
         if grade not in ["HD", "D", "C", "P", "F"]:
             raise ValidationError({"grade": "Invalid grade"})
-        completion = get_object_or_404(LessonCompletion, lesson=lesson, student_id=student_id)
+        completion = get_object_or_404(LessonCompletion.objects.select_related("lesson"), lesson=lesson, student_id=student_id)
         completion.grade = grade
         completion.graded_at = timezone.now()
         completion.comment = comment
@@ -192,6 +251,76 @@ class LessonGradeView(APIView):
         return Response({"detail": "Grade saved"}, status=200)
 
 
+class LessonOutlineView(APIView):
+    """
+    Author a course outline in one request: create many lessons (with their
+    credits, statuses and prerequisites, which may point at other lessons of
+    the same outline by ``key``) and change the status of existing ones.
+    Nothing is saved unless the whole outline is valid, the course's credit
+    budget is checked once and its publish state evaluated once at the end.
+    See lessons/outline.py.
+    """
+    permission_classes = [IsAuthenticated]
+    query_budget = 20  # plus one per 500 new lessons or 1000 prerequisite links
+
+    def post(self, request, course_id):
+        if request.user.role != "teacher":
+            raise PermissionDenied("Only teachers can create lessons")
+        course = get_object_or_404(Course, id=course_id)
+        if not teaches_course(request.user, course):
+            raise PermissionDenied("You do not teach this course")
+
+        lessons = request.data.get("lessons", []) if isinstance(request.data, dict) else None
+        status_changes = request.data.get("status_changes", []) if isinstance(request.data, dict) else None
+        plan, errors = validate_outline(course, lessons, status_changes, LessonSerializer)
+        if errors:
+            return Response({"detail": "No lessons were saved", "errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+        created, updated = apply_outline(course, request.user, plan)
+        course.refresh_from_db(fields=["status"])
+        return Response(
+            {"detail": "Outline saved", "created": created, "updated": updated, "course_status": course.status},
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class BulkGradeView(APIView):
+    """
+    Grade many students at once, for one lesson or (rows with a lesson_id)
+    a whole course. Takes a JSON array of {student_id, grade, comment} or the
+    same columns as CSV, either uploaded as ``file`` or sent as a text/csv
+    body. All rows are checked first: one bad row and nothing is saved, the
+    response lists every problem by row number. See lessons/bulk_grading.py.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, CSVRowsParser, MultiPartParser, FormParser]
+    query_budget = 14  # plus one per 500 changed rows
+
+    def post(self, request, course_id, pk=None):
+        if request.user.role != "teacher":
+            raise PermissionDenied("Only teachers can grade")
+        course = get_object_or_404(Course, id=course_id)
+        if not teaches_course(request.user, course):
+            raise PermissionDenied("You do not teach this course")
+        if pk is not None:
+            lesson_ids = {get_object_or_404(Lesson, pk=pk, course=course).pk}
+        else:
+            lesson_ids = set(course.lessons.values_list("id", flat=True))
+
+        rows = read_rows(request)
+        if rows is None:
+            return Response({"detail": "Send a list of grades or a CSV file"}, status=400)
+        try:
+            clean, errors = validate_rows(rows, lesson_ids, default_lesson_id=pk)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=400)
+        updated = 0
+        if clean and not errors:
+            updated, errors = apply_grades(course.id, clean)
+        if errors:
+            return Response({"detail": "No grades were saved", "errors": errors}, status=400)
+        return Response({"detail": "Grades saved", "rows": len(clean), "updated": updated}, status=200)
+
+
 class MyLessonCompletionsView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -223,12 +352,11 @@ class StudentCourseCompletionsView(APIView):
             .order_by("lesson__id")
         )
 
-        # Build completions payload
+        # Build completions payload, the credit total comes from the gradebook row
+        entry = GradebookEntry.objects.filter(student=student, course=course).first()
+        completed_credits = entry.completed_credits if entry else 0.0
         comp_list = []
-        completed_credits = 0.0
         for c in comps:
-            credit = float(getattr(c.lesson, "credit_value", 0.0) or 0.0)
-            completed_credits += credit
             comp_list.append({
                 "lesson_id": c.lesson.id,
                 "lesson_title": c.lesson.title,
@@ -279,14 +407,9 @@ class CourseGPAView(APIView):
     - F (Fail): 0.0
     """
     permission_classes = [IsAuthenticated]
+    query_budget = 4
     
-    GRADE_TO_GPA = {
-        "HD": 4.0,
-        "D": 3.0,
-        "C": 2.0,
-        "P": 1.0,
-        "F": 0.0,
-    }
+    GRADE_TO_GPA = GRADE_POINTS
     
     def get(self, request, course_id):
         user = request.user
@@ -298,49 +421,123 @@ class CourseGPAView(APIView):
                 status=403
             )
         
-        # Get the course
-        course = get_object_or_404(Course, id=course_id)
-        
-        # Get all graded lesson completions for this student in this course
-        graded_completions = LessonCompletion.objects.filter(
-            student=user,
-            lesson__course=course,
-            grade__isnull=False  # Only include lessons that have been graded
-        ).select_related("lesson")
-        
-        # Calculate GPA
-        if not graded_completions.exists():
-            return Response({
-                "course_id": course.id,
-                "course_title": course.title,
-                "gpa": None,
-                "graded_lessons_count": 0,
-                "total_lessons_count": course.lessons.filter(status="published").count(),
-                "message": "No graded lessons yet"
-            })
-        
-        # Calculate weighted GPA based on credit values
-        total_credits = 0.0
-        weighted_sum = 0.0
+        # Get the course along with its published lesson count
+        course = get_object_or_404(with_published_lesson_count(Course.objects.all()), id=course_id)
         
-        for completion in graded_completions:
-            grade_point = self.GRADE_TO_GPA.get(completion.grade, 0.0)
-            credit_value = float(completion.lesson.credit_value or 1.0)  # Default to 1.0 if no credit value
-            
-            weighted_sum += grade_point * credit_value
-            total_credits += credit_value
-        
-        # Calculate final GPA
-        gpa = weighted_sum / total_credits if total_credits > 0 else 0.0
+        # GPA, graded count and grade breakdown are kept on the student's gradebook row
+        entry = GradebookEntry.objects.filter(student=user, course=course).first()
         
+        return Response(gpa_payload(
+            entry.grade_totals if entry else None,
+            course_id=course.id,
+            course_title=course.title,
+            total_lessons_count=course.published_lessons_count,
+        ))
+
+
+class BulkGPAView(APIView):
+    """
+    GPA for many courses in one request.
+
+    Students get their GPA in every course they're actively enrolled in.
+    Teachers pass ?course_id= and get the GPA of every student enrolled in
+    that course. Either way it's one read of the gradebook, not a request per
+    course or per student.
+    """
+    permission_classes = [IsAuthenticated]
+    query_budget = 6
+
+    def get(self, request):
+        user = request.user
+        if user.role == "student":
+            return self.student_gpas(user)
+        if user.role == "teacher":
+            return self.course_gpas(request, user)
+        return Response({"detail": "Only students and teachers can view GPA"}, status=403)
+
+    def student_gpas(self, user):
+        enrolled_ids = CourseEnrollment.objects.filter(
+            user=user, role="student", status="active"
+        ).values_list("course_id", flat=True)
+        courses = list(with_published_lesson_count(Course.objects.filter(id__in=enrolled_ids)).order_by("id"))
+
+        totals = {
+            entry.course_id: entry.grade_totals
+            for entry in GradebookEntry.objects.filter(student=user, course_id__in=[course.id for course in courses])
+        }
+
+        return Response([
+            gpa_payload(
+                totals.get(course.id),
+                course_id=course.id,
+                course_title=course.title,
+                total_lessons_count=course.published_lessons_count,
+            )
+            for course in courses
+        ])
+
+    def course_gpas(self, request, user):
+        course_id = parse_id(request.query_params.get("course_id"))
+        if course_id is None:
+            return Response({"detail": "course_id is required"}, status=400)
+        course = get_object_or_404(with_published_lesson_count(Course.objects.all()), id=course_id)
+        if not teaches_course(user, course):
+            raise PermissionDenied("You do not teach this course")
+
+        students = list(
+            get_user_model().objects.filter(
+                course_enrollments__course=course,
+                course_enrollments__role="student",
+                course_enrollments__status="active",
+            ).order_by("last_name", "first_name", "id")
+        )
+        totals = {
+            entry.student_id: entry.grade_totals
+            for entry in GradebookEntry.objects.filter(course=course, student_id__in=[student.id for student in students])
+        }
+
         return Response({
             "course_id": course.id,
             "course_title": course.title,
-            "gpa": round(gpa, 2),
-            "graded_lessons_count": graded_completions.count(),
-            "total_lessons_count": course.lessons.filter(status="published").count(),
-            "grade_breakdown": {
-                grade: graded_completions.filter(grade=grade).count()
-                for grade in ["HD", "D", "C", "P", "F"]
-            }
+            "total_lessons_count": course.published_lessons_count,
+            "students": [
+                gpa_payload(
+                    totals.get(student.id),
+                    student_id=student.id,
+                    student_name=f"{student.first_name} {student.last_name}".strip() or student.email,
+                )
+                for student in students
+            ],
+        })
+
+
+class UnlockedLessonsView(APIView):
+    """
+    Which published lessons of a course are unlocked for a student, and for
+    the locked ones which prerequisites (anywhere down the chain) are still
+    missing. Students get their own; teachers of the course pass ?student_id=.
+    """
+    permission_classes = [IsAuthenticated]
+    query_budget = 5
+
+    def get(self, request, course_id):
+        user = request.user
+        course = get_object_or_404(Course, id=course_id)
+        if user.role == "student":
+            student_id = user.id
+        elif user.role == "teacher":
+            student_id = parse_id(request.query_params.get("student_id"))
+            if student_id is None:
+                return Response({"detail": "student_id is required"}, status=400)
+            if not teaches_course(user, course):
+                raise PermissionDenied("You do not teach this course")
+        else:
+            return Response({"detail": "Only students and teachers can view unlocked lessons"}, status=403)
+
+        unlocked, locked = unlocked_lessons(student_id, course.id)
+        return Response({
+            "course_id": course.id,
+            "student_id": student_id,
+            "unlocked": unlocked,
+            "locked": [{"lesson_id": lesson_id, "missing_prerequisites": missing} for lesson_id, missing in locked.items()],
         })
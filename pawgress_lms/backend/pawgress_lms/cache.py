@@ -0,0 +1,158 @@
+"""
+Versioned cache for the read-mostly catalogue endpoints.
+
+Every cached value is stored under a key that embeds the current version of
+each resource it was built from. The versions are small counters in the same
+cache (``("courses",)``, ``("course", 12)``, ``("classrooms",)``,
+``("user", 7)``). Invalidating is bumping a counter from a model signal: the
+old entries are simply never asked for again and age out with the timeout, so
+nothing has to know which keys exist.
+
+Catalogue views split their work in two:
+
+* the shared rows (published courses with their lessons, open classrooms)
+  are cached once for everybody under the shared versions;
+* the rendered response, which carries per-user fields (progress, locked
+  lessons, is_enrolled), is cached per user under the shared versions plus
+  that user's own version, bumped whenever their completions or enrollments
+  change.
+
+The backend is whatever ``CATALOGUE_CACHE_ALIAS`` points at: Redis when
+``PAWGRESS_REDIS_URL`` is set (see settings). Caching is only on when
+``CATALOGUE_CACHE_ENABLED`` is, which by default means with Redis: a bump in
+per-process local memory never reaches the other workers, which would keep
+serving stale seat counts, enrollments and progress until the entries time
+out. Off, ``get_or_build`` just builds and the views query as usual.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+COURSES = ("courses",)
+CLASSROOMS = ("classrooms",)
+# every user's email, names, role and status, for the in-process people search index
+PEOPLE = ("people",)
+
+# paged requests need a real queryset, they always go to the database
+UNCACHED_PARAMS = ("cursor", "page_size")
+
+_MISSING = object()
+
+
+def course_scope(course_id):
+    return ("course", course_id)
+
+
+def user_scope(user_id):
+    return ("user", user_id)
+
+
+def enabled():
+    return getattr(settings, "CATALOGUE_CACHE_ENABLED", False)
+
+
+def get_cache():
+    return caches[getattr(settings, "CATALOGUE_CACHE_ALIAS", "default")]
+
+
+def _version_key(scope):
+    return "catalogue-version:" + ":".join(str(part) for part in scope)
+
+
+def _fresh_version():
+    # a counter that starts from the clock never repeats a version that was evicted
+    return time.time_ns()
+
+
+def versions(scopes):
+    """Current version of every scope, creating the ones not seen yet."""
+    cache = get_cache()
+    keys = [_version_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _fresh_version(), timeout=None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def _bump_keys(keys):
+    cache = get_cache()
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _fresh_version(), timeout=None)
+
+
+def bump(*scopes):
+    """Invalidate everything built from ``scopes``."""
+    keys = [_version_key(scope) for scope in scopes]
+    if not keys:
+        return
+    _bump_keys(keys)
+    # and again once the change is visible to other connections, so a request that
+    # rebuilt from the old rows in between doesn't stay cached under the new version
+    transaction.on_commit(lambda: _bump_keys(keys))
+
+
+def get_or_build(name, scopes, build, timeout=None):
+    """Return the value cached for ``name`` at the current versions of ``scopes``, building it on a miss."""
+    if not enabled():
+        return build()
+    cache = get_cache()
+    tags = ",".join(
+        ":".join(str(part) for part in scope) + f"@{version}"
+        for scope, version in zip(scopes, versions(scopes))
+    )
+    key = f"catalogue:{name}:{tags}"
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = build()
+        cache.set(key, value, getattr(settings, "CATALOGUE_CACHE_TIMEOUT", 300) if timeout is None else timeout)
+    return value
+
+
+class CatalogueCacheMixin:
+    """
+    List view mixin serving the response from the catalogue cache.
+
+    Views set ``catalogue_scopes`` (the shared scopes the rows depend on) or
+    override ``get_catalogue_scopes()`` when they depend on the URL, and
+    usually override ``get_catalogue_rows()`` to return the user's rows from
+    the cached shared rows; by default the rows come from the view's filtered
+    queryset. The rendered response is cached per user and query string.
+    ``use_catalogue_cache()`` can send a request down the normal queryset path
+    instead.
+    """
+    catalogue_name = None
+    catalogue_scopes = None
+
+    def use_catalogue_cache(self):
+        params = self.request.query_params
+        return (
+            enabled()
+            and self.request.user.is_authenticated
+            and not any(param in params for param in UNCACHED_PARAMS)
+        )
+
+    def get_catalogue_scopes(self):
+        assert self.catalogue_scopes is not None, (
+            f"{type(self).__name__} should set `catalogue_scopes` or override `get_catalogue_scopes()`."
+        )
+        return list(self.catalogue_scopes)
+
+    def get_catalogue_rows(self):
+        return list(self.filter_queryset(self.get_queryset()))
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_catalogue_cache():
+            return super().list(request, *args, **kwargs)
+        url_kwargs = ",".join(f"{key}={value}" for key, value in sorted(self.kwargs.items()))
+        name = f"{self.catalogue_name or type(self).__name__}:{url_kwargs}:{request.user.pk}:{request.query_params.urlencode()}"
+        scopes = [*self.get_catalogue_scopes(), user_scope(request.user.pk)]
+        data = get_or_build(name, scopes, lambda: list(self.get_serializer(self.get_catalogue_rows(), many=True).data))
+        return Response(data)
@@ -0,0 +1,119 @@
+"""
+Conditional GET (ETag / Last-Modified) for the course, lesson and classroom views.
+
+The frontend polls these pages and most polls get back exactly the bytes
+they already have. ``ConditionalGetMixin`` gives every 200 a strong ETag and
+a ``Last-Modified``, and answers a matching ``If-None-Match`` with a bare 304
+before the view loads or serializes anything.
+
+The validators are built from:
+
+* ``Max(updated_at)`` and the row count of the view's queryset, one aggregate
+  query. The count catches deletes that the timestamp can't. The aggregate is
+  itself cached under the same catalogue versions, so an unchanged page
+  usually costs no query at all;
+* the catalogue versions the response depends on (see pawgress_lms/cache.py)
+  plus the viewer's own version, which moves with their completions and
+  enrollments. That covers per-user fields and relations without timestamps
+  (prerequisites, seat counts);
+* the user, the full path and the negotiated format, so the ETag is strong:
+  one ETag, one exact response body.
+
+Only ``If-None-Match`` is honoured. ``Last-Modified`` is informational,
+because a viewer's own progress changes the body without moving any
+``updated_at``.
+
+The versions only invalidate across workers when the catalogue cache is
+shared, so all of this is off unless ``CONDITIONAL_GET_ENABLED`` is set (it
+is whenever ``PAWGRESS_REDIS_URL`` is). Without it every GET is a plain 200.
+"""
+import hashlib
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import cache as catalogue_cache
+
+
+class NotModified(Exception):
+    """Raised from ``initial`` to skip the handler, turned into a bodiless 304."""
+
+
+class ConditionalGetMixin:
+    validator_timestamp_field = "updated_at"
+
+    def get_validator_scopes(self):
+        """Catalogue scopes the response is built from (the viewer's own scope is added automatically)."""
+        return []
+
+    def is_detail_request(self):
+        lookup = getattr(self, "lookup_url_kwarg", None) or getattr(self, "lookup_field", None)
+        return lookup in self.kwargs
+
+    def get_validator_queryset(self):
+        """Rows whose timestamps the response depends on. Generic views default to their own queryset."""
+        queryset = self.get_queryset()
+        if self.is_detail_request():
+            lookup = self.lookup_url_kwarg or self.lookup_field
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup]})
+        return queryset
+
+    def _aggregate_validators(self):
+        aggregates = {"rows": Count("pk")}
+        if self.validator_timestamp_field:
+            aggregates["last_modified"] = Max(self.validator_timestamp_field)
+        return self.get_validator_queryset().order_by().aggregate(**aggregates)
+
+    def get_validators(self):
+        """Return (etag, last_modified), or (None, None) when there is nothing to validate against."""
+        request = self.request
+        scopes = [*self.get_validator_scopes(), catalogue_cache.user_scope(request.user.pk)]
+        url_kwargs = ",".join(f"{key}={value}" for key, value in sorted(self.kwargs.items()))
+        row = catalogue_cache.get_or_build(
+            f"validators:{type(self).__name__}:{url_kwargs}:{request.user.pk}", scopes, self._aggregate_validators
+        )
+        if self.is_detail_request() and not row["rows"]:
+            # let the view produce its 404
+            return None, None
+        parts = [
+            request.user.pk,
+            request.get_full_path(),
+            getattr(request.accepted_renderer, "format", ""),
+            row["rows"],
+            row.get("last_modified"),
+            *catalogue_cache.versions(scopes),
+        ]
+        etag = quote_etag(hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest())
+        return etag, row.get("last_modified")
+
+    def initial(self, request, *args, **kwargs):
+        # runs after authentication and permission checks, before the handler
+        super().initial(request, *args, **kwargs)
+        self.conditional_etag = self.conditional_last_modified = None
+        if not getattr(settings, "CONDITIONAL_GET_ENABLED", False):
+            return
+        if request.method not in ("GET", "HEAD") or not request.user.is_authenticated:
+            return
+        self.conditional_etag, self.conditional_last_modified = self.get_validators()
+        if self.conditional_etag and self.conditional_etag in parse_etags(request.headers.get("If-None-Match", "")):
+            raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        etag = getattr(self, "conditional_etag", None)
+        if etag and response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response["ETag"] = etag
+            if self.conditional_last_modified is not None:
+                response["Last-Modified"] = http_date(self.conditional_last_modified.timestamp())
+            # the browser may keep the body but has to revalidate it every time
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ("Authorization", "Cookie"))
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,51 @@
+"""
+Sparse fieldsets for serializers: ``?fields=`` and ``?expand=``.
+
+``?fields=id,title`` keeps only the listed top-level fields, which also
+skips the work behind any method field that was left out. Nested relations
+named in ``Meta.expandable_fields`` come back as primary keys when a
+``fields=`` list is given, unless ``?expand=`` names them too. With neither
+parameter a serializer renders in full, exactly as before.
+"""
+from rest_framework import serializers
+
+
+def parse_field_list(value):
+    """'a, b,,c' -> {'a', 'b', 'c'}; None when the parameter wasn't sent."""
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+class SparseFieldsetMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.collapsed_fields = set()
+        request = self.context.get("request")
+        # nested serializers are built without a request and always render in full
+        if request is None or request.method != "GET":
+            return
+        wanted = parse_field_list(request.query_params.get("fields"))
+        if wanted is None:
+            return
+        expand = parse_field_list(request.query_params.get("expand")) or set()
+
+        for name in list(self.fields):
+            if name not in wanted and name not in expand:
+                self.fields.pop(name)
+        for name in getattr(self.Meta, "expandable_fields", ()):
+            if name in self.fields and name not in expand:
+                nested = self.fields[name]
+                self.fields[name] = serializers.PrimaryKeyRelatedField(
+                    many=isinstance(nested, serializers.ListSerializer),
+                    read_only=True,
+                    source=None if nested.source == name else nested.source,
+                )
+                self.collapsed_fields.add(name)
+
+
+def uses_any(serializer, names):
+    """True if ``serializer`` (or a list serializer's child) will render one of ``names`` in full."""
+    serializer = getattr(serializer, "child", serializer)
+    present = set(serializer.fields) - getattr(serializer, "collapsed_fields", set())
+    return bool(present & set(names))
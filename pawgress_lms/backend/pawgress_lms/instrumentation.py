@@ -0,0 +1,189 @@
+"""
+Per-endpoint query count and latency instrumentation.
+
+``QueryInstrumentationMiddleware`` records, for every API request under
+``INSTRUMENTED_PATH_PREFIXES``, the number of SQL queries, time spent in
+the database, time spent in the view outside the database (for our DRF
+views this is almost entirely serializer work), render time and response
+size. Samples are kept in a bounded in-memory window per endpoint and
+summarised as percentiles by ``EndpointMetricsView``.
+
+Views may declare ``query_budget = <n>``. A request that runs more queries
+than its view's budget logs a warning, or raises ``QueryBudgetExceeded``
+when ``QUERY_BUDGET_ENFORCE`` is on (it is on while running the tests).
+"""
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.db import connection
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH_PREFIXES = ("/api/courses/", "/api/lessons/", "/api/classrooms/", "/api/accounts/")
+DEFAULT_WINDOW = 500
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class _RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook, times every query of the request
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class MetricsStore:
+    """Thread-safe rolling window of request samples per endpoint."""
+
+    FIELDS = ("queries", "db_ms", "app_ms", "render_ms", "total_ms", "response_bytes")
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._budgets = {}
+        self._violations = defaultdict(int)
+        self._counts = defaultdict(int)
+
+    def record(self, endpoint, sample, budget=None):
+        with self._lock:
+            self._samples[endpoint].append(sample)
+            self._counts[endpoint] += 1
+            if budget is not None:
+                self._budgets[endpoint] = budget
+                if sample["queries"] > budget:
+                    self._violations[endpoint] += 1
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._budgets.clear()
+            self._violations.clear()
+            self._counts.clear()
+
+    def summary(self):
+        with self._lock:
+            snapshot = {endpoint: list(samples) for endpoint, samples in self._samples.items()}
+            budgets = dict(self._budgets)
+            violations = dict(self._violations)
+            counts = dict(self._counts)
+
+        out = {}
+        for endpoint, samples in snapshot.items():
+            stats = {}
+            for field in self.FIELDS:
+                values = [sample[field] for sample in samples]
+                stats[field] = {
+                    "p50": _percentile(values, 50),
+                    "p95": _percentile(values, 95),
+                    "p99": _percentile(values, 99),
+                    "max": max(values),
+                }
+            out[endpoint] = {
+                "requests": counts.get(endpoint, 0),
+                "window": len(samples),
+                "query_budget": budgets.get(endpoint),
+                "budget_violations": violations.get(endpoint, 0),
+                **stats,
+            }
+        return out
+
+
+metrics_store = MetricsStore(getattr(settings, "INSTRUMENTATION_WINDOW", DEFAULT_WINDOW))
+
+
+class QueryInstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefixes = tuple(getattr(settings, "INSTRUMENTED_PATH_PREFIXES", DEFAULT_PATH_PREFIXES))
+
+    def __call__(self, request):
+        if not request.path.startswith(self.prefixes):
+            return self.get_response(request)
+
+        metrics = _RequestMetrics()
+        start = time.perf_counter()
+        with connection.execute_wrapper(metrics):
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+
+        view_time = getattr(request, "_instrumentation_view_time", None)
+        render_time = getattr(request, "_instrumentation_render_time", 0.0)
+        if view_time is None:
+            view_time = total - render_time
+        match = getattr(request, "resolver_match", None)
+        # one bucket for every path that doesn't resolve, junk URLs must not each get an entry
+        endpoint = f"{request.method} /{match.route}" if match else f"{request.method} <unmatched>"
+        budget = getattr(request, "_instrumentation_budget", None)
+
+        sample = {
+            "queries": metrics.queries,
+            "db_ms": round(metrics.db_time * 1000, 3),
+            "app_ms": round(max(view_time - metrics.db_time, 0.0) * 1000, 3),
+            "render_ms": round(render_time * 1000, 3),
+            "total_ms": round(total * 1000, 3),
+            "response_bytes": 0 if response.streaming else len(response.content),
+        }
+        metrics_store.record(endpoint, sample, budget)
+
+        if budget is not None and metrics.queries > budget:
+            message = f"{endpoint} ran {metrics.queries} queries (budget {budget})"
+            if getattr(settings, "QUERY_BUDGET_ENFORCE", False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, "view_class", None)
+        request._instrumentation_budget = getattr(view_class, "query_budget", None)
+        request._instrumentation_view_start = time.perf_counter()
+        return None
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after this hook, time the render separately
+        started = getattr(request, "_instrumentation_view_start", None)
+        if started is not None:
+            request._instrumentation_view_time = time.perf_counter() - started
+        render_start = time.perf_counter()
+
+        def _rendered(rendered_response):
+            request._instrumentation_render_time = time.perf_counter() - render_start
+
+        response.add_post_render_callback(_rendered)
+        return response
+
+
+class EndpointMetricsView(APIView):
+    """Admin only: rolling query/latency percentiles per endpoint."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(metrics_store.summary(), status=status.HTTP_200_OK)
+
+    def delete(self, request):
+        metrics_store.reset()
+        return Response({"detail": "Metrics reset"}, status=status.HTTP_200_OK)
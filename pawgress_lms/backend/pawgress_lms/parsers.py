@@ -0,0 +1,37 @@
+"""
+Row uploads shared by the bulk endpoints (grading, user import).
+
+They all take the same three shapes: a JSON list of objects, a CSV file
+uploaded as ``file``, or a raw ``text/csv`` body. CSV is decoded and split
+line by line as it is read, so a big upload is never held as one string.
+"""
+import codecs
+import csv
+
+from rest_framework.parsers import BaseParser
+
+
+class CSVRowsParser(BaseParser):
+    """``text/csv`` request bodies, parsed lazily into one dict per line."""
+    media_type = "text/csv"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return csv_rows(stream)
+
+
+def csv_rows(lines):
+    """Dict rows from an iterable of byte lines (a request body or an uploaded file)."""
+    return csv.DictReader(codecs.iterdecode(lines, "utf-8-sig"))
+
+
+def request_rows(request, list_key):
+    """The submitted rows: an uploaded ``file``, a CSV body or a JSON list (bare or under ``list_key``)."""
+    upload = request.FILES.get("file")
+    if upload is not None:
+        return csv_rows(upload)
+    data = request.data
+    if isinstance(data, dict):
+        data = data.get(list_key)
+    if data is None or isinstance(data, (str, bytes)):
+        return None
+    return data
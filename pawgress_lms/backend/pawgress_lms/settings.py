@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 from datetime import timedelta
+import os
+import sys
 
 
 
@@ -32,17 +34,22 @@ ALLOWED_HOSTS = ["*"]
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # simplejwt's JWTAuthentication without the users query, see accounts/authentication.py
+        "accounts.authentication.CachedJWTAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
     ],
+    # opt-in keyset pagination (?page_size= / ?cursor=), see pawgress_lms/pagination.py
+    "DEFAULT_PAGINATION_CLASS": "pawgress_lms.pagination.KeysetPagination",
 }
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
+    # tokens carry a fingerprint of the password hash, changing the password revokes them
+    "CHECK_REVOKE_TOKEN": True,
 }
 
 
@@ -69,6 +76,7 @@ AUTH_USER_MODEL = 'user_accounts.User' #using the custom user model from the acc
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'pawgress_lms.instrumentation.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,6 +86,48 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Query/latency instrumentation (see pawgress_lms/instrumentation.py)
+# Views can set `query_budget`; going over it fails the test suite
+TESTING = len(sys.argv) > 1 and sys.argv[1] == "test"
+QUERY_BUDGET_ENFORCE = TESTING
+INSTRUMENTED_PATH_PREFIXES = ("/api/courses/", "/api/lessons/", "/api/classrooms/", "/api/accounts/")
+INSTRUMENTATION_WINDOW = 500
+
+# Catalogue cache (see pawgress_lms/cache.py). Local memory by default, which
+# is per process, so the catalogue cache, ETags and auth state caching below
+# stay off; set PAWGRESS_REDIS_URL (e.g. redis://localhost:6379/1) to share it
+# between workers and turn them on. The Redis backend needs the ``redis`` package.
+PAWGRESS_REDIS_URL = os.environ.get("PAWGRESS_REDIS_URL")
+if PAWGRESS_REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": PAWGRESS_REDIS_URL,
+            "KEY_PREFIX": "pawgress",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "pawgress-catalogue",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+CATALOGUE_CACHE_ALIAS = "default"
+# only with a shared cache: version bumps in local memory stay in the worker that made them
+CATALOGUE_CACHE_ENABLED = bool(PAWGRESS_REDIS_URL)
+CATALOGUE_CACHE_TIMEOUT = 300  # seconds, entries are invalidated by version bumps long before this
+# ETags embed the catalogue versions, which only move in every worker when the
+# cache is shared; with per-process local memory a worker that didn't handle a
+# write would keep answering 304 with stale progress and seat counts
+CONDITIONAL_GET_ENABLED = bool(PAWGRESS_REDIS_URL)
+# per-user ban/revocation state for CachedJWTAuthentication. Only cached when
+# the cache is shared: a ban has to reach every worker on the next request, and
+# per-process memory only forgets it in the worker that handled the ban
+AUTH_STATE_CACHE_ALIAS = "default" if PAWGRESS_REDIS_URL else None
+AUTH_STATE_CACHE_TIMEOUT = 300
+
 ROOT_URLCONF = 'pawgress_lms.urls'
 
 TEMPLATES = [
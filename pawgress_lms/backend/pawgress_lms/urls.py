@@ -20,6 +20,7 @@ from django.conf.urls.static import static
 from django.conf import settings
 
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from .instrumentation import EndpointMetricsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -29,6 +30,7 @@ urlpatterns = [
     path('api/lessons/', include('lessons.urls')),
     path("api/token/", TokenObtainPairView.as_view(), name="get_token"),
     path("api/token/refresh/", TokenRefreshView.as_view(), name="refresh"),
+    path("api/metrics/", EndpointMetricsView.as_view(), name="endpoint-metrics"),  #admin only, query/latency stats per endpoint
 
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 
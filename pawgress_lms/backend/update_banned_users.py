@@ -9,23 +9,17 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pawgress_lms.settings')
 django.setup()
 
 from django.contrib.auth import get_user_model
-from courses.models import CourseEnrollment
+from accounts.moderation import cascade_enrollment_status
 
 User = get_user_model()
 
 # Find all users who are inactive (banned)
-banned_users = User.objects.filter(is_active=False)
+banned_ids = list(User.objects.filter(is_active=False).values_list("id", flat=True))
 
-print(f"Found {banned_users.count()} banned users")
+print(f"Found {len(banned_ids)} banned users")
 
-for user in banned_users:
-    # Update their course enrollments to banned status
-    updated = CourseEnrollment.objects.filter(
-        user=user,
-        status='active'
-    ).update(status='banned')
-    
-    if updated > 0:
-        print(f"Updated {updated} enrollments for {user.email} to 'banned' status")
+# one UPDATE for all of them (the same cascade the ban signal and bulk moderation use)
+updated = cascade_enrollment_status(banned_ids, active=False)
+print(f"Updated {updated} enrollments to 'banned' status")
 
 print("Done!")
@@ -0,0 +1,15 @@
+const LoadMoreButton = ({ onClick, loading }) => {
+  return (
+    <div className="flex justify-center my-6">
+      <button
+        onClick={onClick}
+        disabled={loading}
+        className="btn bg-cookie-darkbrown text-cookie-white border border-cookie-darkbrown"
+      >
+        {loading ? "Loading..." : "Load more"}
+      </button>
+    </div>
+  );
+};
+
+export default LoadMoreButton;
@@ -0,0 +1,57 @@
+import { useCallback, useEffect, useRef, useState } from "react";
+import toast from "react-hot-toast";
+import api from "../api";
+
+const SEARCH_URL = "api/accounts/users/search/";
+
+// Pages through the admin people search. With an empty query it lists the
+// role/status in id order, so the user pages never download the whole table;
+// a typed query waits for a pause and comes back best match first. Only the
+// newest request is kept: an older one is aborted and its response ignored.
+const usePeopleSearch = ({ query, role, status, pageSize = 50 }) => {
+  const [people, setPeople] = useState([]);
+  const [next, setNext] = useState(null);
+  const [loading, setLoading] = useState(false);
+  const [reloads, setReloads] = useState(0);
+  const latest = useRef(null);
+
+  const fetchPage = useCallback(async (url, params, append) => {
+    latest.current?.abort();
+    const controller = new AbortController();
+    latest.current = controller;
+    setLoading(true);
+    try {
+      const res = await api.get(url, { params, signal: controller.signal });
+      if (latest.current !== controller) return;
+      setPeople((prev) => (append ? [...prev, ...res.data.results] : res.data.results));
+      setNext(res.data.next);
+    } catch (error) {
+      if (!controller.signal.aborted) toast.error("Failed to get users");
+    } finally {
+      if (latest.current === controller) setLoading(false);
+    }
+  }, []);
+
+  useEffect(() => {
+    const q = query.trim();
+    // the cursor of the previous results must not be followed into these ones
+    setNext(null);
+    const timer = setTimeout(
+      () => fetchPage(SEARCH_URL, { q, role, status, page_size: pageSize }, false),
+      q ? 250 : 0
+    );
+    return () => clearTimeout(timer);
+  }, [query, role, status, pageSize, reloads, fetchPage]);
+
+  useEffect(() => () => latest.current?.abort(), []);
+
+  const loadMore = useCallback(() => {
+    if (next) fetchPage(next, undefined, true);
+  }, [next, fetchPage]);
+
+  const reload = useCallback(() => setReloads((n) => n + 1), []);
+
+  return { people, setPeople, hasMore: Boolean(next), loadMore, loading, reload };
+};
+
+export default usePeopleSearch;
@@ -45,15 +45,34 @@ const EnrolCourses = () => {
     }
   };
 
+  // ranked ids from the server side search, null while there is no query
+  const [matchIds, setMatchIds] = useState(null);
+
+  useEffect(() => {
+    const query = searchQuery.trim();
+    if (!query) {
+      setMatchIds(null);
+      return;
+    }
+    const timer = setTimeout(async () => {
+      try {
+        const res = await api.get("/api/courses/search/", {
+          params: { q: query, type: "course", page_size: 50 },
+        });
+        setMatchIds(res.data.results.map((hit) => hit.id));
+      } catch (err) {
+        console.error("Search failed:", err);
+        toast.error("Search failed");
+      }
+    }, 250);
+    return () => clearTimeout(timer);
+  }, [searchQuery]);
+
   const filteredCourses = useMemo(() => {
-    if (!searchQuery) return courses;
-    const query = searchQuery.toLowerCase();
-    return courses.filter(
-      (course) =>
-        course.title.toLowerCase().includes(query) ||
-        course.description.toLowerCase().includes(query)
-    );
-  }, [courses, searchQuery]);
+    if (!matchIds) return courses;
+    const byId = new Map(courses.map((course) => [course.id, course]));
+    return matchIds.map((id) => byId.get(id)).filter(Boolean);
+  }, [courses, matchIds]);
 
   return (
     <div className="min-h-screen">
@@ -76,7 +95,7 @@ const EnrolCourses = () => {
         <SearchBar
           value={searchQuery}
           onChange={setSearchQuery}
-          placeholder="Search courses by title..."
+          placeholder="Search courses..."
         />
       </div>
 
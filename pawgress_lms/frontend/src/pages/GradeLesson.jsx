@@ -69,6 +69,24 @@ const GradeLesson = () => {
     }
   };
 
+  const saveAll = async () => {
+    const rows = completions
+      .filter((c) => c.grade)
+      .map((c) => ({ student_id: c.student_id, grade: c.grade, comment: c.comment || "" }));
+    if (rows.length === 0) return;
+    setSaving(true);
+    try {
+      const res = await api.post(`/api/lessons/${courseid}/${lessonid}/grades/`, rows);
+      toast.success(`Saved ${res.data.updated} grade${res.data.updated === 1 ? "" : "s"}`);
+      setCompletions((prev) => sortCompletions(prev));
+    } catch (e) {
+      const errors = e.response?.data?.errors;
+      toast.error(errors?.length ? `Nothing saved, ${errors.length} row${errors.length === 1 ? " has" : "s have"} problems` : "Failed to save");
+    } finally {
+      setSaving(false);
+    }
+  };
+
   if (role !== "teacher") {
     return (
       <div className="min-h-screen flex items-center justify-center">
@@ -97,8 +115,17 @@ const GradeLesson = () => {
         </Link>
       </div>
 
-      <div className="mt-4">
+      <div className="mt-4 flex items-center justify-between">
         <h1 className="text-3xl font-bold text-cookie-darkbrown">Mark Grades{lessonTitle ? `: ${lessonTitle}` : ""}</h1>
+        {completions.length > 0 && (
+          <button
+            className="btn bg-cookie-darkbrown text-cookie-white border border-cookie-darkbrown"
+            disabled={saving || !completions.some((c) => c.grade)}
+            onClick={saveAll}
+          >
+            Save all grades
+          </button>
+        )}
       </div>
 
       <div className="mt-6">
@@ -1,4 +1,4 @@
-import { useState, useEffect, useMemo, useContext } from "react";
+import { useState, useContext } from "react";
 import api from "../api";
 import toast from "react-hot-toast";
 import { ArrowLeft, X, Check } from "lucide-react";
@@ -6,43 +6,26 @@ import { Link } from "react-router";
 import SearchBar from "../components/SearchBar";
 import { ViewContext } from "../contexts/ViewContext";
 import ViewToggle from "../components/ViewToggle";
+import LoadMoreButton from "../components/LoadMoreButton";
+import usePeopleSearch from "../hooks/usePeopleSearch";
 
 const ManageStudent = () => {
-  const [activeStudents, setActiveStudents] = useState([]);
-  const [bannedStudents, setBannedStudents] = useState([]);
   const [searchQuery, setSearchQuery] = useState("");
   const [activeTab, setActiveTab] = useState("active"); // active, banned
 
-  useEffect(() => {
-    const fetchStudents = async () => {
-      try {
-        const [activeRes, bannedRes] = await Promise.all([
-          api.get("api/accounts/students/"),
-          api.get("api/accounts/students/?status=banned")
-        ]);
-        setActiveStudents(activeRes.data);
-        setBannedStudents(bannedRes.data);
-      } catch (error) {
-        toast.error("Failed to get students");
-      }
-    };
-    fetchStudents();
-  }, []);
+  // a page of the tab's students at a time, best match first while searching
+  const { people: filteredStudents, setPeople, hasMore, loadMore, loading } = usePeopleSearch({
+    query: searchQuery,
+    role: "student",
+    status: activeTab,
+  });
 
   const handleBan = async (studentEmail) => {
     try {
       await api.patch(`api/accounts/deactivate-student/${studentEmail}/`);
       toast.success("Successfully banned student");
-      const student = activeStudents.find((s) => s.email === studentEmail);
-      if (student) {
-        setActiveStudents((prev) =>
-          prev.filter((s) => s.email !== studentEmail)
-        );
-        setBannedStudents((prev) => [
-          ...prev,
-          { ...student, is_active: false }
-        ]);
-      }
+      // they now belong to the banned tab, which is fetched when it is opened
+      setPeople((prev) => prev.filter((s) => s.email !== studentEmail));
     } catch (error) {
       toast.error("Failed to ban student");
     }
@@ -52,38 +35,12 @@ const ManageStudent = () => {
     try {
       await api.patch(`api/accounts/unban-student/${studentEmail}/`);
       toast.success("Successfully unbanned student");
-      const student = bannedStudents.find((s) => s.email === studentEmail);
-      if (student) {
-        setBannedStudents((prev) =>
-          prev.filter((s) => s.email !== studentEmail)
-        );
-        setActiveStudents((prev) => [...prev, { ...student, is_active: true }]);
-      }
+      setPeople((prev) => prev.filter((s) => s.email !== studentEmail));
     } catch (error) {
       toast.error("Failed to unban student");
     }
   };
 
-  const filterStudents = (students) => {
-    if (!searchQuery) return students;
-    const query = searchQuery.toLowerCase();
-    return students.filter(
-      (student) =>
-        `${student.first_name} ${student.last_name}`
-          .toLowerCase()
-          .includes(query) ||
-        (student.email && student.email.toLowerCase().includes(query))
-    );
-  };
-
-  const filteredStudents = useMemo(() => {
-    const filtered = {
-      active: filterStudents(activeStudents),
-      banned: filterStudents(bannedStudents)
-    };
-    return filtered[activeTab] || [];
-  }, [activeStudents, bannedStudents, searchQuery, activeTab]);
-
   const { view } = useContext(ViewContext);
 
   return (
@@ -172,15 +129,9 @@ const ManageStudent = () => {
             ) : (
               <div className="col-span-full flex justify-center items-center min-h-64">
                 <p className="text-cookie-darkbrown text-2xl">
-                  {activeTab === "active" &&
-                    activeStudents.length === 0 &&
-                    "There are no active students"}
-                  {activeTab === "banned" &&
-                    bannedStudents.length === 0 &&
-                    "There are no banned students"}
-                  {((activeTab === "active" && activeStudents.length > 0) ||
-                    (activeTab === "banned" && bannedStudents.length > 0)) &&
-                    "No students match your search"}
+                  {searchQuery.trim()
+                    ? "No students match your search"
+                    : `There are no ${activeTab} students`}
                 </p>
               </div>
             )}
@@ -222,21 +173,16 @@ const ManageStudent = () => {
             ) : (
               <div className="col-span-full flex justify-center items-center min-h-64">
                 <p className="text-cookie-darkbrown text-2xl">
-                  {activeTab === "active" &&
-                    activeStudents.length === 0 &&
-                    "There are no active students"}
-                  {activeTab === "banned" &&
-                    bannedStudents.length === 0 &&
-                    "There are no banned students"}
-                  {((activeTab === "active" && activeStudents.length > 0) ||
-                    (activeTab === "banned" && bannedStudents.length > 0)) &&
-                    "No students match your search"}
+                  {searchQuery.trim()
+                    ? "No students match your search"
+                    : `There are no ${activeTab} students`}
                 </p>
               </div>
             )}
           </div>
         )}
       </div>
+      {hasMore && <LoadMoreButton onClick={loadMore} loading={loading} />}
     </div>
   );
 };
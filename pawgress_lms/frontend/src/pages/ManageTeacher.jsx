@@ -1,4 +1,4 @@
-import { useEffect, useState, useMemo, useContext } from "react";
+import { useState, useContext } from "react";
 import api from "../api";
 import toast from "react-hot-toast";
 import { Check, X, ArrowLeft } from "lucide-react";
@@ -6,31 +6,24 @@ import { Link } from "react-router";
 import SearchBar from "../components/SearchBar";
 import { ViewContext } from "../contexts/ViewContext";
 import ViewToggle from "../components/ViewToggle";
+import LoadMoreButton from "../components/LoadMoreButton";
+import usePeopleSearch from "../hooks/usePeopleSearch";
 
 const ManageTeacher = () => {
-  const [pendingTeachers, setPendingTeachers] = useState([]);
-  const [approvedTeachers, setApprovedTeachers] = useState([]);
-  const [bannedTeachers, setBannedTeachers] = useState([]);
   const [searchQuery, setSearchQuery] = useState("");
   const [activeTab, setActiveTab] = useState("pending"); // pending, approved, banned
 
-  useEffect(() => {
-    const fetchTeachers = async () => {
-      try {
-        const [pendingRes, approvedRes, bannedRes] = await Promise.all([
-          api.get("api/accounts/teachers?status=pending"),
-          api.get("api/accounts/teachers?status=approved"),
-          api.get("api/accounts/teachers?status=banned")
-        ]);
-        setPendingTeachers(pendingRes.data);
-        setApprovedTeachers(approvedRes.data);
-        setBannedTeachers(bannedRes.data);
-      } catch (error) {
-        toast.error("Failed to get teacher accounts");
-      }
-    };
-    fetchTeachers();
-  }, []);
+  // a page of the tab's teachers at a time, best match first while searching
+  const { people: filteredTeachers, setPeople, hasMore, loadMore, loading } = usePeopleSearch({
+    query: searchQuery,
+    role: "teacher",
+    status: activeTab,
+  });
+
+  // a teacher who was approved, banned or unbanned now belongs to another tab, fetched when it is opened
+  const dropFromTab = (teacherId) => {
+    setPeople((prev) => prev.filter((t) => t.id !== teacherId));
+  };
 
   const handleApprove = async (teacherId) => {
     try {
@@ -38,16 +31,7 @@ const ManageTeacher = () => {
         is_approved: true
       });
       toast.success("Teacher successfully approved");
-
-      // Move teacher from pending to approved
-      const teacher = pendingTeachers.find((t) => t.id === teacherId);
-      if (teacher) {
-        setPendingTeachers((prev) => prev.filter((t) => t.id !== teacherId));
-        setApprovedTeachers((prev) => [
-          ...prev,
-          { ...teacher, is_approved: true }
-        ]);
-      }
+      dropFromTab(teacherId);
     } catch (error) {
       toast.error("Failed to approve teacher");
     }
@@ -57,16 +41,7 @@ const ManageTeacher = () => {
     try {
       await api.patch(`api/accounts/ban-teacher/${teacherId}/`);
       toast.success("Teacher successfully banned");
-
-      // Move teacher from approved to banned
-      const teacher = approvedTeachers.find((t) => t.id === teacherId);
-      if (teacher) {
-        setApprovedTeachers((prev) => prev.filter((t) => t.id !== teacherId));
-        setBannedTeachers((prev) => [
-          ...prev,
-          { ...teacher, is_active: false }
-        ]);
-      }
+      dropFromTab(teacherId);
     } catch (error) {
       toast.error("Failed to ban teacher");
     }
@@ -76,53 +51,17 @@ const ManageTeacher = () => {
     try {
       await api.patch(`api/accounts/unban-teacher/${teacherId}/`);
       toast.success("Teacher successfully unbanned");
-
-      // Move teacher from banned to approved
-      const teacher = bannedTeachers.find((t) => t.id === teacherId);
-      if (teacher) {
-        setBannedTeachers((prev) => prev.filter((t) => t.id !== teacherId));
-        setApprovedTeachers((prev) => [
-          ...prev,
-          { ...teacher, is_active: true }
-        ]);
-      }
+      dropFromTab(teacherId);
     } catch (error) {
       toast.error("Failed to unban teacher");
     }
   };
 
   const handleDisapprove = (teacherId) => {
-    setPendingTeachers((prev) => prev.filter((t) => t.id !== teacherId));
+    dropFromTab(teacherId);
     toast.success("Teacher removed from pending list");
   };
 
-  const filterTeachers = (teachers) => {
-    if (!searchQuery) return teachers;
-    const query = searchQuery.toLowerCase();
-    return teachers.filter(
-      (teacher) =>
-        `${teacher.first_name} ${teacher.last_name}`
-          .toLowerCase()
-          .includes(query) ||
-        (teacher.email && teacher.email.toLowerCase().includes(query))
-    );
-  };
-
-  const filteredTeachers = useMemo(() => {
-    const filtered = {
-      pending: filterTeachers(pendingTeachers),
-      approved: filterTeachers(approvedTeachers),
-      banned: filterTeachers(bannedTeachers)
-    };
-    return filtered[activeTab] || [];
-  }, [
-    pendingTeachers,
-    approvedTeachers,
-    bannedTeachers,
-    searchQuery,
-    activeTab
-  ]);
-
   const { view, setView } = useContext(ViewContext);
 
   return (
@@ -231,9 +170,9 @@ const ManageTeacher = () => {
             ) : (
               <div className="col-span-full flex justify-center items-center min-h-64">
                 <p className="text-cookie-darkbrown text-2xl">
-                  {pendingTeachers.length === 0
-                    ? "There are no pending teacher accounts"
-                    : "No teachers match your search"}
+                  {searchQuery.trim()
+                    ? "No teachers match your search"
+                    : `There are no ${activeTab} teacher accounts`}
                 </p>
               </div>
             )}
@@ -285,15 +224,16 @@ const ManageTeacher = () => {
             ) : (
               <div className="col-span-full flex justify-center items-center min-h-64">
                 <p className="text-cookie-darkbrown text-2xl">
-                  {pendingTeachers.length === 0
-                    ? "There are no pending teacher accounts"
-                    : "No teachers match your search"}
+                  {searchQuery.trim()
+                    ? "No teachers match your search"
+                    : `There are no ${activeTab} teacher accounts`}
                 </p>
               </div>
             )}
           </div>
         )}
       </div>
+      {hasMore && <LoadMoreButton onClick={loadMore} loading={loading} />}
     </div>
   );
 };
@@ -48,45 +48,23 @@ const Reports = () => {
 
   const fetchCourses = async () => {
     try {
-      // For reports, fetch all available courses (not just enrolled)
-      const coursesRes = await api.get("/api/courses/available/");
-      console.log("Courses fetched:", coursesRes.data);
+      // One request for every course's stats instead of two per course
+      const reportsRes = await api.get("/api/courses/reports/courses/");
+      const reports = reportsRes.data?.courses || [];
 
-      if (!coursesRes.data || coursesRes.data.length === 0) {
+      if (reports.length === 0) {
         console.log("No courses found");
         setCourses([]);
         return;
       }
 
-      const coursesWithStats = await Promise.all(
-        coursesRes.data.map(async (course) => {
-          try {
-            const [completionRes, gradeRes] = await Promise.all([
-              api.get(`/api/courses/reports/course/${course.id}/completion/`),
-              api.get(`/api/courses/reports/course/${course.id}/average-grade/`)
-            ]);
-
-            return {
-              ...course,
-              completionStats: completionRes.data.metrics,
-              gradeStats: gradeRes.data.metrics
-            };
-          } catch (error) {
-            console.error(
-              `Error fetching stats for course ${course.id}:`,
-              error
-            );
-            return {
-              ...course,
-              completionStats: null,
-              gradeStats: null
-            };
-          }
-        })
+      setCourses(
+        reports.map(({ course, metrics }) => ({
+          ...course,
+          completionStats: metrics,
+          gradeStats: metrics
+        }))
       );
-
-      console.log("Courses with stats:", coursesWithStats);
-      setCourses(coursesWithStats);
     } catch (error) {
       console.error("Error fetching courses:", error);
       console.error("Error details:", error.response?.data);
@@ -181,8 +159,8 @@ const Reports = () => {
           <UniversityStatsCard
             title="University Average Grade"
             value={
-              universityStats?.averageGrade
-                ? `${universityStats.averageGrade.toFixed(1)}%`
+              universityStats?.averageGrade != null
+                ? `${universityStats.averageGrade.toFixed(2)} GPA`
                 : "N/A"
             }
             icon={<Award className="size-8 text-cookie-darkbrown" />}
@@ -287,7 +265,7 @@ const CourseReportCard = ({ course, totalStudents }) => {
         <div className="flex items-center gap-2">
           <Award className="size-4 text-cookie-brown" />
           <span className="text-lg font-bold text-cookie-brown">
-            {averageGrade ? `${averageGrade.toFixed(1)}%` : "N/A"}
+            {averageGrade != null ? `${averageGrade.toFixed(2)} GPA` : "N/A"}
           </span>
         </div>
       </div>
@@ -10,6 +10,21 @@ const StudentList = () => {
   const [courseTitle, setCourseTitle] = useState("");
   const [loading, setLoading] = useState(true);
 
+  // Download the course gradebook (students x lessons) as a CSV file
+  const exportGradebook = async () => {
+    try {
+      const res = await api.get(`/api/courses/${courseid}/gradebook/csv/`, { responseType: "blob" });
+      const url = URL.createObjectURL(res.data);
+      const link = document.createElement("a");
+      link.href = url;
+      link.download = `gradebook-${courseid}.csv`;
+      link.click();
+      URL.revokeObjectURL(url);
+    } catch (error) {
+      toast.error("Failed to export the gradebook");
+    }
+  };
+
   // Helper function to get status badge styling
   const getStatusBadge = (status) => {
     const statusLower = status?.toLowerCase() || "active";
@@ -86,7 +101,17 @@ const StudentList = () => {
         <h2 className="font-bold text-3xl">
           Student List{courseTitle ? `: ${courseTitle}` : ""}
         </h2>
-        <p className="text-gray-600 mt-2">Total Students: {students.length}</p>
+        <div className="flex items-center justify-between mt-2">
+          <p className="text-gray-600">Total Students: {students.length}</p>
+          {students.length > 0 && (
+            <button
+              className="btn bg-cookie-darkbrown text-cookie-white border border-cookie-darkbrown"
+              onClick={exportGradebook}
+            >
+              Export gradebook (CSV)
+            </button>
+          )}
+        </div>
       </div>
 
       <div className="mt-8 px-8">
@@ -1,4 +1,4 @@
-import { useState, useEffect, useContext, useMemo } from "react";
+import { useState, useContext } from "react";
 import api from "../api";
 import toast from "react-hot-toast";
 import { ArrowLeft, X, Check } from "lucide-react";
@@ -7,9 +7,10 @@ import { RoleContext } from "../contexts/RoleContext";
 import { Link } from "react-router";
 import { ViewContext } from "../contexts/ViewContext";
 import ViewToggle from "../components/ViewToggle";
+import LoadMoreButton from "../components/LoadMoreButton";
+import usePeopleSearch from "../hooks/usePeopleSearch";
 
 const Users = () => {
-  const [users, setUsers] = useState([]);
   const [searchQuery, setSearchQuery] = useState("");
   const [activeTab, setActiveTab] = useState("teachers");
   const [selectedUser, setSelectedUser] = useState(null);
@@ -17,17 +18,32 @@ const Users = () => {
   const [loadingCourses, setLoadingCourses] = useState(false);
   const { role } = useContext(RoleContext);
 
-  useEffect(() => {
-    const fetchUsers = async () => {
-      try {
-        const res = await api.get("api/accounts/users/");
-        setUsers(res.data);
-      } catch (error) {
-        toast.error("Failed to get users");
-      }
-    };
-    fetchUsers();
-  }, []);
+  // a page of the tab's users at a time, best match first while searching
+  const { people: filteredUsers, hasMore, loadMore, loading, reload } = usePeopleSearch({
+    query: searchQuery,
+    role: activeTab === "teachers" ? "teacher" : "student",
+    status: "active",
+  });
+
+  // Bulk onboarding: the CSV needs email, password, first_name, last_name (and optionally role, courses)
+  const importUsers = async (event) => {
+    const file = event.target.files?.[0];
+    event.target.value = "";
+    if (!file) return;
+    const form = new FormData();
+    form.append("file", file);
+    const importRole = activeTab === "teachers" ? "teacher" : "student";
+    try {
+      const res = await api.post(`api/accounts/users/import/?role=${importRole}`, form);
+      const { created, duplicates, errors } = res.data;
+      toast.success(`Imported ${created} users`);
+      if (duplicates.length) toast(`${duplicates.length} duplicate emails skipped`);
+      if (errors.length) toast.error(`${errors.length} rows had problems and were skipped`);
+      reload();
+    } catch (error) {
+      toast.error(error.response?.data?.detail || "Failed to import users");
+    }
+  };
 
   const fetchStudentCourses = async (userId) => {
     setLoadingCourses(true);
@@ -77,28 +93,6 @@ const Users = () => {
     setUserCourses([]);
   };
 
-  const filteredUsers = useMemo(() => {
-    // First filter by role
-    let filtered = users.filter((user) =>
-      activeTab === "teachers"
-        ? user.role === "teacher"
-        : user.role === "student"
-    );
-
-    // Then apply search query if exists
-    if (searchQuery) {
-      const query = searchQuery.toLowerCase();
-      filtered = filtered.filter(
-        (user) =>
-          `${user.first_name} ${user.last_name}`
-            .toLowerCase()
-            .includes(query) ||
-          (user.email && user.email.toLowerCase().includes(query))
-      );
-    }
-    return filtered;
-  }, [users, searchQuery, activeTab]);
-
   const { view, setView } = useContext(ViewContext);
 
   return (
@@ -113,7 +107,11 @@ const Users = () => {
             Back
           </Link>
         </div>
-        <div>
+        <div className="flex items-center gap-3">
+          <label className="btn bg-cookie-darkbrown text-cookie-white border border-cookie-darkbrown">
+            Import {activeTab} (CSV)
+            <input type="file" accept=".csv,text/csv" className="hidden" onChange={importUsers} />
+          </label>
           <ViewToggle />
         </div>
       </div>
@@ -168,9 +166,9 @@ const Users = () => {
             ) : (
               <div className="col-span-full flex justify-center items-center min-h-64">
                 <p className="text-cookie-darkbrown text-2xl">
-                  {users.length === 0
-                    ? `There are no current ${activeTab}`
-                    : `No ${activeTab} match your search`}
+                  {searchQuery.trim()
+                    ? `No ${activeTab} match your search`
+                    : `There are no current ${activeTab}`}
                 </p>
               </div>
             )}
@@ -195,15 +193,16 @@ const Users = () => {
             ) : (
               <div className="col-span-full flex justify-center items-center min-h-64">
                 <p className="text-cookie-darkbrown text-2xl">
-                  {users.length === 0
-                    ? `There are no current ${activeTab}`
-                    : `No ${activeTab} match your search`}
+                  {searchQuery.trim()
+                    ? `No ${activeTab} match your search`
+                    : `There are no current ${activeTab}`}
                 </p>
               </div>
             )}
           </div>
         )}
       </div>
+      {hasMore && <LoadMoreButton onClick={loadMore} loading={loading} />}
 
       {/* Modal for User Courses */}
       {selectedUser && (